@@ -25,7 +25,7 @@ import {
   Pie,
   Cell
 } from 'recharts'
-import { transactionService, budgetService, goalService, aiAdvisorService } from '@/services/api'
+import { dashboardService } from '@/services/api'
 
 const Dashboard = ({ userId }) => {
   const [summary, setSummary] = useState(null)
@@ -121,12 +121,8 @@ const Dashboard = ({ userId }) => {
     setIsLoading(true)
     try {
       // Em um cenário real, você faria chamadas para as APIs
-      // const [summaryRes, budgetsRes, goalsRes, insightsRes] = await Promise.all([
-      //   transactionService.getSummary(userId),
-      //   budgetService.getAll(userId, true),
-      //   goalService.getAll(userId, false),
-      //   aiAdvisorService.getInsights(userId)
-      // ])
+      // const { data } = await dashboardService.get(userId)
+      // (resumo, orçamentos, metas e insights em uma única requisição)
 
       // Por enquanto, usar dados mock
       setSummary(mockData.summary)
@@ -127,9 +127,10 @@ const Transactions = ({ userId }) => {
     try {
       // Em um cenário real, você faria:
       // const [transactionsRes, categoriesRes] = await Promise.all([
-      //   transactionService.getAll(userId),
+      //   transactionService.getPage(userId, { type, category_id, search }),
       //   categoryService.getAll(userId)
       // ])
+      // (filtros e totais calculados no servidor; próximas páginas com next_cursor)
       
       // Por enquanto, usar dados mock
       setTransactions(mockTransactions)
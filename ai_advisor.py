@@ -1,13 +1,79 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timedelta
 from src.models.user import db
-from src.models.transaction import Transaction
 from src.models.category import Category
 from src.models.budget import Budget, Goal
+from src.services.rollups import summarize_since
+from src.services.response_cache import cached_by_data_version
+from src.services.keyword_matcher import KeywordMatcher
+from src.services.instrumentation import timed
+from functools import cached_property
 import json
 
 ai_advisor_bp = Blueprint('ai_advisor', __name__)
 
+def active_budget_count_query(user_id):
+    return db.session.query(db.func.count(Budget.id)).filter(
+        Budget.user_id == user_id,
+        Budget.is_active == True
+    )
+
+def pending_goal_count_query(user_id):
+    return db.session.query(db.func.count(Goal.id)).filter(
+        Goal.user_id == user_id,
+        Goal.is_achieved == False
+    )
+
+def budget_analysis_query(user_id):
+    """Orçamentos ativos com o nome da categoria; gasto e situação já estão gravados no orçamento"""
+    return db.session.query(
+        Budget,
+        Category.name
+    ).outerjoin(
+        Category, Category.id == Budget.category_id
+    ).filter(
+        Budget.user_id == user_id,
+        Budget.is_active == True
+    ).order_by(Budget.id)
+
+# Temas do chat em ordem de prioridade (o primeiro tema encontrado vence)
+CHAT_INTENTS = {
+    'emergency_fund': ['reserva', 'emergência', 'emergencia'],
+    'debt_management': ['dívida', 'divida', 'dever', 'cartão', 'cartao'],
+    'investment_basics': ['investir', 'investimento', 'aplicar', 'render'],
+    'budgeting': ['orçamento', 'orcamento', 'controlar', 'gastar'],
+    'saving': ['economizar', 'poupar', 'guardar'],
+    'goals': ['meta', 'objetivo', 'sonho']
+}
+
+# Todas as palavras-chave em um único autômato, compilado uma vez
+CHAT_INTENT_MATCHER = KeywordMatcher(CHAT_INTENTS, str.lower)
+
+class LazyUserAnalysis:
+    """Totais do usuário calculados somente quando a resposta precisar deles"""
+    
+    def __init__(self, user_id):
+        self.user_id = user_id
+    
+    @cached_property
+    def summary(self):
+        try:
+            return summarize_since(self.user_id, datetime.utcnow() - timedelta(days=90))
+        except Exception:
+            return None
+    
+    @property
+    def balance(self):
+        return self.summary['balance'] if self.summary else None
+    
+    @property
+    def total_expense(self):
+        return self.summary['total_expense'] if self.summary else None
+    
+    @property
+    def expense_by_category(self):
+        return self.summary['expense_by_category'] if self.summary else None
+
 class FinancialAdvisor:
     """Classe para simular o assessor financeiro IA"""
     
@@ -31,46 +97,69 @@ class FinancialAdvisor:
             }
         }
     
+    @timed('advisor')
     def analyze_user_finances(self, user_id):
         """Analisar as finanças do usuário"""
         try:
-            # Obter transações dos últimos 3 meses
+            # Totais dos últimos 3 meses a partir dos rollups mensais
             three_months_ago = datetime.utcnow() - timedelta(days=90)
-            transactions = Transaction.query.filter(
-                Transaction.user_id == user_id,
-                Transaction.date >= three_months_ago
-            ).all()
-            
-            # Calcular totais
-            total_income = sum(t.amount for t in transactions if t.transaction_type == 'income')
-            total_expense = sum(t.amount for t in transactions if t.transaction_type == 'expense')
-            balance = total_income - total_expense
+            summary = summarize_since(user_id, three_months_ago)
             
-            # Analisar gastos por categoria
-            expense_by_category = {}
-            for transaction in transactions:
-                if transaction.transaction_type == 'expense':
-                    category_name = transaction.category.name if transaction.category else 'Sem categoria'
-                    expense_by_category[category_name] = expense_by_category.get(category_name, 0) + transaction.amount
+            # Contar orçamentos ativos e metas pendentes no banco
+            active_budgets = active_budget_count_query(user_id).scalar()
+            pending_goals = pending_goal_count_query(user_id).scalar()
             
-            # Obter orçamentos ativos
-            active_budgets = Budget.query.filter_by(user_id=user_id, is_active=True).all()
-            
-            # Obter metas
-            goals = Goal.query.filter_by(user_id=user_id, is_achieved=False).all()
-            
-            return {
-                'total_income': total_income,
-                'total_expense': total_expense,
-                'balance': balance,
-                'expense_by_category': expense_by_category,
-                'active_budgets': len(active_budgets),
-                'pending_goals': len(goals),
-                'transaction_count': len(transactions)
-            }
+            return self.build_user_analysis(summary, active_budgets, pending_goals)
         except Exception as e:
             return None
     
+    def build_user_analysis(self, summary, active_budgets, pending_goals):
+        """Montar a análise a partir dos totais e das contagens já calculados"""
+        return {
+            'total_income': summary['total_income'],
+            'total_expense': summary['total_expense'],
+            'balance': summary['balance'],
+            'expense_by_category': summary['expense_by_category'],
+            'active_budgets': active_budgets,
+            'pending_goals': pending_goals,
+            'transaction_count': summary['transaction_count']
+        }
+    
+    @timed('advisor')
+    def analyze_budgets(self, user_id):
+        """Uso de cada orçamento ativo no período"""
+        # Gasto e situação são mantidos no próprio orçamento a cada despesa gravada: só uma leitura
+        budget_rows = budget_analysis_query(user_id).all()
+        
+        budget_analysis = []
+        
+        for budget, category_name in budget_rows:
+            spent_amount = budget.spent_amount
+            usage_percentage = budget.usage_percentage
+            status = budget.status
+            
+            # Gerar análise
+            if status == 'exceeded':
+                message = f"⚠️ Orçamento de '{category_name}' ultrapassado em {usage_percentage - 100:.1f}%"
+            elif status == 'warning':
+                message = f"⚡ Orçamento de '{category_name}' quase no limite ({usage_percentage:.1f}%)"
+            else:
+                message = f"✅ Orçamento de '{category_name}' sob controle ({usage_percentage:.1f}%)"
+            
+            budget_analysis.append({
+                'budget_id': budget.id,
+                'budget_name': budget.name,
+                'category_name': category_name,
+                'budget_amount': budget.amount,
+                'spent_amount': spent_amount,
+                'usage_percentage': round(usage_percentage, 2),
+                'status': status,
+                'message': message
+            })
+        
+        return budget_analysis
+    
+    @timed('advisor')
     def generate_insights(self, user_analysis):
         """Gerar insights baseados na análise financeira"""
         insights = []
@@ -100,45 +189,53 @@ class FinancialAdvisor:
         
         return insights
     
+    def classify_question(self, question):
+        """Identificar o tema da pergunta em uma única passada"""
+        matches = CHAT_INTENT_MATCHER.match(question.lower())
+        return next(iter(matches), None)
+    
+    @timed('advisor')
     def answer_question(self, question, user_id=None):
         """Responder perguntas sobre finanças"""
-        question_lower = question.lower()
+        intent = self.classify_question(question)
         
-        # Análise do usuário se fornecido
-        user_analysis = None
-        if user_id:
-            user_analysis = self.analyze_user_finances(user_id)
+        # Análise do usuário, calculada apenas se o tema precisar dela
+        user_analysis = LazyUserAnalysis(user_id) if user_id else None
         
-        # Respostas baseadas em palavras-chave
-        if any(word in question_lower for word in ['reserva', 'emergência', 'emergencia']):
+        # Respostas baseadas no tema identificado
+        if intent == 'emergency_fund':
             response = self.knowledge_base['emergency_fund']['recommendation']
-            if user_analysis and user_analysis['balance'] > 0:
-                response += f" Com base no seu saldo atual, considere separar parte dos seus R$ {user_analysis['balance']:.2f} para a reserva."
+            balance = user_analysis.balance if user_analysis else None
+            if balance is not None and balance > 0:
+                response += f" Com base no seu saldo atual, considere separar parte dos seus R$ {balance:.2f} para a reserva."
             return response
         
-        elif any(word in question_lower for word in ['dívida', 'divida', 'dever', 'cartão', 'cartao']):
+        elif intent == 'debt_management':
             return self.knowledge_base['debt_management']['recommendation']
         
-        elif any(word in question_lower for word in ['investir', 'investimento', 'aplicar', 'render']):
+        elif intent == 'investment_basics':
             response = self.knowledge_base['investment_basics']['recommendation']
-            if user_analysis and user_analysis['balance'] > 0:
-                response += f" Você tem R$ {user_analysis['balance']:.2f} de saldo positivo que poderia ser investido."
+            balance = user_analysis.balance if user_analysis else None
+            if balance is not None and balance > 0:
+                response += f" Você tem R$ {balance:.2f} de saldo positivo que poderia ser investido."
             return response
         
-        elif any(word in question_lower for word in ['orçamento', 'orcamento', 'controlar', 'gastar']):
+        elif intent == 'budgeting':
             response = self.knowledge_base['budgeting']['recommendation']
-            if user_analysis:
-                response += f" Seus gastos atuais são de R$ {user_analysis['total_expense']:.2f} nos últimos 3 meses."
+            total_expense = user_analysis.total_expense if user_analysis else None
+            if total_expense is not None:
+                response += f" Seus gastos atuais são de R$ {total_expense:.2f} nos últimos 3 meses."
             return response
         
-        elif any(word in question_lower for word in ['economizar', 'poupar', 'guardar']):
+        elif intent == 'saving':
             response = "Para economizar, analise seus gastos e identifique onde pode cortar. Comece com pequenas mudanças."
-            if user_analysis and user_analysis['expense_by_category']:
-                highest_category = max(user_analysis['expense_by_category'], key=user_analysis['expense_by_category'].get)
+            expense_by_category = user_analysis.expense_by_category if user_analysis else None
+            if expense_by_category:
+                highest_category = max(expense_by_category, key=expense_by_category.get)
                 response += f" Sua maior categoria de gastos é '{highest_category}', talvez seja um bom lugar para começar."
             return response
         
-        elif any(word in question_lower for word in ['meta', 'objetivo', 'sonho']):
+        elif intent == 'goals':
             return "Definir metas financeiras é essencial! Seja específico, defina prazos e acompanhe o progresso regularmente."
         
         else:
@@ -172,6 +269,7 @@ def chat_with_advisor():
         return jsonify({'error': str(e)}), 500
 
 @ai_advisor_bp.route('/ai-advisor/insights', methods=['GET'])
+@cached_by_data_version
 def get_financial_insights():
     """Obter insights financeiros personalizados"""
     try:
@@ -198,6 +296,7 @@ def get_financial_insights():
         return jsonify({'error': str(e)}), 500
 
 @ai_advisor_bp.route('/ai-advisor/suggestions', methods=['GET'])
+@cached_by_data_version
 def get_suggestions():
     """Obter sugestões de economia e otimização"""
     try:
@@ -258,6 +357,7 @@ def get_suggestions():
         return jsonify({'error': str(e)}), 500
 
 @ai_advisor_bp.route('/ai-advisor/budget-analysis', methods=['GET'])
+@cached_by_data_version
 def analyze_budget_performance():
     """Analisar performance dos orçamentos"""
     try:
@@ -265,48 +365,14 @@ def analyze_budget_performance():
         if not user_id:
             return jsonify({'error': 'user_id é obrigatório'}), 400
         
-        # Obter orçamentos ativos
-        active_budgets = Budget.query.filter_by(user_id=user_id, is_active=True).all()
-        
-        budget_analysis = []
+        # Inicializar o assessor
+        advisor = FinancialAdvisor()
         
-        for budget in active_budgets:
-            # Calcular gastos no período do orçamento
-            spent_amount = db.session.query(db.func.sum(Transaction.amount)).filter(
-                Transaction.user_id == user_id,
-                Transaction.category_id == budget.category_id,
-                Transaction.transaction_type == 'expense',
-                Transaction.date >= budget.start_date,
-                Transaction.date <= budget.end_date
-            ).scalar() or 0
-            
-            usage_percentage = (spent_amount / budget.amount * 100) if budget.amount > 0 else 0
-            
-            # Gerar análise
-            if usage_percentage > 100:
-                status = 'exceeded'
-                message = f"⚠️ Orçamento de '{budget.category.name}' ultrapassado em {usage_percentage - 100:.1f}%"
-            elif usage_percentage > 80:
-                status = 'warning'
-                message = f"⚡ Orçamento de '{budget.category.name}' quase no limite ({usage_percentage:.1f}%)"
-            else:
-                status = 'good'
-                message = f"✅ Orçamento de '{budget.category.name}' sob controle ({usage_percentage:.1f}%)"
-            
-            budget_analysis.append({
-                'budget_id': budget.id,
-                'budget_name': budget.name,
-                'category_name': budget.category.name,
-                'budget_amount': budget.amount,
-                'spent_amount': spent_amount,
-                'usage_percentage': round(usage_percentage, 2),
-                'status': status,
-                'message': message
-            })
+        budget_analysis = advisor.analyze_budgets(user_id)
         
         return jsonify({
             'budget_analysis': budget_analysis,
-            'total_budgets': len(active_budgets),
+            'total_budgets': len(budget_analysis),
             'timestamp': datetime.utcnow().isoformat()
         }), 200
         
@@ -0,0 +1,72 @@
+from array import array
+from datetime import date
+from typing import Dict, Iterable, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional; sem ele a soma por grupo é feita em Python
+    np = None
+
+def month_index(value) -> int:
+    """Mês como inteiro (ano * 12 + mês - 1), usado como chave compacta"""
+    return value.year * 12 + value.month - 1
+
+def month_from_index(index: int) -> date:
+    """Primeiro dia do mês representado por month_index"""
+    return date(index // 12, index % 12 + 1, 1)
+
+class AmountColumns:
+    """Chaves inteiras e valores em centavos guardados em colunas int64 compactas"""
+
+    def __init__(self, key_names: Sequence[str]):
+        self.key_names = tuple(key_names)
+        self.keys = [array('q') for _ in self.key_names]
+        self.cents = array('q')
+
+    def __len__(self):
+        return len(self.cents)
+
+    def append(self, keys: Sequence[int], cents: int):
+        for column, key in zip(self.keys, keys):
+            column.append(key)
+        self.cents.append(cents)
+
+    def extend(self, rows: Iterable[Sequence[int]]):
+        """Adicionar linhas no formato (*chaves, centavos)"""
+        for row in rows:
+            self.append(row[:-1], row[-1])
+
+    def group_sums(self) -> Dict[Tuple[int, ...], Tuple[int, int]]:
+        """Somar os centavos e contar as linhas de cada combinação de chaves"""
+        if not self.cents:
+            return {}
+        if np is not None:
+            return self._group_sums_numpy()
+
+        groups: Dict[Tuple[int, ...], list] = {}
+        for row in zip(*self.keys, self.cents):
+            totals = groups.get(row[:-1])
+            if totals is None:
+                groups[row[:-1]] = [row[-1], 1]
+            else:
+                totals[0] += row[-1]
+                totals[1] += 1
+        return {key: (total, count) for key, (total, count) in groups.items()}
+
+    def _group_sums_numpy(self):
+        # Ordenar pelas chaves e somar cada trecho contíguo em int64 (sem passar por float)
+        row_count = len(self.cents)
+        keys = [np.frombuffer(column, dtype=np.int64) for column in self.keys]
+        order = np.lexsort(keys[::-1])
+        sorted_keys = [column[order] for column in keys]
+
+        starts_mask = np.zeros(row_count, dtype=bool)
+        starts_mask[0] = True
+        for column in sorted_keys:
+            starts_mask[1:] |= column[1:] != column[:-1]
+        starts = np.flatnonzero(starts_mask)
+
+        totals = np.add.reduceat(np.frombuffer(self.cents, dtype=np.int64)[order], starts)
+        counts = np.diff(np.append(starts, row_count))
+        group_keys = zip(*(column[starts].tolist() for column in sorted_keys))
+        return dict(zip(group_keys, zip(totals.tolist(), counts.tolist())))
@@ -58,6 +58,31 @@ export const transactionService = {
     const params = new URLSearchParams({ user_id: userId, ...filters })
     return api.get(`/transactions/summary?${params}`)
   },
+  // filters: type, category_id, start_date, end_date, search; cursor vem de next_cursor da página anterior
+  getPage: (userId, filters = {}, cursor = null, limit = 50) => {
+    const params = new URLSearchParams({ user_id: userId, limit, ...filters })
+    if (cursor) params.append('cursor', cursor)
+    return api.get(`/transactions/page?${params}`)
+  },
+  search: (userId, query, limit = 20) => {
+    const params = new URLSearchParams({ user_id: userId, q: query, limit })
+    return api.get(`/transactions/search?${params}`)
+  },
+  exportUrl: (userId, filters = {}) => {
+    const params = new URLSearchParams({ user_id: userId, ...filters })
+    return `${API_BASE_URL}/transactions/export?${params}`
+  },
+  // changes: { create: [...], update: [{ id, ...campos }], delete: [ids] }; options: auto_categorize, atomic
+  bulk: (userId, changes, options = {}) => 
+    api.post('/transactions/bulk', { user_id: userId, ...changes, ...options }),
+  // file: arquivo .ofx ou .csv; a resposta traz imported, duplicates, categorized e errors
+  importStatement: (userId, file, format = null) => {
+    const formData = new FormData()
+    formData.append('user_id', userId)
+    formData.append('file', file)
+    if (format) formData.append('format', format)
+    return api.post('/transactions/import', formData)
+  },
 }
 
 // ===== SERVIÇOS DE CATEGORIAS =====
@@ -106,8 +131,20 @@ export const categorizationService = {
     api.post('/categorization/auto-categorize', { description, amount, user_id: userId }),
   batchCategorize: (userId, limit = 100) => 
     api.post('/categorization/batch-categorize', { user_id: userId, limit }),
+  startJob: (userId, chunkSize = 500) => 
+    api.post('/categorization/jobs', { user_id: userId, chunk_size: chunkSize }),
+  getJob: (jobId) => 
+    api.get(`/categorization/jobs/${jobId}`),
+  cancelJob: (jobId) => 
+    api.post(`/categorization/jobs/${jobId}/cancel`),
+  resumeJob: (jobId) => 
+    api.post(`/categorization/jobs/${jobId}/resume`),
   createRule: (userId, keyword, categoryId) => 
     api.post('/categorization/create-rule', { user_id: userId, keyword, category_id: categoryId }),
+  getRules: (userId) => 
+    api.get(`/categorization/rules?user_id=${userId}`),
+  deleteRule: (ruleId, userId) => 
+    api.delete(`/categorization/rules/${ruleId}?user_id=${userId}`),
   analyzePatterns: (userId) => 
     api.get(`/categorization/analyze-patterns?user_id=${userId}`),
 }
@@ -124,5 +161,30 @@ export const aiAdvisorService = {
     api.get(`/ai-advisor/budget-analysis?user_id=${userId}`),
 }
 
+// ===== SERVIÇO DO DASHBOARD =====
+export const dashboardService = {
+  // fields: lista opcional entre 'summary', 'budgets', 'goals' e 'insights'
+  get: (userId, fields = null) => {
+    const params = new URLSearchParams({ user_id: userId })
+    if (fields) params.append('fields', fields.join(','))
+    return api.get(`/dashboard?${params}`)
+  },
+}
+
+// ===== SERVIÇOS DE RELATÓRIOS =====
+export const reportService = {
+  // Resposta colunar: buckets, income, expense e balance são listas paralelas
+  timeseries: (userId, { granularity = 'month', startDate, endDate, categoryIds } = {}) => 
+    api.get('/reports/timeseries', {
+      params: {
+        user_id: userId,
+        granularity,
+        start_date: startDate,
+        end_date: endDate,
+        category_id: categoryIds && categoryIds.length ? categoryIds.join(',') : undefined,
+      },
+    }),
+}
+
 export default api
 
@@ -0,0 +1 @@
+"""Benchmarks de desempenho do backend do FinanceFlow"""
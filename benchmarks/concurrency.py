@@ -0,0 +1,149 @@
+"""Benchmark de concorrência do SQLite: leituras do dashboard durante gravações em lote.
+
+Roda a mesma carga nos perfis de armazenamento 'default' (journal de rollback,
+configurações do driver) e 'tuned' (WAL, pragmas e pool) e compara vazão,
+latência das leituras e erros "database is locked".
+
+Uso: python -m benchmarks.concurrency [--scale 10k] [--seconds 5] [--readers 4]
+                                      [--writers 1] [--write-batch 500] [--output resultado.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.dataset import SCALES, DatasetSpec, generate_dataset
+from benchmarks.query_plans import create_app
+from benchmarks.suite import percentile
+from src.models.user import db
+
+def read_dashboard(user_id: int):
+    """Leituras de uma abertura do dashboard: resumo do período e primeira página de transações"""
+    from src.services.rollups import summarize_since
+    from src.services.transaction_queries import TransactionFilters, list_transactions_page
+    summarize_since(user_id, datetime.utcnow() - timedelta(days=90))
+    list_transactions_page(user_id, TransactionFilters(), limit=50)
+
+def write_batch(user_id: int, size: int, rng: random.Random):
+    """Uma gravação em lote pelo ORM (rollups, índice de busca e versões atualizados na mesma transação)"""
+    from src.models.transaction import Transaction
+    now = datetime.utcnow()
+    db.session.add_all([
+        Transaction(
+            user_id=user_id,
+            description=f'COMPRA LOTE {rng.randint(1, 10 ** 6)}',
+            amount=-rng.randint(100, 50000) / 100,
+            transaction_type='expense',
+            date=now - timedelta(days=rng.randint(0, 60))
+        )
+        for _ in range(size)
+    ])
+    db.session.commit()
+
+def worker(uri, profile, kind, users, batch_size, seconds, seed, barrier, queue):
+    """Um processo leitor ou escritor, como um worker do servidor de aplicação"""
+    app = create_app(uri, {'STORAGE_PROFILE': profile})
+    if kind == 'reads':
+        operation = lambda user_id, rng: read_dashboard(user_id)
+    else:
+        operation = lambda user_id, rng: write_batch(user_id, batch_size, rng)
+    rng = random.Random(seed)
+    latencies, errors = [], 0
+    with app.app_context():
+        # Aquecimento fora da medição (imports, caches e conexão do pool)
+        read_dashboard(1)
+        db.session.remove()
+        barrier.wait()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                operation(rng.randint(1, users), rng)
+                latencies.append(time.perf_counter() - start)
+            except OperationalError:
+                errors += 1
+                db.session.rollback()
+            finally:
+                db.session.remove()
+    queue.put((kind, latencies, errors))
+
+def run_profile(profile: str, spec: DatasetSpec, args) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        uri = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        app = create_app(uri, {'STORAGE_PROFILE': profile})
+        with app.app_context():
+            generate_dataset(spec)
+            journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+            db.session.remove()
+            db.engine.dispose()
+
+        # Processos, e não threads: leituras e gravações disputam só o banco, não o GIL
+        context = multiprocessing.get_context('spawn')
+        kinds = ['reads'] * args.readers + ['writes'] * args.writers
+        barrier = context.Barrier(len(kinds))
+        queue = context.Queue()
+        processes = [
+            context.Process(target=worker, args=(
+                uri, profile, kind, spec.users, args.write_batch, args.seconds, seed, barrier, queue
+            ))
+            for seed, kind in enumerate(kinds)
+        ]
+        for process in processes:
+            process.start()
+        results = {kind: {'latencies': [], 'errors': 0} for kind in ('reads', 'writes')}
+        for _ in processes:
+            kind, latencies, errors = queue.get()
+            results[kind]['latencies'].extend(latencies)
+            results[kind]['errors'] += errors
+        for process in processes:
+            process.join()
+
+    summary = {'journal_mode': journal_mode}
+    for kind, result in results.items():
+        latencies = sorted(result['latencies'])
+        summary[kind] = {
+            'operations': len(latencies),
+            'per_second': round(len(latencies) / args.seconds, 1),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+            'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+            'locked_errors': result['errors'],
+        }
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', default='10k', help=f"Uma de: {', '.join(SCALES)}")
+    parser.add_argument('--users', type=int, default=None)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=1)
+    parser.add_argument('--write-batch', type=int, default=500)
+    parser.add_argument('--output', help='Arquivo JSON com os resultados')
+    args = parser.parse_args()
+
+    spec = DatasetSpec.from_scale(args.scale, users=args.users)
+    results = {profile: run_profile(profile, spec, args) for profile in ('default', 'tuned')}
+
+    print(f'{spec.transactions} transações, {args.readers} leitores e {args.writers} escritor(es) '
+          f'({args.write_batch} linhas por lote) por {args.seconds:g} s')
+    for profile, summary in results.items():
+        print(f"  perfil {profile} (journal_mode={summary['journal_mode']})")
+        for kind in ('reads', 'writes'):
+            item = summary[kind]
+            print(f"    {kind:<7} {item['per_second']:>8.1f}/s  p50 {item['p50_ms']} ms  p95 {item['p95_ms']} ms  "
+                  f"p99 {item['p99_ms']} ms  máx {item['max_ms']} ms  locked {item['locked_errors']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump({'spec': spec.to_dict(), 'args': vars(args), 'profiles': results}, output, indent=2)
+
+if __name__ == '__main__':
+    main()
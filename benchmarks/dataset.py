@@ -0,0 +1,254 @@
+"""Gerador determinístico de dados sintéticos para os benchmarks.
+
+Cria usuários, categorias padrão e personalizadas, regras, orçamentos, metas e
+transações com descrições de estabelecimentos brasileiros. A mesma semente e a
+mesma data de referência produzem sempre o mesmo banco.
+
+Uso: python -m benchmarks.dataset --scale 100k --database sqlite:////tmp/bench.db
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from src.models.user import db
+
+# Número de transações de cada escala
+SCALES = {
+    '1k': 1_000,
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000,
+}
+# Transações por usuário quando o número de usuários não é informado
+TRANSACTIONS_PER_USER = 2000
+INSERT_BATCH_SIZE = 10_000
+HISTORY_DAYS = 365
+# Fração das transações gravadas sem categoria (alimenta a categorização em lote)
+UNCATEGORIZED_RATIO = 0.2
+
+DEFAULT_CATEGORIES = {
+    'expense': ['Alimentação', 'Transporte', 'Moradia', 'Saúde', 'Educação', 'Lazer', 'Compras', 'Serviços'],
+    'income': ['Salário', 'Freelance', 'Investimentos', 'Vendas'],
+}
+
+CUSTOM_CATEGORIES = ['Pets', 'Presentes', 'Academia', 'Viagens', 'Assinaturas', 'Filhos']
+
+CITIES = ['SAO PAULO', 'RIO DE JANEIRO', 'BELO HORIZONTE', 'CURITIBA', 'PORTO ALEGRE', 'RECIFE', 'SALVADOR', 'CAMPINAS']
+NAMES = ['SILVA', 'SANTOS', 'OLIVEIRA', 'SOUZA', 'PEREIRA', 'LIMA', 'COSTA', 'FERREIRA', 'ALMEIDA', 'RIBEIRO']
+
+# Modelos de descrição por categoria; {name} e {city} são sorteados
+MERCHANTS = {
+    'Alimentação': [
+        'PADARIA PÃO DE {name}', 'SUPERMERCADO ZAFFARI', 'CARREFOUR {city}', 'PAO DE ACUCAR LJ {number}',
+        'IFOOD *RESTAURANTE {name}', 'UBER EATS *PEDIDO', 'MCDONALDS {city}', 'AÇOUGUE {name}',
+        'HORTIFRUTI {name}', 'RESTAURANTE SABOR DE MINAS', 'STARBUCKS {city}', 'BAR DO {name}'
+    ],
+    'Transporte': [
+        'UBER *TRIP', '99 *CORRIDA', 'POSTO IPIRANGA {city}', 'POSTO SHELL {number}', 'ESTACIONAMENTO {name}',
+        'SEM PARAR PEDAGIO', 'METRO {city}', 'AUTO MECANICA {name}'
+    ],
+    'Moradia': [
+        'ALUGUEL APTO {number}', 'CONDOMINIO EDIFICIO {name}', 'ENEL ENERGIA', 'SABESP AGUA', 'VIVO INTERNET',
+        'COMGAS', 'IPTU PARCELA {number}'
+    ],
+    'Saúde': [
+        'DROGARIA SÃO PAULO', 'DROGA RAIA {city}', 'FARMÁCIA {name}', 'LABORATORIO FLEURY', 'CLINICA DR {name}',
+        'UNIMED MENSALIDADE', 'DENTISTA DRA {name}'
+    ],
+    'Educação': [
+        'ESCOLA {name} MENSALIDADE', 'UDEMY CURSO', 'LIVRARIA CULTURA', 'FACULDADE {city}', 'CURSO DE INGLES {name}'
+    ],
+    'Lazer': [
+        'NETFLIX.COM', 'SPOTIFY', 'CINEMARK {city}', 'INGRESSO.COM', 'STEAM PURCHASE', 'BAR E RESTAURANTE {name}'
+    ],
+    'Compras': [
+        'AMAZON MARKETPLACE', 'MERCADOLIVRE*{name}', 'MAGAZINE LUIZA', 'RENNER {city}', 'AMERICANAS {number}',
+        'SHOPEE *{name}', 'ZARA {city}'
+    ],
+    'Serviços': [
+        'BARBEARIA {name}', 'LAVANDERIA {name}', 'CORREIOS AGENCIA {number}', 'CARTORIO {city}', 'TARIFA BANCARIA'
+    ],
+    'Salário': ['SALARIO EMPRESA {name} LTDA', 'PAGAMENTO SALARIO', 'ADIANTAMENTO SALARIAL'],
+    'Freelance': ['PIX RECEBIDO {name}', 'TED RECEBIDA {name}', 'PAGAMENTO PROJETO {number}'],
+    'Investimentos': ['RENDIMENTO POUPANCA', 'DIVIDENDOS {name}3', 'RESGATE CDB'],
+    'Vendas': ['VENDA MERCADOLIVRE', 'PIX VENDA {name}', 'VENDA OLX'],
+}
+
+# Faixas de valor (reais) por categoria
+AMOUNT_RANGES = {
+    'Alimentação': (8, 400), 'Transporte': (6, 350), 'Moradia': (80, 3500), 'Saúde': (15, 900),
+    'Educação': (30, 2000), 'Lazer': (20, 300), 'Compras': (15, 1500), 'Serviços': (10, 250),
+    'Salário': (2500, 15000), 'Freelance': (300, 5000), 'Investimentos': (10, 2000), 'Vendas': (30, 1500),
+}
+# Participação de cada categoria nas transações de um usuário
+CATEGORY_WEIGHTS = {
+    'Alimentação': 30, 'Transporte': 18, 'Moradia': 6, 'Saúde': 6, 'Educação': 3, 'Lazer': 10,
+    'Compras': 12, 'Serviços': 5, 'Salário': 3, 'Freelance': 3, 'Investimentos': 2, 'Vendas': 2,
+}
+
+def merchant_description(rng: random.Random, category_name: str) -> str:
+    """Descrição realista de um estabelecimento da categoria"""
+    template = rng.choice(MERCHANTS[category_name])
+    return template.format(name=rng.choice(NAMES), city=rng.choice(CITIES), number=rng.randint(1, 999))
+
+class DatasetSpec:
+    """Parâmetros do conjunto gerado"""
+
+    def __init__(self, transactions: int, users: int = None, seed: int = 42, as_of: date = None):
+        self.transactions = transactions
+        self.users = users or max(1, transactions // TRANSACTIONS_PER_USER)
+        self.seed = seed
+        # As análises usam janelas relativas a hoje: o histórico termina na data de referência
+        self.as_of = as_of or datetime.utcnow().date()
+
+    @classmethod
+    def from_scale(cls, scale: str, **kwargs):
+        if scale.lower() not in SCALES:
+            raise ValueError(f"Escala inválida: use {', '.join(SCALES)}")
+        return cls(SCALES[scale.lower()], **kwargs)
+
+    def to_dict(self):
+        return {
+            'transactions': self.transactions,
+            'users': self.users,
+            'seed': self.seed,
+            'as_of': self.as_of.isoformat()
+        }
+
+def _insert(connection, model, rows):
+    if rows:
+        connection.execute(model.__table__.insert(), rows)
+
+def generate_dataset(spec: DatasetSpec) -> dict:
+    """Popular o banco da aplicação atual; devolve o número de linhas criadas por tabela"""
+    from src.models.user import User
+    from src.models.category import Category
+    from src.models.transaction import Transaction
+    from src.models.budget import Budget, Goal
+    from src.models.categorization_rule import CategorizationRule
+    from src.services.rollups import rebuild_rollups
+    from src.services.budget_tracking import recount_budgets
+    from src.services.transaction_search import rebuild_search_index
+    from src.services.statement_importer import transaction_fingerprint
+    from src.services.text_normalization import normalize_text
+    from src.services.transaction_classifier import rebuild_user_model
+
+    rng = random.Random(spec.seed)
+    connection = db.session.connection()
+    now = datetime.combine(spec.as_of, datetime.min.time())
+    counts = {}
+
+    _insert(connection, User, [
+        {'id': user_id, 'name': f'Usuário {user_id}', 'email': f'usuario{user_id}@example.com',
+         'password_hash': 'x', 'created_at': now, 'updated_at': now, 'is_active': True}
+        for user_id in range(1, spec.users + 1)
+    ])
+    counts['users'] = spec.users
+
+    # Categorias padrão (compartilhadas) e de 0 a 2 personalizadas por usuário
+    categories = []
+    for category_type, names in DEFAULT_CATEGORIES.items():
+        for name in names:
+            categories.append({'id': len(categories) + 1, 'name': name, 'category_type': category_type,
+                               'is_default': True, 'user_id': None, 'created_at': now, 'updated_at': now})
+    default_ids = {category['name']: category['id'] for category in categories}
+    custom_by_user = {}
+    for user_id in range(1, spec.users + 1):
+        for name in rng.sample(CUSTOM_CATEGORIES, rng.randint(0, 2)):
+            categories.append({'id': len(categories) + 1, 'name': name, 'category_type': 'expense',
+                               'is_default': False, 'user_id': user_id, 'created_at': now, 'updated_at': now})
+            custom_by_user.setdefault(user_id, []).append(categories[-1]['id'])
+    _insert(connection, Category, categories)
+    counts['categories'] = len(categories)
+
+    # Regras personalizadas: um estabelecimento frequente apontando para uma categoria do usuário
+    rules = []
+    for user_id, category_ids in custom_by_user.items():
+        keyword = rng.choice(['PETZ', 'COBASI', 'SMART FIT', 'DECOLAR', 'AMAZON PRIME'])
+        rules.append({'user_id': user_id, 'keyword': keyword, 'normalized_keyword': normalize_text(keyword),
+                      'category_id': category_ids[0], 'created_at': now, 'updated_at': now})
+    _insert(connection, CategorizationRule, rules)
+    counts['categorization_rules'] = len(rules)
+
+    budgets, goals = [], []
+    month_start = spec.as_of.replace(day=1)
+    for user_id in range(1, spec.users + 1):
+        for name in rng.sample(DEFAULT_CATEGORIES['expense'], rng.randint(3, 6)):
+            budgets.append({'user_id': user_id, 'category_id': default_ids[name], 'name': f'Orçamento {name}',
+                            'amount': rng.randint(3, 40) * 50, 'period': 'monthly',
+                            'start_date': datetime.combine(month_start, datetime.min.time()),
+                            'end_date': datetime.combine(month_start, datetime.min.time()) + timedelta(days=30),
+                            'is_active': True, 'created_at': now, 'updated_at': now})
+        for index in range(rng.randint(1, 3)):
+            target = rng.randint(10, 500) * 100
+            goals.append({'user_id': user_id, 'name': rng.choice(['Reserva de emergência', 'Viagem', 'Carro novo', 'Entrada do apartamento']),
+                          'target_amount': target, 'current_amount': rng.randint(0, target // 100) * 100,
+                          'target_date': now + timedelta(days=rng.randint(60, 900)), 'is_achieved': False,
+                          'created_at': now, 'updated_at': now})
+    _insert(connection, Budget, budgets)
+    _insert(connection, Goal, goals)
+    counts['budgets'] = len(budgets)
+    counts['goals'] = len(goals)
+
+    # Transações em lotes, distribuídas entre os usuários; memória constante em qualquer escala
+    category_names = list(CATEGORY_WEIGHTS)
+    weights = [CATEGORY_WEIGHTS[name] for name in category_names]
+    batch = []
+    for index in range(spec.transactions):
+        user_id = index % spec.users + 1
+        category_name = rng.choices(category_names, weights)[0]
+        category_type = 'income' if category_name in DEFAULT_CATEGORIES['income'] else 'expense'
+        low, high = AMOUNT_RANGES[category_name]
+        amount_cents = rng.randint(low * 100, high * 100)
+        if category_type == 'expense':
+            amount_cents = -amount_cents
+        when = now - timedelta(days=rng.randint(0, HISTORY_DAYS), minutes=rng.randint(0, 1439))
+        description = merchant_description(rng, category_name)
+        category_id = None if rng.random() < UNCATEGORIZED_RATIO else default_ids[category_name]
+        batch.append({
+            'user_id': user_id, 'description': description, 'amount': amount_cents / 100,
+            'transaction_type': category_type, 'category_id': category_id, 'date': when,
+            'dedup_hash': transaction_fingerprint(user_id, when, amount_cents, description),
+            'created_at': when, 'updated_at': when
+        })
+        if len(batch) >= INSERT_BATCH_SIZE:
+            _insert(connection, Transaction, batch)
+            batch = []
+    _insert(connection, Transaction, batch)
+    counts['transactions'] = spec.transactions
+
+    # Estruturas derivadas recalculadas de uma vez, como nas migrações
+    rebuild_rollups(connection)
+    recount_budgets(connection)
+    rebuild_search_index(connection)
+    for user_id in range(1, spec.users + 1):
+        rebuild_user_model(user_id, normalize_text)
+    db.session.commit()
+    return counts
+
+def main():
+    from benchmarks.query_plans import create_app
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', default='10k', help=f"Uma de: {', '.join(SCALES)}")
+    parser.add_argument('--users', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--as-of', type=date.fromisoformat, default=None, help='Data final do histórico (AAAA-MM-DD)')
+    parser.add_argument('--database', default='sqlite://', help='URI do banco (vazio recomendado)')
+    args = parser.parse_args()
+
+    spec = DatasetSpec.from_scale(args.scale, users=args.users, seed=args.seed, as_of=args.as_of)
+    app = create_app(args.database)
+    with app.app_context():
+        start = time.perf_counter()
+        counts = generate_dataset(spec)
+        elapsed = time.perf_counter() - start
+
+    print(f'Gerado em {elapsed:.1f} s ({spec.to_dict()})')
+    for table, count in counts.items():
+        print(f'  {table:<22} {count:>10}')
+
+if __name__ == '__main__':
+    main()
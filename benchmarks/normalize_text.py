@@ -0,0 +1,85 @@
+"""Micro-benchmark de normalize_text: implementação antiga (nove re.sub) x tabela + cache.
+
+Uso: python -m benchmarks.normalize_text [--descriptions 20000] [--unique 800] [--repeat 5]
+"""
+import argparse
+import random
+import re
+import time
+
+from src.services.text_normalization import _normalize, normalize_text
+
+MERCHANTS = [
+    'PADARIA PÃO DOURADO', 'SUPERMERCADO ZAFFARI', 'UBER *TRIP', 'IFOOD *RESTAURANTE SABOR',
+    'POSTO IPIRANGA', 'FARMÁCIA SÃO JOÃO', 'NETFLIX.COM', 'SPOTIFY BRASIL', 'CONDOMÍNIO ED. AÇORES',
+    'ELETROPAULO ENERGIA', 'DROGARIA ARAÚJO', 'ACADEMIA SMART FIT', 'LOJAS RENNER', 'MERCADO LIVRE',
+    'PIX RECEBIDO - SALÁRIO', 'TED FOLHA PAGAMENTO', 'RENDIMENTO POUPANÇA', 'PEDÁGIO SEM PARAR'
+]
+
+def legacy_normalize_text(text: str) -> str:
+    """Implementação anterior, mantida aqui apenas para comparação"""
+    if not text:
+        return ""
+    text = text.lower()
+    text = re.sub(r'[áàâãä]', 'a', text)
+    text = re.sub(r'[éèêë]', 'e', text)
+    text = re.sub(r'[íìîï]', 'i', text)
+    text = re.sub(r'[óòôõö]', 'o', text)
+    text = re.sub(r'[úùûü]', 'u', text)
+    text = re.sub(r'[ç]', 'c', text)
+    text = re.sub(r'[^a-z0-9\s]', ' ', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+def build_descriptions(total: int, unique: int, seed: int = 42):
+    """Gerar descrições no formato de extrato, com repetição de estabelecimentos"""
+    rng = random.Random(seed)
+    pool = [
+        f"{rng.choice(MERCHANTS)} {rng.randint(1, 999):03d} {rng.choice(['SP', 'RJ', 'BH', 'POA'])}"
+        for _ in range(unique)
+    ]
+    return [rng.choice(pool) for _ in range(total)]
+
+def measure(function, descriptions, repeat: int) -> float:
+    """Melhor tempo (s) de uma passada completa sobre as descrições"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for description in descriptions:
+            function(description)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--descriptions', type=int, default=20000)
+    parser.add_argument('--unique', type=int, default=800)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    descriptions = build_descriptions(args.descriptions, args.unique)
+
+    mismatches = sum(1 for d in descriptions if legacy_normalize_text(d) != normalize_text(d))
+    if mismatches:
+        raise SystemExit(f'{mismatches} descrições com saída diferente da implementação anterior')
+
+    def uncached(text):
+        return _normalize.__wrapped__(text) if text else ""
+
+    results = {
+        'legacy (9x re.sub)': measure(legacy_normalize_text, descriptions, args.repeat),
+        'translate + 1 regex': measure(uncached, descriptions, args.repeat),
+    }
+    _normalize.cache_clear()
+    results['translate + 1 regex + LRU'] = measure(normalize_text, descriptions, args.repeat)
+    cache_info = _normalize.cache_info()
+
+    baseline = results['legacy (9x re.sub)']
+    print(f"{len(descriptions)} descrições ({args.unique} distintas), melhor de {args.repeat}")
+    for name, elapsed in results.items():
+        throughput = len(descriptions) / elapsed
+        print(f"  {name:<28} {throughput:>12,.0f} ops/s  {baseline / elapsed:>6.1f}x")
+    print(f"  cache: {cache_info.hits} acertos, {cache_info.misses} faltas")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Verificação de regressão dos planos de consulta (SQLite).
+
+Executa EXPLAIN QUERY PLAN nas consultas quentes da API e falha se alguma
+delas varrer uma tabela inteira em vez de usar um índice.
+
+Uso: python -m benchmarks.query_plans
+Também roda na suíte de testes: python -m pytest tests/test_query_plans.py
+"""
+import re
+import sys
+from datetime import date, datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import text
+
+from src.models.user import db
+from src.models.storage import init_storage
+from src.models.migrations import run_migrations
+
+# Uma linha "SCAN <tabela>" sem índice indica leitura da tabela inteira
+FULL_SCAN = re.compile(r'\bSCAN (\w+)\b(?! USING (COVERING )?INDEX)')
+# Subconsultas (ex.: a janela ROW_NUMBER) aparecem como CO-ROUTINE/MATERIALIZE; ler o resultado delas não é varrer tabela
+SUBQUERY = re.compile(r'\b(?:CO-ROUTINE|MATERIALIZE) (\w+)')
+
+def create_app(database_uri: str = 'sqlite://', storage_environ=None):
+    """Aplicação mínima com o esquema completo (por padrão, SQLite em memória)"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Mesmo perfil de armazenamento de main.py, mas sem ler o ambiente do processo
+    init_storage(app, db, database_uri, storage_environ or {})
+
+    from src.models.user import User
+    from src.models.transaction import Transaction
+    from src.models.category import Category
+    from src.models.budget import Budget, Goal
+    from src.models.categorization_job import CategorizationJob
+    from src.models.categorization_rule import CategorizationRule
+    from src.models.categorization_model import CategorizationTokenCount, CategorizationCategoryCount
+    from src.models.monthly_rollup import MonthlyRollup
+    from src.models.user_data_version import UserDataVersion
+
+    with app.app_context():
+        db.create_all()
+        run_migrations(db.engine)
+    return app
+
+def hot_queries():
+    """Consultas quentes das rotas e serviços, montadas pelas mesmas funções que eles usam"""
+    from src.routes.ai_advisor import active_budget_count_query, pending_goal_count_query, budget_analysis_query
+    from src.routes.categorization import category_pattern_query, recent_descriptions_query
+    from src.services.budget_tracking import budget_candidates_query
+    from src.services.categorization_service import uncategorized_rows_query
+    from src.services.rollups import next_month, summary_edge_query, summary_rollup_query
+    from src.services.statement_importer import existing_hashes_query
+    from src.services.timeseries import timeseries_query
+    from src.services.transaction_queries import TransactionFilters, encode_cursor, transactions_page_query
+
+    user_id = 1
+    now = datetime.utcnow()
+    summary_start = now - timedelta(days=90)
+    first_full_month = next_month(summary_start)
+    return {
+        'summarize_since: trecho inicial pelas transações': summary_edge_query(
+            user_id, summary_start, datetime(first_full_month.year, first_full_month.month, 1)
+        ),
+        'summarize_since: meses completos pelos rollups': summary_rollup_query(user_id, first_full_month),
+        'analyze_user_finances: orçamentos ativos': active_budget_count_query(user_id),
+        'analyze_user_finances: metas pendentes': pending_goal_count_query(user_id),
+        'analyze_budgets: orçamentos ativos': budget_analysis_query(user_id),
+        'write_budget_deltas: orçamentos candidatos': budget_candidates_query([user_id], [1, 2]),
+        'batch_categorize: transações sem categoria': uncategorized_rows_query(user_id, 100),
+        'categorization job: próximo bloco (keyset)': uncategorized_rows_query(user_id, 500, after_id=500),
+        'analyze-patterns: agregação por categoria': category_pattern_query(user_id),
+        'analyze-patterns: descrições recentes por categoria': recent_descriptions_query(user_id, [1, 2]),
+        'import: hashes já existentes': existing_hashes_query(user_id, ['a' * 40, 'b' * 40], 1000),
+        'transactions/page: página seguinte (keyset)': transactions_page_query(
+            user_id, TransactionFilters(), encode_cursor(now, 1000), 50
+        ),
+        'reports/timeseries: semanas a partir das transações': timeseries_query(
+            user_id, (now - timedelta(days=365)).date(), now.date(), 'week'
+        ),
+        'reports/timeseries: meses a partir dos rollups': timeseries_query(
+            user_id, date(now.year - 3, 1, 1), date(now.year, 12, 31), 'month', use_rollups=True
+        ),
+    }
+
+def explain(query):
+    """Retornar as linhas do EXPLAIN QUERY PLAN de uma consulta"""
+    # Consultas do ORM expõem .statement; as do Core (ex.: orçamentos candidatos) já são o próprio statement
+    statement = getattr(query, 'statement', query)
+    statement = statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    rows = db.session.execute(text(f'EXPLAIN QUERY PLAN {statement}')).all()
+    return [row[-1] for row in rows]
+
+def check_query_plans(queries=None):
+    """Retornar {nome: (plano, tabelas varridas)} das consultas verificadas"""
+    results = {}
+    for name, query in (queries or hot_queries()).items():
+        plan = explain(query)
+        subqueries = {match.group(1) for line in plan for match in [SUBQUERY.search(line)] if match}
+        full_scans = [
+            match.group(1) for line in plan for match in [FULL_SCAN.search(line)]
+            if match and match.group(1) not in subqueries
+        ]
+        results[name] = (plan, full_scans)
+    return results
+
+def main():
+    app = create_app()
+    with app.app_context():
+        results = check_query_plans()
+
+    failures = 0
+    for name, (plan, full_scans) in results.items():
+        status = 'FALHA' if full_scans else 'ok'
+        failures += bool(full_scans)
+        print(f'[{status}] {name}')
+        for line in plan:
+            print(f'        {line}')
+    if failures:
+        print(f'{failures} consulta(s) com varredura completa de tabela')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
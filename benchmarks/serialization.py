@@ -0,0 +1,107 @@
+"""Benchmark da listagem de transações: to_dict() por objeto x tuplas com join + serialização rápida.
+
+Uso: python -m benchmarks.serialization [--transactions 5000] [--repeat 5]
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from benchmarks.query_plans import create_app
+from src.models.user import db
+from src.services import serialization
+from src.services.serialization import dumps, transaction_serializer
+
+def populate(transaction_count: int, seed: int = 42):
+    """Um usuário com categorias e transações distribuídas ao longo de um ano"""
+    from src.models.user import User
+    from src.models.category import Category
+    from src.models.transaction import Transaction
+
+    rng = random.Random(seed)
+    db.session.add(User(name='Benchmark', email='benchmark@example.com', password_hash='x'))
+    categories = [Category(name=f'Categoria {i}', category_type='expense', is_default=True) for i in range(20)]
+    db.session.add_all(categories)
+    db.session.flush()
+
+    # Importações em lote compartilham created_at/updated_at
+    batch_time = datetime(2025, 1, 1)
+    for i in range(transaction_count):
+        if i % 200 == 0:
+            batch_time += timedelta(hours=1)
+        db.session.add(Transaction(
+            user_id=1,
+            description=f'Compra {i}',
+            amount=round(rng.uniform(1, 500), 2),
+            transaction_type='expense',
+            category_id=rng.choice(categories).id,
+            date=batch_time - timedelta(days=rng.randint(0, 365)),
+            created_at=batch_time,
+            updated_at=batch_time
+        ))
+    db.session.commit()
+
+def count_queries(function):
+    """Executar a função contando as consultas enviadas ao banco"""
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        result = function()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return result, len(statements)
+
+def list_with_to_dict():
+    from src.models.transaction import Transaction
+    transactions = Transaction.query.filter_by(user_id=1).order_by(Transaction.date.desc()).all()
+    return json.dumps([transaction.to_dict() for transaction in transactions])
+
+def list_with_rows():
+    from src.models.transaction import Transaction
+    rows = transaction_serializer.query().filter(
+        Transaction.user_id == 1
+    ).order_by(Transaction.date.desc()).all()
+    return dumps(transaction_serializer.serialize_all(rows))
+
+def measure(function, repeat: int):
+    """Melhor tempo (s) e número de consultas, com a sessão limpa a cada rodada"""
+    best = float('inf')
+    queries = 0
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        _, queries = count_queries(function)
+        best = min(best, time.perf_counter() - start)
+    return best, queries
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        populate(args.transactions)
+
+        # As duas listagens devem produzir o mesmo conteúdo
+        if json.loads(list_with_to_dict()) != json.loads(list_with_rows()):
+            raise SystemExit('A serialização por tuplas difere de to_dict()')
+
+        results = {
+            'to_dict() por objeto': measure(list_with_to_dict, args.repeat),
+            'tuplas + join': measure(list_with_rows, args.repeat),
+        }
+
+    encoder = 'orjson' if serialization.orjson is not None else 'json'
+    baseline = results['to_dict() por objeto'][0]
+    print(f'{args.transactions} transações, melhor de {args.repeat} (encoder: {encoder})')
+    for name, (elapsed, queries) in results.items():
+        print(f'  {name:<22} {elapsed * 1000:>9.1f} ms  {queries:>5} consultas  {baseline / elapsed:>6.1f}x')
+
+if __name__ == '__main__':
+    main()
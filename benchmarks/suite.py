@@ -0,0 +1,316 @@
+"""Suíte de benchmarks por cenário: rotas /api (test client) e serviços chamados diretamente.
+
+Gera um banco sintético determinístico (benchmarks.dataset), executa cada cenário
+e grava p50/p95/p99, consultas por chamada e pico de memória em JSON, que pode
+ser comparado com um baseline salvo de uma execução anterior.
+
+Só entram cenários de leitura: rotas que gravam (importação, categorização em
+lote, jobs, CRUD) alterariam os dados entre as repetições.
+
+Uso: python -m benchmarks.suite [--scale 10k] [--calls 50] [--output resultados.json]
+                                [--baseline baseline.json] [--threshold 0.1] [--fail-on-regression]
+"""
+import argparse
+import importlib
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import sqlalchemy
+from sqlalchemy import event
+from werkzeug.exceptions import HTTPException
+
+from benchmarks.dataset import SCALES, DatasetSpec, generate_dataset
+from benchmarks.query_plans import create_app
+from src.models.user import db
+
+# (módulo, blueprint) registrados em /api, como em main.py
+ROUTE_BLUEPRINTS = (
+    ('src.routes.user', 'user_bp'),
+    ('src.routes.transaction', 'transaction_bp'),
+    ('src.routes.category', 'category_bp'),
+    ('src.routes.budget', 'budget_bp'),
+    ('src.routes.budget', 'goal_bp'),
+    ('src.routes.categorization', 'categorization_bp'),
+    ('src.routes.ai_advisor', 'ai_advisor_bp'),
+    ('src.routes.reports', 'reports_bp'),
+    ('src.routes.dashboard', 'dashboard_bp'),
+    ('src.routes.transaction_listing', 'transaction_listing_bp'),
+)
+
+QUESTIONS = [
+    'Quanto gastei este mês?',
+    'Como posso economizar mais?',
+    'Qual meu saldo atual?',
+    'Dicas de investimento para iniciantes',
+    'Como montar um orçamento?',
+]
+DESCRIPTIONS = [
+    ('PADARIA PÃO DE SILVA', -12.5), ('UBER *TRIP', -23.9), ('NETFLIX.COM', -55.9),
+    ('DROGA RAIA CAMPINAS', -87.3), ('SALARIO EMPRESA LIMA LTDA', 8500.0), ('MERCADOLIVRE*COSTA', -129.9),
+]
+
+class Scenario:
+    """Um caso medido; run(i) recebe o número da chamada para variar usuário e parâmetros"""
+
+    def __init__(self, name, kind, run):
+        self.name = name
+        self.kind = kind
+        self.run = run
+
+def build_scenarios(app, spec: DatasetSpec):
+    """Cenários medidos e nomes dos cenários HTTP deixados de fora por não haver rota registrada"""
+    from src.services.categorization_service import get_categorization_service, uncategorized_rows_query
+    from src.routes.ai_advisor import FinancialAdvisor
+    from src.services.timeseries import build_timeseries
+    from src.services.transaction_search import search_transaction_ids
+
+    def user(i):
+        return i % spec.users + 1
+
+    def description(i):
+        return DESCRIPTIONS[i % len(DESCRIPTIONS)]
+
+    end = spec.as_of
+    start = end - timedelta(days=365)
+    client = app.test_client()
+    adapter = app.url_map.bind('localhost')
+
+    def registered(method, url):
+        try:
+            adapter.match(url.split('?')[0], method=method)
+        except HTTPException:
+            return False
+        return True
+
+    def get(url):
+        def run(i):
+            response = client.get(url.format(user=user(i), start=start.isoformat(), end=end.isoformat()))
+            # Consumir o corpo inteiro (inclui respostas em streaming)
+            response.get_data()
+            if response.status_code != 200:
+                raise RuntimeError(f'HTTP {response.status_code}')
+        return 'GET', url, run
+
+    def post(url, payload):
+        def run(i):
+            response = client.post(url, json=payload(i))
+            response.get_data()
+            if response.status_code != 200:
+                raise RuntimeError(f'HTTP {response.status_code}')
+        return 'POST', url, run
+
+    service = get_categorization_service()
+    advisor = FinancialAdvisor()
+
+    def uncategorized_rows(i):
+        # Mesma consulta de batch_categorize e dos jobs; sem aplicar, as linhas seguem sem categoria
+        rows = uncategorized_rows_query(user(i), 500).all()
+        return service.categorize_rows(user(i), rows)
+
+    http = [
+        ('GET /transactions', get('/api/transactions?user_id={user}')),
+        ('GET /transactions/summary', get('/api/transactions/summary?user_id={user}')),
+        ('GET /transactions/page', get('/api/transactions/page?user_id={user}&limit=50')),
+        ('GET /transactions/search', get('/api/transactions/search?user_id={user}&q=padaria')),
+        ('GET /transactions/export', get('/api/transactions/export?user_id={user}')),
+        ('GET /categories', get('/api/categories?user_id={user}')),
+        ('GET /budgets', get('/api/budgets?user_id={user}')),
+        ('GET /goals', get('/api/goals?user_id={user}')),
+        ('POST /categorization/suggest', post('/api/categorization/suggest', lambda i: {
+            'description': description(i)[0], 'user_id': user(i)})),
+        ('POST /categorization/auto-categorize', post('/api/categorization/auto-categorize', lambda i: {
+            'description': description(i)[0], 'amount': description(i)[1], 'user_id': user(i)})),
+        ('GET /categorization/rules', get('/api/categorization/rules?user_id={user}')),
+        ('GET /categorization/analyze-patterns', get('/api/categorization/analyze-patterns?user_id={user}')),
+        ('POST /ai-advisor/chat', post('/api/ai-advisor/chat', lambda i: {
+            'question': QUESTIONS[i % len(QUESTIONS)], 'user_id': user(i)})),
+        ('GET /ai-advisor/insights', get('/api/ai-advisor/insights?user_id={user}')),
+        ('GET /ai-advisor/suggestions', get('/api/ai-advisor/suggestions?user_id={user}')),
+        ('GET /ai-advisor/budget-analysis', get('/api/ai-advisor/budget-analysis?user_id={user}')),
+        ('GET /dashboard', get('/api/dashboard?user_id={user}')),
+        ('GET /reports/timeseries', get('/api/reports/timeseries?user_id={user}&granularity=month&start_date={start}&end_date={end}')),
+    ]
+    services = [
+        ('CategorizationService.categorize_transaction',
+         lambda i: service.categorize_transaction(description(i)[0], description(i)[1], user(i))),
+        ('CategorizationService.suggest_categories',
+         lambda i: service.suggest_categories(description(i)[0], user(i))),
+        ('CategorizationService.categorize_rows (500)', uncategorized_rows),
+        ('FinancialAdvisor.analyze_user_finances', lambda i: advisor.analyze_user_finances(user(i))),
+        ('FinancialAdvisor.analyze_budgets', lambda i: advisor.analyze_budgets(user(i))),
+        ('FinancialAdvisor.answer_question',
+         lambda i: advisor.answer_question(QUESTIONS[i % len(QUESTIONS)], user(i))),
+        ('build_timeseries (dia)', lambda i: build_timeseries(user(i), start, end, 'day')),
+        ('search_transaction_ids', lambda i: search_transaction_ids(user(i), 'posto')),
+    ]
+    # Blueprints ausentes nesta instalação não entram na medição, em vez de aparecer como erro a cada execução
+    skipped = [name for name, (method, url, _) in http if not registered(method, url)]
+    scenarios = [Scenario(name, 'http', run) for name, (method, url, run) in http if name not in skipped]
+    scenarios += [Scenario(name, 'service', run) for name, run in services]
+    return scenarios, skipped
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Percentil pelo método do posto mais próximo"""
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+class QueryCounter:
+    """Conta as instruções enviadas ao banco enquanto a suíte roda"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+def _call(scenario: Scenario, i: int):
+    from src.services.response_cache import response_cache
+    # Mede o cálculo, não o cache de respostas; a sessão é descartada como ao fim de uma requisição
+    response_cache.clear()
+    try:
+        scenario.run(i)
+    finally:
+        db.session.remove()
+
+def measure(scenario: Scenario, counter: QueryCounter, calls: int, warmup: int) -> dict:
+    for i in range(warmup):
+        _call(scenario, i)
+
+    latencies = []
+    queries = 0
+    for i in range(calls):
+        before = counter.count
+        start = time.perf_counter()
+        _call(scenario, i)
+        latencies.append(time.perf_counter() - start)
+        queries += counter.count - before
+
+    # Pico de memória numa chamada à parte: o tracemalloc distorce os tempos
+    tracemalloc.start()
+    try:
+        _call(scenario, calls)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'kind': scenario.kind,
+        'calls': calls,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / calls * 1000, 3),
+        'queries_per_call': round(queries / calls, 2),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Cenários em que p50/p95 pioraram além do limite ou que passaram a fazer mais consultas"""
+    regressions = []
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous or 'error' in current or 'error' in previous:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            if previous[metric] > 0 and current[metric] > previous[metric] * (1 + threshold):
+                regressions.append((name, metric, previous[metric], current[metric]))
+        if current['queries_per_call'] > previous['queries_per_call']:
+            regressions.append((name, 'queries_per_call', previous['queries_per_call'], current['queries_per_call']))
+    return regressions
+
+def run_suite(spec: DatasetSpec, calls: int, warmup: int, database_uri: str, only=None) -> dict:
+    app = create_app(database_uri)
+    for module_name, blueprint_name in ROUTE_BLUEPRINTS:
+        try:
+            blueprint = getattr(importlib.import_module(module_name), blueprint_name)
+        except ImportError:
+            continue
+        app.register_blueprint(blueprint, url_prefix='/api')
+
+    results = {
+        'meta': {
+            **spec.to_dict(),
+            'database': database_uri.split('://')[0],
+            'calls': calls,
+            'warmup': warmup,
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'timestamp': datetime.utcnow().isoformat(),
+        },
+        'scenarios': {}
+    }
+    with app.app_context():
+        start = time.perf_counter()
+        generate_dataset(spec)
+        results['meta']['generation_seconds'] = round(time.perf_counter() - start, 2)
+
+        counter = QueryCounter(db.engine)
+        scenarios, results['meta']['skipped_scenarios'] = build_scenarios(app, spec)
+        for scenario in scenarios:
+            if only and not any(term.lower() in scenario.name.lower() for term in only):
+                continue
+            try:
+                results['scenarios'][scenario.name] = measure(scenario, counter, calls, warmup)
+            except Exception as e:
+                # Um cenário com erro não interrompe os demais
+                results['scenarios'][scenario.name] = {'kind': scenario.kind, 'error': str(e)}
+    return results
+
+def print_results(results: dict):
+    meta = results['meta']
+    print(f"{meta['transactions']} transações, {meta['users']} usuários, {meta['calls']} chamadas por cenário")
+    print(f"  {'cenário':<46} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'consultas':>10} {'memória KB':>11}")
+    for name, result in results['scenarios'].items():
+        if 'error' in result:
+            print(f"  {name:<46} erro: {result['error']}")
+            continue
+        print(f"  {name:<46} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+              f"{result['queries_per_call']:>10.1f} {result['peak_memory_kb']:>11.1f}")
+    if meta.get('skipped_scenarios'):
+        print(f"  Sem rota registrada (não medidos): {', '.join(meta['skipped_scenarios'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', default='10k', help=f"Uma de: {', '.join(SCALES)}")
+    parser.add_argument('--users', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--calls', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--database', default='sqlite://', help='URI de um banco vazio')
+    parser.add_argument('--only', action='append', help='Rodar só cenários cujo nome contém o termo')
+    parser.add_argument('--output', help='Arquivo JSON com os resultados')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior para comparar')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Piora tolerada de p50/p95 (0.10 = 10%%)')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    spec = DatasetSpec.from_scale(args.scale, users=args.users, seed=args.seed)
+    results = run_suite(spec, args.calls, args.warmup, args.database, args.only)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(results, output, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('meta', {}).get('transactions') != results['meta']['transactions']:
+            print('Aviso: o baseline foi gerado em outra escala')
+        regressions = compare(results, baseline, args.threshold)
+        for name, metric, previous, current in regressions:
+            print(f'Regressão: {name} {metric} {previous} -> {current}')
+        if not regressions:
+            print('Sem regressões em relação ao baseline')
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,27 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from src.models.user import db
+from src.models.money import Money
 
 class Budget(db.Model):
     __tablename__ = 'budgets'
+    __table_args__ = (
+        db.Index('ix_budgets_user_active', 'user_id', 'is_active'),
+        db.Index('ix_budgets_user_category', 'user_id', 'category_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(Money, nullable=False)  # Centavos no banco, reais no Python
     period = db.Column(db.String(20), nullable=False)  # 'monthly', 'yearly'
     start_date = db.Column(db.DateTime, nullable=False)
     end_date = db.Column(db.DateTime, nullable=False)
     is_active = db.Column(db.Boolean, default=True)
+    # Gasto no período e situação ('good', 'warning', 'exceeded'), mantidos a cada gravação de despesa
+    spent_amount = db.Column(Money, nullable=False, default=0, server_default='0')
+    status = db.Column(db.String(20), nullable=False, default='good', server_default='good')
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -33,19 +41,30 @@ class Budget(db.Model):
             'start_date': self.start_date.isoformat(),
             'end_date': self.end_date.isoformat(),
             'is_active': self.is_active,
+            'spent_amount': self.spent_amount,
+            'remaining_amount': round(self.amount - self.spent_amount, 2),
+            'usage_percentage': round(self.usage_percentage, 2),
+            'status': self.status,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
 
+    @property
+    def usage_percentage(self):
+        return (self.spent_amount / self.amount * 100) if self.amount > 0 else 0
+
 class Goal(db.Model):
     __tablename__ = 'goals'
+    __table_args__ = (
+        db.Index('ix_goals_user_achieved', 'user_id', 'is_achieved'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.String(255), nullable=True)
-    target_amount = db.Column(db.Float, nullable=False)
-    current_amount = db.Column(db.Float, default=0.0)
+    target_amount = db.Column(Money, nullable=False)
+    current_amount = db.Column(Money, default=0)
     target_date = db.Column(db.DateTime, nullable=False)
     is_achieved = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
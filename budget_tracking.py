@@ -0,0 +1,291 @@
+import logging
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+from src.models.user import db
+from src.models.budget import Budget
+from src.models.transaction import Transaction
+from src.models.money import cents, from_cents, to_cents
+from src.services.rollups import transaction_values, updated_transaction_deltas
+
+logger = logging.getLogger(__name__)
+
+# Percentual de uso acima do qual o orçamento muda de situação, do maior para o menor
+BUDGET_THRESHOLDS = ((100, 'exceeded'), (80, 'warning'))
+BUDGET_STATUSES = ('good', 'warning', 'exceeded')
+# Colunas do orçamento que exigem recontar o gasto ou reavaliar a situação
+RECOUNT_COLUMNS = ('user_id', 'category_id', 'start_date', 'end_date', 'amount')
+
+BudgetAlert = namedtuple('BudgetAlert', [
+    'budget_id', 'user_id', 'category_id', 'name', 'previous_status', 'status',
+    'spent_amount', 'budget_amount', 'usage_percentage'
+])
+
+def budget_status(spent_cents: int, amount_cents: int) -> str:
+    """Situação do orçamento pelo gasto, nos mesmos limites da análise do consultor"""
+    if amount_cents <= 0:
+        return 'good'
+    for threshold, status in BUDGET_THRESHOLDS:
+        if spent_cents * 100 > amount_cents * threshold:
+            return status
+    return 'good'
+
+# ===== Notificação =====
+
+class BudgetNotifier(ABC):
+    """Destino dos alertas de orçamento"""
+
+    @abstractmethod
+    def notify(self, alert: BudgetAlert):
+        """Entregar um alerta; chamado depois do commit que cruzou a faixa"""
+
+class LoggingBudgetNotifier(BudgetNotifier):
+    """Notificador padrão: registra o alerta no log da aplicação"""
+
+    def notify(self, alert: BudgetAlert):
+        logger.warning(
+            "Orçamento %s (usuário %s) passou de '%s' para '%s': %.2f de %.2f (%.1f%%)",
+            alert.name, alert.user_id, alert.previous_status, alert.status,
+            alert.spent_amount, alert.budget_amount, alert.usage_percentage
+        )
+
+_notifier: BudgetNotifier = LoggingBudgetNotifier()
+
+def set_budget_notifier(notifier: BudgetNotifier):
+    """Trocar o notificador dos alertas (ex.: e-mail, push ou uma fila local)"""
+    global _notifier
+    _notifier = notifier
+
+def get_budget_notifier() -> BudgetNotifier:
+    return _notifier
+
+def notify_budget_alerts(alerts: Iterable[BudgetAlert]):
+    """Entregar os alertas; uma falha no notificador não desfaz gravações já confirmadas"""
+    notifier = get_budget_notifier()
+    for alert in alerts:
+        try:
+            notifier.notify(alert)
+        except Exception:
+            logger.exception('Falha ao notificar o alerta do orçamento %s', alert.budget_id)
+
+# ===== Gasto e situação =====
+
+def _update_statuses(connection, rows) -> List[BudgetAlert]:
+    """Gravar a nova situação dos orçamentos (id, user_id, category_id, nome, ativo, situação, gasto, limite)
+    e devolver os alertas dos ativos que subiram de faixa"""
+    budgets = Budget.__table__
+    changes, alerts = [], []
+    for budget_id, user_id, category_id, name, is_active, previous, spent_cents, amount_cents in rows:
+        status = budget_status(spent_cents, amount_cents)
+        if status == previous:
+            continue
+        changes.append({'budget_id': budget_id, 'new_status': status})
+        # Só a subida de faixa alerta; ao descer, a situação volta e o próximo cruzamento alerta de novo
+        if is_active and BUDGET_STATUSES.index(status) > BUDGET_STATUSES.index(previous or 'good'):
+            alerts.append(BudgetAlert(
+                budget_id, user_id, category_id, name, previous, status,
+                from_cents(spent_cents), from_cents(amount_cents),
+                round(spent_cents / amount_cents * 100, 2)
+            ))
+    if changes:
+        connection.execute(
+            budgets.update().where(budgets.c.id == db.bindparam('budget_id')).values(status=db.bindparam('new_status')),
+            changes
+        )
+    return alerts
+
+def _status_rows(connection, budget_ids: List[int], batch_size: int = 500):
+    budgets = Budget.__table__
+    query = select(
+        budgets.c.id, budgets.c.user_id, budgets.c.category_id, budgets.c.name, budgets.c.is_active,
+        budgets.c.status, cents(budgets.c.spent_amount), cents(budgets.c.amount)
+    )
+    rows = []
+    # Em lotes, para não passar do limite de parâmetros do banco numa recontagem completa
+    for start in range(0, len(budget_ids), batch_size):
+        rows.extend(connection.execute(query.where(budgets.c.id.in_(budget_ids[start:start + batch_size]))))
+    return rows
+
+def budget_candidates_query(user_ids: Iterable[int], category_ids: Iterable[int]):
+    """Orçamentos (id, user_id, category_id, início, fim) que podem receber as despesas dos pares informados"""
+    budgets = Budget.__table__
+    return select(
+        budgets.c.id, budgets.c.user_id, budgets.c.category_id, budgets.c.start_date, budgets.c.end_date
+    ).where(
+        budgets.c.user_id.in_(set(user_ids)),
+        budgets.c.category_id.in_(set(category_ids))
+    )
+
+def write_budget_deltas(connection, deltas: Iterable[tuple], skip_budget_ids: Iterable[int] = ()) -> List[BudgetAlert]:
+    """Somar ao gasto dos orçamentos as variações (user_id, data, category_id, tipo, valor, sinal)
+    das despesas dentro do período de cada um; devolve os alertas de cruzamento de faixa"""
+    expenses: Dict[tuple, list] = {}
+    for user_id, when, category_id, transaction_type, amount, sign in deltas:
+        if transaction_type != 'expense' or category_id is None or when is None:
+            continue
+        # Despesas são gravadas com sinal negativo; o gasto do orçamento é positivo
+        expenses.setdefault((user_id, category_id), []).append((when, sign * abs(to_cents(amount or 0))))
+    if not expenses:
+        return []
+
+    budgets = Budget.__table__
+    skip_budget_ids = set(skip_budget_ids)
+    candidates = connection.execute(budget_candidates_query(
+        {user_id for user_id, _ in expenses},
+        {category_id for _, category_id in expenses}
+    ))
+
+    increments = {}
+    for budget_id, user_id, category_id, start_date, end_date in candidates:
+        if budget_id in skip_budget_ids:
+            continue
+        total = sum(
+            amount_cents for when, amount_cents in expenses.get((user_id, category_id), ())
+            if start_date <= when <= end_date
+        )
+        if total:
+            increments[budget_id] = total
+    if not increments:
+        return []
+
+    # Incremento no próprio UPDATE: gravações concorrentes não se sobrescrevem
+    connection.execute(
+        budgets.update().where(budgets.c.id == db.bindparam('budget_id')).values(
+            spent_amount=cents(budgets.c.spent_amount) + db.bindparam('spent_cents')
+        ),
+        [{'budget_id': budget_id, 'spent_cents': total} for budget_id, total in increments.items()]
+    )
+    return _update_statuses(connection, _status_rows(connection, list(increments)))
+
+def recount_budgets(connection, budget_ids: Optional[Iterable[int]] = None,
+                    user_id: Optional[int] = None) -> List[BudgetAlert]:
+    """Recalcular a partir das transações o gasto e a situação dos orçamentos (todos, alguns ou de um usuário)"""
+    budgets = Budget.__table__
+    transactions = Transaction.__table__
+    query = select(
+        budgets.c.id,
+        db.func.coalesce(db.func.sum(db.func.abs(cents(transactions.c.amount))), 0)
+    ).outerjoin(transactions, db.and_(
+        transactions.c.user_id == budgets.c.user_id,
+        transactions.c.category_id == budgets.c.category_id,
+        transactions.c.transaction_type == 'expense',
+        transactions.c.date >= budgets.c.start_date,
+        transactions.c.date <= budgets.c.end_date
+    )).group_by(budgets.c.id)
+    if budget_ids is not None:
+        query = query.where(budgets.c.id.in_(list(budget_ids)))
+    if user_id is not None:
+        query = query.where(budgets.c.user_id == user_id)
+
+    totals = [{'budget_id': budget_id, 'spent_cents': int(round(total))} for budget_id, total in connection.execute(query)]
+    if not totals:
+        return []
+    connection.execute(
+        budgets.update().where(budgets.c.id == db.bindparam('budget_id')).values(
+            spent_amount=cents(db.bindparam('spent_cents'))
+        ),
+        totals
+    )
+    return _update_statuses(connection, _status_rows(connection, [row['budget_id'] for row in totals]))
+
+def record_budget_deltas(session, deltas: Iterable[tuple]):
+    """Atualizar os orçamentos por variações gravadas fora do ORM; os alertas saem no commit da sessão"""
+    alerts = write_budget_deltas(session.connection(), deltas)
+    session.info.setdefault('budget_alerts', []).extend(alerts)
+    _expire_budgets(session)
+
+def _expire_budgets(session):
+    """Os UPDATEs em massa não passam pelo ORM: recarregar gasto e situação dos orçamentos já carregados"""
+    for instance in list(session.identity_map.values()):
+        if isinstance(instance, Budget):
+            session.expire(instance, ['spent_amount', 'status'])
+
+# ===== Eventos do ORM =====
+
+def _pending(session):
+    return session.info.setdefault('budget_pending', [])
+
+def _track_inserted_transaction(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        _pending(session).append((*transaction_values(target), 1))
+
+def _track_updated_transaction(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        _pending(session).extend(updated_transaction_deltas(target))
+
+def _track_deleted_transaction(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        _pending(session).append((*transaction_values(target), -1))
+
+def _queue_recount(target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('budget_recount', set()).add(target.id)
+
+def _recount_inserted_budget(mapper, connection, target):
+    """Orçamento novo: contar no fim do flush as despesas já existentes no período"""
+    _queue_recount(target)
+
+def _recount_updated_budget(mapper, connection, target):
+    """Período, categoria ou limite alterados: recontar no fim do flush"""
+    state = inspect(target)
+    if any(state.attrs[column].history.has_changes() for column in RECOUNT_COLUMNS):
+        _queue_recount(target)
+
+event.listen(Transaction, 'after_insert', _track_inserted_transaction)
+event.listen(Transaction, 'after_update', _track_updated_transaction)
+event.listen(Transaction, 'after_delete', _track_deleted_transaction)
+event.listen(Budget, 'after_insert', _recount_inserted_budget)
+event.listen(Budget, 'after_update', _recount_updated_budget)
+
+@event.listens_for(Session, 'after_flush')
+def _write_budget_spent(session, flush_context):
+    """Atualizar gasto e situação dos orçamentos na mesma transação das despesas"""
+    recount = session.info.pop('budget_recount', None)
+    pending = session.info.pop('budget_pending', None)
+    if not recount and not pending:
+        return
+
+    connection = session.connection()
+    alerts = []
+    if recount:
+        # A recontagem já enxerga as despesas deste flush; elas não são somadas de novo
+        alerts.extend(recount_budgets(connection, recount))
+    if pending:
+        alerts.extend(write_budget_deltas(connection, pending, skip_budget_ids=recount or ()))
+    session.info.setdefault('budget_alerts', []).extend(alerts)
+    session.info['budget_expire'] = True
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _refresh_budgets(session, flush_context):
+    if session.info.pop('budget_expire', None):
+        _expire_budgets(session)
+
+@event.listens_for(Session, 'after_commit')
+def _send_budget_alerts(session):
+    """Alertas só depois do commit: uma gravação desfeita não notifica"""
+    alerts = session.info.pop('budget_alerts', None)
+    if alerts:
+        notify_budget_alerts(alerts)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_budget_changes(session):
+    """Descartar variações e alertas que não foram gravados"""
+    for key in ('budget_pending', 'budget_recount', 'budget_alerts', 'budget_expire'):
+        session.info.pop(key, None)
+
+@click.command('rebuild-budget-spent')
+@click.option('--user-id', type=int, default=None, help='Recalcular apenas os orçamentos deste usuário')
+@with_appcontext
+def rebuild_budget_spent_command(user_id):
+    """Recalcular o gasto e a situação dos orçamentos a partir das transações"""
+    recount_budgets(db.session.connection(), user_id=user_id)
+    db.session.commit()
+    click.echo('Gasto dos orçamentos recalculado')
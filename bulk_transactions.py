@@ -0,0 +1,223 @@
+import math
+from datetime import datetime
+from typing import Dict, List, Optional
+from src.models.user import db
+from src.models.transaction import Transaction
+from src.services.categorization_service import get_categorization_service
+from src.services.transaction_classifier import AUTO_CATEGORY_SOURCE
+
+# Itens (criações + alterações + remoções) aceitos por requisição
+MAX_BULK_ITEMS = 5000
+TRANSACTION_TYPES = ('income', 'expense')
+UPDATABLE_FIELDS = ('description', 'amount', 'transaction_type', 'category_id', 'date')
+
+class BulkValidationError(ValueError):
+    """Item do lote rejeitado na validação"""
+
+class BulkChanges:
+    """Criações, alterações e remoções de transações de um usuário aplicadas em uma única transação.
+
+    Tudo é validado numa passada, com as categorias resolvidas pelo mapa em memória do
+    CategorizationService; a gravação passa pelo flush do ORM, que agrupa as instruções
+    em executemany e mantém rollups, orçamentos e índice de busca em dia. Só categorias
+    informadas pelo cliente treinam o modelo de categorização.
+    """
+
+    def __init__(self, user_id: int, auto_categorize: bool = False):
+        self.user_id = user_id
+        self.auto_categorize = auto_categorize
+        self.service = get_categorization_service()
+        self.category_map = self.service.get_category_map(user_id)
+        self.results = {'create': [], 'update': [], 'delete': []}
+
+    # ===== Validação =====
+
+    def resolve_category(self, item: Dict) -> Optional[int]:
+        """category_id, ou o nome em 'category', resolvido pelo mapa em memória"""
+        if item.get('category_id') is not None:
+            category_id = item['category_id']
+            if isinstance(category_id, bool) or not isinstance(category_id, int):
+                raise BulkValidationError('category_id deve ser numérico')
+            if category_id not in self.category_map.by_id:
+                raise BulkValidationError('Categoria não encontrada')
+            return category_id
+        if item.get('category'):
+            category = self.category_map.get(self.service.normalize_text(str(item['category'])))
+            if category is None:
+                raise BulkValidationError(f"Categoria não encontrada: {item['category']}")
+            return category.id
+        return None
+
+    def parse_fields(self, item: Dict, partial: bool) -> Dict:
+        """Valores das colunas a gravar; em alterações (partial) só os campos enviados"""
+        if not isinstance(item, dict):
+            raise BulkValidationError('Item deve ser um objeto')
+        fields = {}
+
+        if 'description' in item or not partial:
+            description = item.get('description')
+            if not isinstance(description, str) or not description.strip():
+                raise BulkValidationError('description é obrigatório')
+            if len(description) > 255:
+                raise BulkValidationError('description deve ter no máximo 255 caracteres')
+            fields['description'] = description.strip()
+
+        if 'amount' in item or not partial:
+            amount = item.get('amount')
+            if isinstance(amount, str):
+                try:
+                    amount = float(amount)
+                except ValueError:
+                    raise BulkValidationError('amount deve ser numérico')
+            if isinstance(amount, bool) or not isinstance(amount, (int, float)) or not math.isfinite(amount):
+                raise BulkValidationError('amount deve ser numérico')
+            fields['amount'] = amount
+
+        if 'transaction_type' in item:
+            if item['transaction_type'] not in TRANSACTION_TYPES:
+                raise BulkValidationError("transaction_type deve ser 'income' ou 'expense'")
+            fields['transaction_type'] = item['transaction_type']
+        elif not partial:
+            # Sem tipo explícito, o sinal do valor decide (como no frontend)
+            fields['transaction_type'] = 'income' if fields['amount'] > 0 else 'expense'
+
+        if 'category_id' in item or 'category' in item:
+            fields['category_id'] = self.resolve_category(item)
+
+        if item.get('date'):
+            try:
+                fields['date'] = datetime.fromisoformat(str(item['date']))
+            except ValueError:
+                raise BulkValidationError('date deve estar no formato ISO (AAAA-MM-DD)')
+        elif 'date' in item and partial:
+            raise BulkValidationError('date não pode ser vazio')
+
+        return fields
+
+    def _result(self, operation: str, index: int, item, **values):
+        result = {'index': index}
+        # Clientes offline identificam os próprios itens pelo client_id
+        if isinstance(item, dict) and item.get('client_id') is not None:
+            result['client_id'] = item['client_id']
+        result.update(values)
+        self.results[operation].append(result)
+        return result
+
+    def _load_owned(self, transaction_ids: List[int]) -> Dict[int, Transaction]:
+        if not transaction_ids:
+            return {}
+        return {
+            transaction.id: transaction
+            for transaction in Transaction.query.filter(
+                Transaction.user_id == self.user_id,
+                Transaction.id.in_(transaction_ids)
+            )
+        }
+
+    @staticmethod
+    def _item_id(item) -> Optional[int]:
+        transaction_id = item.get('id') if isinstance(item, dict) else item
+        if isinstance(transaction_id, bool) or not isinstance(transaction_id, int):
+            return None
+        return transaction_id
+
+    # ===== Aplicação =====
+
+    def apply(self, creates: List, updates: List, deletes: List, atomic: bool = False) -> bool:
+        """Validar e aplicar o lote; devolve False quando nada foi gravado por causa de um lote atômico inválido"""
+        if len(creates) + len(updates) + len(deletes) > MAX_BULK_ITEMS:
+            raise BulkValidationError(f'No máximo {MAX_BULK_ITEMS} itens por requisição')
+
+        # Uma única consulta carrega as transações alteradas e removidas, já filtradas pelo dono
+        referenced = [self._item_id(item) for item in updates + deletes]
+        existing = self._load_owned([transaction_id for transaction_id in referenced if transaction_id is not None])
+        seen = set()
+        failed = False
+
+        def check_id(item):
+            transaction_id = self._item_id(item)
+            if transaction_id is None:
+                raise BulkValidationError('id é obrigatório')
+            if transaction_id in seen:
+                raise BulkValidationError('Transação repetida no lote')
+            seen.add(transaction_id)
+            if transaction_id not in existing:
+                raise BulkValidationError('Transação não encontrada')
+            return existing[transaction_id]
+
+        new_transactions = []
+        for index, item in enumerate(creates):
+            try:
+                new_transactions.append((index, item, self.parse_fields(item, partial=False)))
+            except BulkValidationError as e:
+                failed = True
+                self._result('create', index, item, status='error', error=str(e))
+
+        changed = []
+        for index, item in enumerate(updates):
+            try:
+                transaction = check_id(item)
+                changed.append((index, item, transaction, self.parse_fields(item, partial=True)))
+            except BulkValidationError as e:
+                failed = True
+                self._result('update', index, item, status='error', error=str(e))
+
+        removed = []
+        for index, item in enumerate(deletes):
+            try:
+                removed.append((index, item, check_id(item)))
+            except BulkValidationError as e:
+                failed = True
+                self._result('delete', index, item, status='error', error=str(e))
+
+        if atomic and failed:
+            return False
+
+        # Categorização automática das criações sem categoria, em um único lote; marcadas como
+        # automáticas, elas não treinam o modelo de categorização
+        if self.auto_categorize:
+            pending = [(index, fields) for index, _, fields in new_transactions if 'category_id' not in fields]
+            categorized = self.service.categorize_rows(self.user_id, [
+                (index, fields['description'], fields['amount']) for index, fields in pending
+            ])
+            for (_, fields), (_, _, category) in zip(pending, categorized):
+                if category:
+                    fields['category_id'] = category.id
+                    fields['category_source'] = AUTO_CATEGORY_SOURCE
+
+        created = []
+        for index, item, fields in new_transactions:
+            transaction = Transaction(user_id=self.user_id, **fields)
+            db.session.add(transaction)
+            created.append((index, item, transaction))
+        for index, item, transaction, fields in changed:
+            for name, value in fields.items():
+                setattr(transaction, name, value)
+        for index, item, transaction in removed:
+            db.session.delete(transaction)
+
+        # Um flush: INSERT, UPDATE e DELETE agrupados; os eventos do ORM atualizam os dados derivados
+        db.session.flush()
+
+        for index, item, transaction in created:
+            self._result('create', index, item, status='created', id=transaction.id, category_id=transaction.category_id)
+        for index, item, transaction, _ in changed:
+            self._result('update', index, item, status='updated', id=transaction.id)
+        for index, item, transaction in removed:
+            self._result('delete', index, item, status='deleted', id=transaction.id)
+        return True
+
+    def summary(self) -> Dict:
+        for operation in self.results:
+            self.results[operation].sort(key=lambda result: result['index'])
+        counts = {
+            status: sum(result['status'] == status for results in self.results.values() for result in results)
+            for status in ('created', 'updated', 'deleted', 'error')
+        }
+        return {
+            'created': counts['created'],
+            'updated': counts['updated'],
+            'deleted': counts['deleted'],
+            'failed': counts['error'],
+            'results': self.results
+        }
@@ -1,9 +1,54 @@
 from flask import Blueprint, request, jsonify
 from src.models.user import db
-from src.services.categorization_service import CategorizationService
+from src.models.money import cents, from_cents
+from src.services.categorization_service import get_categorization_service
+from src.services.categorization_jobs import categorization_job_runner, DEFAULT_CHUNK_SIZE
 
 categorization_bp = Blueprint('categorization', __name__)
 
+# Número de descrições recentes exibidas por categoria em analyze-patterns
+RECENT_DESCRIPTIONS = 5
+
+def category_pattern_query(user_id):
+    """Contagem e soma (em centavos, valor absoluto) das transações categorizadas, uma linha por categoria"""
+    from src.models.transaction import Transaction
+    from src.models.category import Category
+    return db.session.query(
+        Transaction.category_id,
+        Category.name,
+        db.func.count(Transaction.id),
+        db.func.sum(db.func.abs(cents(Transaction.amount)))
+    ).outerjoin(
+        Category, Category.id == Transaction.category_id
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.category_id.isnot(None)
+    ).group_by(Transaction.category_id, Category.name)
+
+def recent_descriptions_query(user_id, category_ids):
+    """(category_id, descrição, data, id) das transações mais recentes de cada categoria"""
+    from src.models.transaction import Transaction
+    recent_rank = db.func.row_number().over(
+        partition_by=Transaction.category_id,
+        order_by=(Transaction.date.desc(), Transaction.id.desc())
+    ).label('recent_rank')
+    ranked = db.session.query(
+        Transaction.category_id,
+        Transaction.description,
+        Transaction.date,
+        Transaction.id,
+        recent_rank
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.category_id.in_(list(category_ids))
+    ).subquery()
+    return db.session.query(
+        ranked.c.category_id,
+        ranked.c.description,
+        ranked.c.date,
+        ranked.c.id
+    ).filter(ranked.c.recent_rank <= RECENT_DESCRIPTIONS)
+
 @categorization_bp.route('/categorization/suggest', methods=['POST'])
 def suggest_categories():
     """Sugerir categorias para uma transação"""
@@ -17,8 +62,8 @@ def suggest_categories():
         user_id = data['user_id']
         limit = data.get('limit', 3)
         
-        # Inicializar serviço de categorização
-        categorization_service = CategorizationService()
+        # Serviço de categorização compartilhado pelo processo
+        categorization_service = get_categorization_service()
         
         # Obter sugestões
         suggestions = categorization_service.suggest_categories(description, user_id, limit)
@@ -47,8 +92,8 @@ def auto_categorize_transaction():
         amount = float(data['amount'])
         user_id = data['user_id']
         
-        # Inicializar serviço de categorização
-        categorization_service = CategorizationService()
+        # Serviço de categorização compartilhado pelo processo
+        categorization_service = get_categorization_service()
         
         # Categorizar transação
         suggested_category_id = categorization_service.categorize_transaction(
@@ -56,9 +101,8 @@ def auto_categorize_transaction():
         )
         
         if suggested_category_id:
-            # Obter informações da categoria sugerida
-            from src.models.category import Category
-            category = Category.query.get(suggested_category_id)
+            # Obter informações da categoria sugerida (do mapa em cache)
+            category = categorization_service.get_category(user_id, suggested_category_id)
             
             return jsonify({
                 'description': description,
@@ -93,8 +137,12 @@ def batch_categorize_transactions():
         user_id = data['user_id']
         limit = data.get('limit', 100)
         
-        # Inicializar serviço de categorização
-        categorization_service = CategorizationService()
+        # Modo em segundo plano: processa todo o histórico em blocos
+        if data.get('background'):
+            return _start_categorization_job(user_id, data.get('chunk_size', DEFAULT_CHUNK_SIZE))
+        
+        # Serviço de categorização compartilhado pelo processo
+        categorization_service = get_categorization_service()
         
         # Executar categorização em lote
         results = categorization_service.batch_categorize(user_id, limit)
@@ -111,6 +159,103 @@ def batch_categorize_transactions():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def _start_categorization_job(user_id, chunk_size):
+    """Iniciar um job em segundo plano, reaproveitando o que já estiver em andamento"""
+    job, created = categorization_job_runner.start_job(user_id, chunk_size)
+    if not created:
+        return jsonify({
+            'error': 'Já existe um job de categorização em andamento',
+            'job': job.to_dict()
+        }), 409
+    
+    return jsonify({
+        'message': 'Job de categorização iniciado',
+        'job': job.to_dict()
+    }), 202
+
+@categorization_bp.route('/categorization/jobs', methods=['POST'])
+def create_categorization_job():
+    """Categorizar em segundo plano todas as transações sem categoria"""
+    try:
+        data = request.get_json()
+        
+        if 'user_id' not in data:
+            return jsonify({'error': 'user_id é obrigatório'}), 400
+        
+        return _start_categorization_job(data['user_id'], data.get('chunk_size', DEFAULT_CHUNK_SIZE))
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@categorization_bp.route('/categorization/jobs/<int:job_id>', methods=['GET'])
+def get_categorization_job(job_id):
+    """Consultar o progresso de um job de categorização"""
+    try:
+        from src.models.categorization_job import CategorizationJob
+        
+        job = CategorizationJob.query.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job não encontrado'}), 404
+        job_data = job.to_dict()
+        job_data['is_active'] = categorization_job_runner.is_active(job)
+        
+        return jsonify(job_data), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@categorization_bp.route('/categorization/jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_categorization_job(job_id):
+    """Cancelar um job de categorização em andamento"""
+    try:
+        from src.models.categorization_job import CategorizationJob
+        
+        job = CategorizationJob.query.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job não encontrado'}), 404
+        if job.status in ('completed', 'failed', 'cancelled'):
+            return jsonify({'error': f'Job já finalizado ({job.status})'}), 400
+        
+        job = categorization_job_runner.cancel_job(job)
+        
+        return jsonify({
+            'message': 'Cancelamento solicitado',
+            'job': job.to_dict()
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@categorization_bp.route('/categorization/jobs/<int:job_id>/resume', methods=['POST'])
+def resume_categorization_job(job_id):
+    """Retomar um job interrompido a partir do último cursor gravado"""
+    try:
+        from src.models.categorization_job import CategorizationJob
+        
+        job = CategorizationJob.query.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job não encontrado'}), 404
+        if job.status == 'completed':
+            return jsonify({'error': 'Job já concluído'}), 400
+        if categorization_job_runner.is_active(job):
+            return jsonify({'error': 'Job ainda está em execução'}), 409
+        
+        job = categorization_job_runner.resume_job(job)
+        if job is None:
+            # Outro worker assumiu o job (ou iniciou outro para o usuário) entre a consulta e a retomada
+            return jsonify({'error': 'Job ainda está em execução'}), 409
+        
+        return jsonify({
+            'message': 'Job de categorização retomado',
+            'job': job.to_dict()
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @categorization_bp.route('/categorization/create-rule', methods=['POST'])
 def create_categorization_rule():
     """Criar regra personalizada de categorização"""
@@ -126,24 +271,86 @@ def create_categorization_rule():
         keyword = data['keyword']
         category_id = data['category_id']
         
-        # Inicializar serviço de categorização
-        categorization_service = CategorizationService()
+        # Serviço de categorização compartilhado pelo processo
+        categorization_service = get_categorization_service()
         
         # Criar regra
-        success = categorization_service.create_categorization_rule(
+        rule = categorization_service.create_categorization_rule(
             user_id, keyword, category_id
         )
         
-        if success:
+        if rule:
+            db.session.commit()
             return jsonify({
                 'message': 'Regra de categorização criada com sucesso',
                 'keyword': keyword,
-                'category_id': category_id
+                'category_id': category_id,
+                'rule': rule.to_dict()
             }), 201
         else:
             return jsonify({'error': 'Categoria não encontrada ou inválida'}), 400
         
     except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@categorization_bp.route('/categorization/rules', methods=['GET'])
+def get_categorization_rules():
+    """Listar as regras personalizadas de categorização do usuário"""
+    try:
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return jsonify({'error': 'user_id é obrigatório'}), 400
+        
+        from src.models.categorization_rule import CategorizationRule
+        
+        rules = CategorizationRule.query.filter_by(user_id=user_id).order_by(CategorizationRule.id).all()
+        
+        return jsonify([rule.to_dict() for rule in rules]), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@categorization_bp.route('/categorization/rules/<int:rule_id>', methods=['DELETE'])
+def delete_categorization_rule(rule_id):
+    """Remover uma regra personalizada de categorização"""
+    try:
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return jsonify({'error': 'user_id é obrigatório'}), 400
+        
+        categorization_service = get_categorization_service()
+        
+        if not categorization_service.delete_categorization_rule(user_id, rule_id):
+            return jsonify({'error': 'Regra não encontrada'}), 404
+        
+        db.session.commit()
+        return jsonify({'message': 'Regra de categorização removida com sucesso'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@categorization_bp.route('/categorization/model/rebuild', methods=['POST'])
+def rebuild_categorization_model():
+    """Retreinar o modelo de categorização a partir do histórico do usuário"""
+    try:
+        data = request.get_json()
+        
+        if 'user_id' not in data:
+            return jsonify({'error': 'user_id é obrigatório'}), 400
+        
+        categorization_service = get_categorization_service()
+        trained = categorization_service.rebuild_user_model(data['user_id'])
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Modelo de categorização retreinado',
+            'trained_transactions': trained
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @categorization_bp.route('/categorization/analyze-patterns', methods=['GET'])
@@ -154,40 +361,30 @@ def analyze_categorization_patterns():
         if not user_id:
             return jsonify({'error': 'user_id é obrigatório'}), 400
         
-        from src.models.transaction import Transaction
-        from src.models.category import Category
-        
-        # Buscar transações categorizadas do usuário
-        categorized_transactions = Transaction.query.filter(
-            Transaction.user_id == user_id,
-            Transaction.category_id.isnot(None)
-        ).all()
+        # Contagens, somas e médias calculadas no banco, uma linha por categoria
+        category_rows = category_pattern_query(user_id).all()
         
-        # Analisar padrões
-        patterns = {}
+        # Estatísticas por nome de categoria (categorias homônimas são somadas)
         category_stats = {}
-        
-        for transaction in categorized_transactions:
-            category_name = transaction.category.name if transaction.category else 'Sem categoria'
-            
-            # Estatísticas por categoria
-            if category_name not in category_stats:
-                category_stats[category_name] = {
-                    'count': 0,
-                    'total_amount': 0,
-                    'avg_amount': 0,
-                    'descriptions': []
-                }
-            
-            category_stats[category_name]['count'] += 1
-            category_stats[category_name]['total_amount'] += abs(transaction.amount)
-            category_stats[category_name]['descriptions'].append(transaction.description)
-        
-        # Calcular médias
-        for category_name, stats in category_stats.items():
-            stats['avg_amount'] = stats['total_amount'] / stats['count'] if stats['count'] > 0 else 0
-            # Manter apenas as 5 descrições mais recentes
-            stats['descriptions'] = stats['descriptions'][-5:]
+        category_ids_by_name = {}
+        for category_id, category_name, count, total_amount in category_rows:
+            category_name = category_name or 'Sem categoria'
+            stats = category_stats.setdefault(category_name, {
+                'count': 0,
+                'total_amount': 0,
+                'avg_amount': 0,
+                'descriptions': []
+            })
+            stats['count'] += count
+            stats['total_amount'] += int(round(total_amount or 0))
+            category_ids_by_name.setdefault(category_name, []).append(category_id)
+        
+        total_categorized = sum(stats['count'] for stats in category_stats.values())
+        
+        # Calcular médias (as somas estão em centavos)
+        for stats in category_stats.values():
+            stats['avg_amount'] = stats['total_amount'] / stats['count'] / 100 if stats['count'] > 0 else 0
+            stats['total_amount'] = from_cents(stats['total_amount'])
         
         # Ordenar por frequência
         sorted_categories = sorted(
@@ -195,15 +392,33 @@ def analyze_categorization_patterns():
             key=lambda x: x[1]['count'],
             reverse=True
         )
+        top_categories = sorted_categories[:10]  # Top 10 categorias
+        
+        # Apenas as descrições mais recentes de cada categoria exibida
+        top_category_ids = {
+            category_id: category_name
+            for category_name, _ in top_categories
+            for category_id in category_ids_by_name[category_name]
+        }
+        if top_category_ids:
+            recent_rows = recent_descriptions_query(user_id, top_category_ids).all()
+            
+            recent_by_name = {}
+            for category_id, description, date, transaction_id in recent_rows:
+                recent_by_name.setdefault(top_category_ids[category_id], []).append((date, transaction_id, description))
+            for category_name, recent in recent_by_name.items():
+                # Manter as mais recentes, da mais antiga para a mais nova
+                recent.sort()
+                category_stats[category_name]['descriptions'] = [description for _, _, description in recent[-RECENT_DESCRIPTIONS:]]
         
         return jsonify({
             'user_id': user_id,
-            'total_categorized_transactions': len(categorized_transactions),
-            'category_patterns': dict(sorted_categories[:10]),  # Top 10 categorias
+            'total_categorized_transactions': total_categorized,
+            'category_patterns': dict(top_categories),
             'analysis_summary': {
                 'most_used_category': sorted_categories[0][0] if sorted_categories else None,
                 'total_categories_used': len(category_stats),
-                'avg_transactions_per_category': len(categorized_transactions) / len(category_stats) if category_stats else 0
+                'avg_transactions_per_category': total_categorized / len(category_stats) if category_stats else 0
             }
         }), 200
         
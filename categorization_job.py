@@ -0,0 +1,52 @@
+from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from src.models.user import db
+
+class CategorizationJob(db.Model):
+    __tablename__ = 'categorization_jobs'
+    __table_args__ = (
+        # No máximo um job em andamento por usuário, garantido pelo banco mesmo com vários workers
+        db.Index(
+            'ix_categorization_jobs_user_active', 'user_id', unique=True,
+            sqlite_where=db.text("status IN ('pending', 'running')"),
+            postgresql_where=db.text("status IN ('pending', 'running')")
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'running', 'completed', 'cancelled', 'failed'
+    chunk_size = db.Column(db.Integer, nullable=False, default=500)
+    last_transaction_id = db.Column(db.Integer, nullable=False, default=0)  # Cursor para retomar o job
+    total_estimated = db.Column(db.Integer, nullable=False, default=0)
+    total_processed = db.Column(db.Integer, nullable=False, default=0)
+    categorized = db.Column(db.Integer, nullable=False, default=0)
+    uncategorized = db.Column(db.Integer, nullable=False, default=0)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    error = db.Column(db.String(255), nullable=True)
+    claimed_by = db.Column(db.String(64), nullable=True)  # Token do worker que detém o job
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # Último sinal de vida do worker (ou da criação)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        progress_percentage = (self.total_processed / self.total_estimated * 100) if self.total_estimated > 0 else 0
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'status': self.status,
+            'chunk_size': self.chunk_size,
+            'last_transaction_id': self.last_transaction_id,
+            'total_estimated': self.total_estimated,
+            'total_processed': self.total_processed,
+            'categorized': self.categorized,
+            'uncategorized': self.uncategorized,
+            'progress_percentage': round(min(progress_percentage, 100), 2),
+            'cancel_requested': self.cancel_requested,
+            'error': self.error,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
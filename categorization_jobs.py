@@ -0,0 +1,219 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.transaction import Transaction
+from src.models.categorization_job import CategorizationJob
+from src.services.categorization_service import get_categorization_service, uncategorized_rows_query
+
+DEFAULT_CHUNK_SIZE = 500
+MAX_CHUNK_SIZE = 5000
+ACTIVE_STATUSES = ('pending', 'running')
+# Sem sinal de vida por mais tempo que isso, o job é tratado como abandonado pelo worker
+HEARTBEAT_TIMEOUT = timedelta(minutes=2)
+
+class CategorizationJobRunner:
+    """Executor dos jobs de categorização de todo o histórico do usuário.
+
+    Cada processo tem seu próprio pool de threads, mas quem processa cada job é decidido no banco:
+    o worker assume o job com um UPDATE condicional e renova o sinal de vida a cada bloco.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _stale_before(self) -> datetime:
+        return datetime.utcnow() - HEARTBEAT_TIMEOUT
+
+    def _abandoned(self):
+        """Condição dos jobs em andamento cujo worker parou de dar sinal de vida"""
+        return db.and_(
+            CategorizationJob.status.in_(ACTIVE_STATUSES),
+            db.or_(CategorizationJob.heartbeat_at.is_(None), CategorizationJob.heartbeat_at < self._stale_before())
+        )
+
+    def _update_job(self, job_id: int, condition, **values) -> bool:
+        """UPDATE condicional do job; devolve se a condição ainda valia (e a linha foi alterada)"""
+        result = db.session.execute(
+            db.update(CategorizationJob)
+            .where(CategorizationJob.id == job_id, condition)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    def is_active(self, job: CategorizationJob) -> bool:
+        """Verificar se o job está em andamento em algum worker, pelo sinal de vida gravado no banco"""
+        return (
+            job.status in ACTIVE_STATUSES
+            and job.heartbeat_at is not None
+            and job.heartbeat_at >= self._stale_before()
+        )
+
+    def find_active_job(self, user_id: int) -> Optional[CategorizationJob]:
+        """Buscar um job do usuário que ainda esteja em andamento em algum worker"""
+        return CategorizationJob.query.filter(
+            CategorizationJob.user_id == user_id,
+            CategorizationJob.status.in_(ACTIVE_STATUSES),
+            CategorizationJob.heartbeat_at >= self._stale_before()
+        ).order_by(CategorizationJob.id).first()
+
+    def start_job(self, user_id: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[CategorizationJob, bool]:
+        """Criar e enfileirar um job para todas as transações sem categoria.
+
+        Devolve o job e se ele foi criado agora; se o usuário já tiver um em andamento, devolve esse.
+        """
+        # Jobs abandonados deixam de ocupar a vaga do usuário e podem ser retomados depois
+        db.session.execute(
+            db.update(CategorizationJob)
+            .where(CategorizationJob.user_id == user_id, self._abandoned())
+            .values(status='failed', error='Job abandonado pelo worker', finished_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        active_job = self.find_active_job(user_id)
+        if active_job:
+            return active_job, False
+
+        job = CategorizationJob(
+            user_id=user_id,
+            chunk_size=max(1, min(int(chunk_size), MAX_CHUNK_SIZE)),
+            status='pending',
+            heartbeat_at=datetime.utcnow()
+        )
+        job.total_estimated = self._count_remaining(user_id, 0)
+        db.session.add(job)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Outro worker criou um job para o mesmo usuário ao mesmo tempo (índice único parcial)
+            db.session.rollback()
+            active_job = self.find_active_job(user_id)
+            if active_job is None:
+                raise
+            return active_job, False
+
+        self._submit(job.id)
+        return job, True
+
+    def resume_job(self, job: CategorizationJob) -> Optional[CategorizationJob]:
+        """Retomar um job interrompido a partir do cursor gravado; None se ele estiver em andamento"""
+        resumable = db.and_(
+            CategorizationJob.status != 'completed',
+            db.or_(CategorizationJob.status.notin_(ACTIVE_STATUSES), self._abandoned())
+        )
+        try:
+            resumed = self._update_job(
+                job.id, resumable,
+                status='pending',
+                claimed_by=None,
+                heartbeat_at=datetime.utcnow(),
+                cancel_requested=False,
+                error=None,
+                finished_at=None,
+                total_estimated=job.total_processed + self._count_remaining(job.user_id, job.last_transaction_id)
+            )
+        except IntegrityError:
+            # O usuário já tem outro job em andamento
+            resumed = False
+        if not resumed:
+            db.session.rollback()
+            return None
+        db.session.commit()
+
+        self._submit(job.id)
+        return job
+
+    def cancel_job(self, job: CategorizationJob) -> CategorizationJob:
+        """Solicitar o cancelamento; o worker para ao fim do bloco atual"""
+        job_id = job.id
+        self._update_job(job_id, CategorizationJob.status.in_(ACTIVE_STATUSES), cancel_requested=True)
+        # Sem worker vivo não há quem veja o pedido: o job é encerrado aqui
+        self._update_job(job_id, self._abandoned(), status='cancelled', finished_at=datetime.utcnow())
+        db.session.commit()
+        return db.session.get(CategorizationJob, job_id)
+
+    def _count_remaining(self, user_id: int, after_id: int) -> int:
+        return db.session.query(db.func.count(Transaction.id)).filter(
+            Transaction.user_id == user_id,
+            Transaction.category_id.is_(None),
+            Transaction.id > after_id
+        ).scalar() or 0
+
+    def _submit(self, job_id: int):
+        app = current_app._get_current_object()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='categorization-job'
+                )
+        self._executor.submit(self._run, app, job_id)
+
+    def _run(self, app, job_id: int):
+        with app.app_context():
+            self._process(job_id)
+
+    def _process(self, job_id: int):
+        """Percorrer as transações por paginação keyset, com um commit por bloco"""
+        service = get_categorization_service()
+
+        # Assumir o job: só um worker passa deste ponto, mesmo que ele tenha sido enfileirado mais de uma vez
+        token = uuid.uuid4().hex
+        claimed = self._update_job(
+            job_id, CategorizationJob.status == 'pending',
+            status='running', claimed_by=token, heartbeat_at=datetime.utcnow()
+        )
+        db.session.commit()
+        if not claimed:
+            return
+        owned = db.and_(CategorizationJob.claimed_by == token, CategorizationJob.status == 'running')
+        job = db.session.get(CategorizationJob, job_id)
+
+        try:
+            while True:
+                # Após cada commit o job é recarregado, então o pedido de cancelamento é visto aqui
+                if job.cancel_requested:
+                    self._update_job(job_id, owned, status='cancelled', finished_at=datetime.utcnow())
+                    db.session.commit()
+                    return
+
+                rows = uncategorized_rows_query(job.user_id, job.chunk_size, job.last_transaction_id).all()
+
+                if not rows:
+                    self._update_job(job_id, owned, status='completed', finished_at=datetime.utcnow())
+                    db.session.commit()
+                    return
+
+                categorized = service.categorize_rows(job.user_id, rows)
+                service.apply_categories(job.user_id, categorized)
+
+                categorized_count = sum(1 for _, _, category in categorized if category)
+                still_owned = self._update_job(
+                    job_id, owned,
+                    total_processed=CategorizationJob.total_processed + len(rows),
+                    categorized=CategorizationJob.categorized + categorized_count,
+                    uncategorized=CategorizationJob.uncategorized + len(rows) - categorized_count,
+                    last_transaction_id=rows[-1][0],
+                    heartbeat_at=datetime.utcnow()
+                )
+                if not still_owned:
+                    # O job foi dado como abandonado e passou a outro worker: este bloco é descartado
+                    db.session.rollback()
+                    return
+
+                # Bloco e cursor na mesma transação: retomar nunca repete nem pula linhas
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self._update_job(job_id, owned, status='failed', error=str(e)[:255], finished_at=datetime.utcnow())
+            db.session.commit()
+
+categorization_job_runner = CategorizationJobRunner()
@@ -0,0 +1,20 @@
+from flask_sqlalchemy import SQLAlchemy
+from src.models.user import db
+
+class CategorizationTokenCount(db.Model):
+    """Contagem de um token por categoria no modelo de cada usuário"""
+    __tablename__ = 'categorization_token_counts'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), primary_key=True)
+    token = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class CategorizationCategoryCount(db.Model):
+    """Totais por categoria (transações e tokens) no modelo de cada usuário"""
+    __tablename__ = 'categorization_category_counts'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), primary_key=True)
+    document_count = db.Column(db.Integer, nullable=False, default=0)
+    token_count = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,28 @@
+from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from src.models.user import db
+
+class CategorizationRule(db.Model):
+    __tablename__ = 'categorization_rules'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'normalized_keyword', name='uq_categorization_rules_user_keyword'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    keyword = db.Column(db.String(100), nullable=False)
+    normalized_keyword = db.Column(db.String(100), nullable=False)  # Forma usada pelo matcher
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'keyword': self.keyword,
+            'normalized_keyword': self.normalized_keyword,
+            'category_id': self.category_id,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
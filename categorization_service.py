@@ -1,96 +1,412 @@
-import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
 from typing import Dict, List, Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from src.models.user import db
 from src.models.category import Category
 from src.models.transaction import Transaction
+from src.models.categorization_rule import CategorizationRule
+from src.services.keyword_matcher import KeywordMatcher
+from src.services.text_normalization import normalize_text
+from src.services.rollups import record_recategorization, track_previous_values
+from src.services.budget_tracking import record_budget_deltas
+from src.services.response_cache import bump_data_versions
+from src.services.instrumentation import timed
+from src.services.transaction_classifier import (
+    AUTO_CATEGORY_SOURCE, MIN_CONFIDENCE, UserCategoryModel, load_user_model, rebuild_user_model, tokenize,
+    trains_model, write_training_deltas
+)
+
+# Palavras-chave para categorização automática
+DEFAULT_CATEGORY_KEYWORDS = {
+    'Alimentação': [
+        'restaurante', 'lanchonete', 'padaria', 'supermercado', 'mercado',
+        'ifood', 'uber eats', 'delivery', 'pizza', 'hamburguer', 'mcdonalds',
+        'burger king', 'subway', 'starbucks', 'cafe', 'bar', 'boteco',
+        'açougue', 'hortifruti', 'feira', 'comida', 'alimento'
+    ],
+    'Transporte': [
+        'uber', 'taxi', 'posto', 'combustivel', 'gasolina', 'etanol',
+        'onibus', 'metro', 'trem', 'passagem', 'estacionamento',
+        'pedagio', 'mecanica', 'oficina', 'pneu', 'oleo', 'revisao'
+    ],
+    'Moradia': [
+        'aluguel', 'condominio', 'iptu', 'energia', 'luz', 'agua',
+        'gas', 'internet', 'telefone', 'limpeza', 'reforma',
+        'material construcao', 'tinta', 'eletricista', 'encanador'
+    ],
+    'Saúde': [
+        'farmacia', 'drogaria', 'medico', 'dentista', 'hospital',
+        'clinica', 'laboratorio', 'exame', 'consulta', 'remedio',
+        'medicamento', 'plano saude', 'convenio', 'fisioterapia'
+    ],
+    'Educação': [
+        'escola', 'faculdade', 'universidade', 'curso', 'livro',
+        'material escolar', 'mensalidade', 'matricula', 'aula',
+        'professor', 'educacao', 'estudo'
+    ],
+    'Lazer': [
+        'cinema', 'teatro', 'show', 'festa', 'balada', 'viagem',
+        'hotel', 'pousada', 'turismo', 'parque', 'shopping',
+        'jogo', 'netflix', 'spotify', 'streaming', 'academia',
+        'esporte', 'ginasio'
+    ],
+    'Compras': [
+        'loja', 'shopping', 'roupa', 'sapato', 'calcado', 'acessorio',
+        'eletronico', 'celular', 'computador', 'notebook', 'tv',
+        'geladeira', 'fogao', 'microondas', 'presente', 'gift'
+    ],
+    'Serviços': [
+        'banco', 'cartorio', 'advogado', 'contador', 'seguro',
+        'manutencao', 'conserto', 'lavanderia', 'cabeleireiro',
+        'salao', 'barbeiro', 'estetica'
+    ],
+    'Salário': [
+        'salario', 'ordenado', 'pagamento', 'empresa', 'trabalho',
+        'pix salario', 'deposito salario', 'folha pagamento'
+    ],
+    'Freelance': [
+        'freelance', 'freela', 'autonomo', 'servico prestado',
+        'consultoria', 'projeto', 'trabalho extra'
+    ],
+    'Investimentos': [
+        'dividendo', 'juros', 'rendimento', 'aplicacao', 'investimento',
+        'cdb', 'tesouro', 'acao', 'fundo', 'poupanca'
+    ],
+    'Vendas': [
+        'venda', 'vendeu', 'mercado livre', 'olx', 'marketplace',
+        'comissao', 'produto vendido'
+    ]
+}
+
+# Dados da categoria guardados em cache (independentes da sessão do banco)
+CategoryInfo = namedtuple('CategoryInfo', ['id', 'name', 'category_type', 'color', 'icon'])
+
+class CategoryMap(dict):
+    """Mapa nome normalizado -> categoria, com índice auxiliar por id"""
+    
+    def __init__(self, categories):
+        super().__init__(categories)
+        self.by_id = {category.id: category for category in self.values()}
+
+class UserRuleSet:
+    """Regras personalizadas de um usuário e o autômato compilado a partir delas"""
+    
+    def __init__(self, rules=()):
+        # rule_id -> (palavra-chave normalizada, category_id)
+        self.rules = {rule_id: (keyword, category_id) for rule_id, keyword, category_id in rules}
+        self._matcher = None
+        self._lock = threading.Lock()
+    
+    def add(self, rule_id: int, normalized_keyword: str, category_id: int):
+        """Incluir ou atualizar uma regra; só o autômato deste usuário é recompilado"""
+        with self._lock:
+            self.rules[rule_id] = (normalized_keyword, category_id)
+            self._matcher = None
+    
+    def remove(self, rule_id: int):
+        """Remover uma regra do índice"""
+        with self._lock:
+            if self.rules.pop(rule_id, None) is not None:
+                self._matcher = None
+    
+    def match(self, normalized_description: str) -> List[tuple]:
+        """Retornar (category_id, score, palavras) das regras encontradas, do maior score ao menor"""
+        if not self.rules or not normalized_description:
+            return []
+        
+        matcher = self._matcher
+        if matcher is None:
+            with self._lock:
+                keywords_by_category = {}
+                for rule_id in sorted(self.rules):
+                    keyword, category_id = self.rules[rule_id]
+                    keywords_by_category.setdefault(category_id, []).append(keyword)
+                # As palavras já estão normalizadas
+                matcher = self._matcher = KeywordMatcher(keywords_by_category, lambda keyword: keyword)
+        
+        matches = [
+            (category_id, score, keywords)
+            for category_id, (score, keywords) in matcher.match(normalized_description).items()
+        ]
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+class CategoryMapCache:
+    """Cache LRU/TTL dos mapas de categorias normalizadas por usuário e tipo"""
+    
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, user_id: int, category_type: Optional[str]) -> Optional[Dict[str, CategoryInfo]]:
+        """Obter o mapa em cache, ou None se ausente ou expirado"""
+        key = (user_id, category_type)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, category_map = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return category_map
+    
+    def set(self, user_id: int, category_type: Optional[str], category_map: Dict[str, CategoryInfo]):
+        """Guardar o mapa, descartando as entradas menos usadas"""
+        key = (user_id, category_type)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, category_map)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, user_id: Optional[int] = None):
+        """Invalidar o cache de um usuário (ou de todos, para categorias padrão)"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+category_map_cache = CategoryMapCache()
+
+class UserRuleIndex(CategoryMapCache):
+    """Índice em memória das regras de categorização de cada usuário"""
+    
+    def apply_change(self, user_id: int, rule_id: int, normalized_keyword: Optional[str] = None,
+                     category_id: Optional[int] = None):
+        """Aplicar uma regra criada, alterada ou removida ao índice já carregado"""
+        rule_set = self.get(user_id, None)
+        if rule_set is None:
+            return
+        if category_id is None:
+            rule_set.remove(rule_id)
+        else:
+            rule_set.add(rule_id, normalized_keyword, category_id)
+
+user_rule_index = UserRuleIndex()
+
+class UserModelCache(CategoryMapCache):
+    """Modelos de categorização (naive Bayes) carregados por usuário"""
+    
+    def apply_training(self, user_id: int, category_id: int, tokens: List[str], sign: int):
+        """Aplicar uma transação treinada ao modelo já carregado"""
+        model = self.get(user_id, None)
+        if model is not None:
+            model.update(category_id, tokens, sign)
+
+user_model_cache = UserModelCache(max_entries=256)
+
+def _mark_category_changed(mapper, connection, target):
+    """Registrar na sessão o dono da categoria alterada"""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_category_owners', set()).add(target.user_id)
+
+def _mark_rule_saved(mapper, connection, target):
+    """Registrar na sessão a regra criada ou alterada"""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_rules', []).append(
+            (target.user_id, target.id, target.normalized_keyword, target.category_id)
+        )
+
+def _mark_rule_deleted(mapper, connection, target):
+    """Registrar na sessão a regra removida"""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_rules', []).append((target.user_id, target.id, None, None))
+
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Category, _event_name, _mark_category_changed)
+
+def _mark_training(session, user_id, category_id, description, sign):
+    """Registrar na sessão uma transação a somar ou subtrair do modelo do usuário"""
+    if session is not None and category_id and description:
+        session.info.setdefault('model_pending', []).append((user_id, category_id, description, sign))
+
+def _confirm_category(mapper, connection, target):
+    """Categoria alterada pelo ORM sem origem explícita: escolha do usuário, que passa a treinar o modelo"""
+    state = inspect(target)
+    if state.attrs.category_id.history.has_changes() and not state.attrs.category_source.history.has_changes():
+        target.category_source = 'user'
+
+def _train_inserted_transaction(mapper, connection, target):
+    if trains_model(target.category_source):
+        _mark_training(object_session(target), target.user_id, target.category_id, target.description, 1)
+
+def _train_updated_transaction(mapper, connection, target):
+    state = inspect(target)
+    category_history = state.attrs.category_id.history
+    description_history = state.attrs.description.history
+    source_history = state.attrs.category_source.history
+    if not any(history.has_changes() for history in (category_history, description_history, source_history)):
+        return
+    
+    # Desfazer a contribuição anterior e somar a nova; categorias automáticas nunca foram somadas
+    old_category_id = category_history.deleted[0] if category_history.deleted else target.category_id
+    old_description = description_history.deleted[0] if description_history.deleted else target.description
+    old_source = source_history.deleted[0] if source_history.deleted else target.category_source
+    session = object_session(target)
+    if trains_model(old_source):
+        _mark_training(session, target.user_id, old_category_id, old_description, -1)
+    if trains_model(target.category_source):
+        _mark_training(session, target.user_id, target.category_id, target.description, 1)
+
+def _train_deleted_transaction(mapper, connection, target):
+    if trains_model(target.category_source):
+        _mark_training(object_session(target), target.user_id, target.category_id, target.description, -1)
+
+# Valores anteriores usados para desfazer o treino ao editar uma transação
+track_previous_values('category_id', 'description', 'category_source')
+
+event.listen(Transaction, 'before_update', _confirm_category)
+event.listen(Transaction, 'after_insert', _train_inserted_transaction)
+event.listen(Transaction, 'after_update', _train_updated_transaction)
+event.listen(Transaction, 'after_delete', _train_deleted_transaction)
+
+@event.listens_for(Session, 'after_flush')
+def _write_model_training(session, flush_context):
+    """Gravar as contagens do modelo na mesma transação das alterações"""
+    pending = session.info.pop('model_pending', None)
+    if not pending:
+        return
+    
+    documents = [
+        (user_id, category_id, tokenize(normalize_text(description)), sign)
+        for user_id, category_id, description, sign in pending
+    ]
+    write_training_deltas(session.connection(), documents)
+    session.info.setdefault('model_trained', []).extend(documents)
+
+event.listen(CategorizationRule, 'after_insert', _mark_rule_saved)
+event.listen(CategorizationRule, 'after_update', _mark_rule_saved)
+event.listen(CategorizationRule, 'after_delete', _mark_rule_deleted)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_categories(session):
+    """Atualizar caches e índices somente após o commit das alterações"""
+    for user_id in session.info.pop('changed_category_owners', ()):
+        category_map_cache.invalidate(user_id)
+    for change in session.info.pop('changed_rules', ()):
+        user_rule_index.apply_change(*change)
+    for document in session.info.pop('model_trained', ()):
+        user_model_cache.apply_training(*document)
+    for user_id in session.info.pop('rebuilt_models', ()):
+        user_model_cache.invalidate(user_id)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_categories(session):
+    """Descartar alterações registradas que não foram confirmadas"""
+    session.info.pop('changed_category_owners', None)
+    session.info.pop('changed_rules', None)
+    session.info.pop('model_pending', None)
+    session.info.pop('model_trained', None)
+    session.info.pop('rebuilt_models', None)
+
+# Autômato das palavras-chave padrão, compilado uma única vez por processo
+def uncategorized_rows_query(user_id: int, limit: int, after_id: int = 0):
+    """(id, descrição, valor) das próximas transações sem categoria após after_id, em ordem de id"""
+    return db.session.query(
+        Transaction.id,
+        Transaction.description,
+        Transaction.amount
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.category_id.is_(None),
+        Transaction.id > after_id
+    ).order_by(Transaction.id).limit(limit)
+
+_default_keyword_matcher = None
+_default_keyword_matcher_lock = threading.Lock()
 
 class CategorizationService:
     """Serviço para categorização automatizada de transações"""
     
     def __init__(self):
         # Palavras-chave para categorização automática
-        self.category_keywords = {
-            'Alimentação': [
-                'restaurante', 'lanchonete', 'padaria', 'supermercado', 'mercado',
-                'ifood', 'uber eats', 'delivery', 'pizza', 'hamburguer', 'mcdonalds',
-                'burger king', 'subway', 'starbucks', 'cafe', 'bar', 'boteco',
-                'açougue', 'hortifruti', 'feira', 'comida', 'alimento'
-            ],
-            'Transporte': [
-                'uber', 'taxi', 'posto', 'combustivel', 'gasolina', 'etanol',
-                'onibus', 'metro', 'trem', 'passagem', 'estacionamento',
-                'pedagio', 'mecanica', 'oficina', 'pneu', 'oleo', 'revisao'
-            ],
-            'Moradia': [
-                'aluguel', 'condominio', 'iptu', 'energia', 'luz', 'agua',
-                'gas', 'internet', 'telefone', 'limpeza', 'reforma',
-                'material construcao', 'tinta', 'eletricista', 'encanador'
-            ],
-            'Saúde': [
-                'farmacia', 'drogaria', 'medico', 'dentista', 'hospital',
-                'clinica', 'laboratorio', 'exame', 'consulta', 'remedio',
-                'medicamento', 'plano saude', 'convenio', 'fisioterapia'
-            ],
-            'Educação': [
-                'escola', 'faculdade', 'universidade', 'curso', 'livro',
-                'material escolar', 'mensalidade', 'matricula', 'aula',
-                'professor', 'educacao', 'estudo'
-            ],
-            'Lazer': [
-                'cinema', 'teatro', 'show', 'festa', 'balada', 'viagem',
-                'hotel', 'pousada', 'turismo', 'parque', 'shopping',
-                'jogo', 'netflix', 'spotify', 'streaming', 'academia',
-                'esporte', 'ginasio'
-            ],
-            'Compras': [
-                'loja', 'shopping', 'roupa', 'sapato', 'calcado', 'acessorio',
-                'eletronico', 'celular', 'computador', 'notebook', 'tv',
-                'geladeira', 'fogao', 'microondas', 'presente', 'gift'
-            ],
-            'Serviços': [
-                'banco', 'cartorio', 'advogado', 'contador', 'seguro',
-                'manutencao', 'conserto', 'lavanderia', 'cabeleireiro',
-                'salao', 'barbeiro', 'estetica'
-            ],
-            'Salário': [
-                'salario', 'ordenado', 'pagamento', 'empresa', 'trabalho',
-                'pix salario', 'deposito salario', 'folha pagamento'
-            ],
-            'Freelance': [
-                'freelance', 'freela', 'autonomo', 'servico prestado',
-                'consultoria', 'projeto', 'trabalho extra'
-            ],
-            'Investimentos': [
-                'dividendo', 'juros', 'rendimento', 'aplicacao', 'investimento',
-                'cdb', 'tesouro', 'acao', 'fundo', 'poupanca'
-            ],
-            'Vendas': [
-                'venda', 'vendeu', 'mercado livre', 'olx', 'marketplace',
-                'comissao', 'produto vendido'
-            ]
-        }
+        self.category_keywords = DEFAULT_CATEGORY_KEYWORDS
+        self._keyword_matcher = None
+    
+    def get_keyword_matcher(self) -> KeywordMatcher:
+        """Obter o autômato compilado para as palavras-chave do serviço"""
+        global _default_keyword_matcher
+        
+        if self._keyword_matcher is not None:
+            return self._keyword_matcher
+        
+        if self.category_keywords is DEFAULT_CATEGORY_KEYWORDS:
+            with _default_keyword_matcher_lock:
+                if _default_keyword_matcher is None:
+                    _default_keyword_matcher = KeywordMatcher(DEFAULT_CATEGORY_KEYWORDS, self.normalize_text)
+            self._keyword_matcher = _default_keyword_matcher
+        else:
+            # Tabela personalizada nesta instância: compilar apenas para ela
+            self._keyword_matcher = KeywordMatcher(self.category_keywords, self.normalize_text)
+        
+        return self._keyword_matcher
     
     def normalize_text(self, text: str) -> str:
         """Normalizar texto para comparação"""
-        if not text:
-            return ""
+        return normalize_text(text)
+    
+    def get_category_map(self, user_id: int, category_type: Optional[str] = None) -> CategoryMap:
+        """Obter o mapa nome normalizado -> categoria disponível para o usuário"""
+        category_map = category_map_cache.get(user_id, category_type)
+        if category_map is not None:
+            return category_map
         
-        # Converter para minúsculas e remover acentos
-        text = text.lower()
-        text = re.sub(r'[áàâãä]', 'a', text)
-        text = re.sub(r'[éèêë]', 'e', text)
-        text = re.sub(r'[íìîï]', 'i', text)
-        text = re.sub(r'[óòôõö]', 'o', text)
-        text = re.sub(r'[úùûü]', 'u', text)
-        text = re.sub(r'[ç]', 'c', text)
+        query = Category.query.filter(
+            (Category.is_default == True) | (Category.user_id == user_id)
+        )
+        if category_type:
+            query = query.filter(Category.category_type == category_type)
+        
+        category_map = CategoryMap(
+            (self.normalize_text(cat.name), CategoryInfo(cat.id, cat.name, cat.category_type, cat.color, cat.icon))
+            for cat in query.all()
+        )
+        category_map_cache.set(user_id, category_type, category_map)
+        return category_map
+    
+    def get_category(self, user_id: int, category_id: int) -> Optional[CategoryInfo]:
+        """Buscar uma categoria do usuário pelo id usando o mapa em cache"""
+        return self.get_category_map(user_id).by_id.get(category_id)
+    
+    def get_user_rules(self, user_id: int) -> UserRuleSet:
+        """Obter o índice de regras personalizadas do usuário"""
+        rule_set = user_rule_index.get(user_id, None)
+        if rule_set is not None:
+            return rule_set
         
-        # Remover caracteres especiais
-        text = re.sub(r'[^a-z0-9\s]', ' ', text)
+        rules = db.session.query(
+            CategorizationRule.id,
+            CategorizationRule.normalized_keyword,
+            CategorizationRule.category_id
+        ).filter(CategorizationRule.user_id == user_id).all()
         
-        # Remover espaços extras
-        text = re.sub(r'\s+', ' ', text).strip()
+        rule_set = UserRuleSet(rules)
+        user_rule_index.set(user_id, None, rule_set)
+        return rule_set
+    
+    def get_user_model(self, user_id: int) -> UserCategoryModel:
+        """Obter o modelo de categorização aprendido com o histórico do usuário"""
+        model = user_model_cache.get(user_id, None)
+        if model is not None:
+            return model
         
-        return text
+        model = load_user_model(user_id)
+        user_model_cache.set(user_id, None, model)
+        return model
     
+    @timed('categorization')
     def categorize_transaction(self, description: str, amount: float, user_id: int) -> Optional[int]:
         """Categorizar uma transação baseada na descrição"""
         if not description:
@@ -101,39 +417,48 @@ class CategorizationService:
         # Determinar se é receita ou despesa baseado no valor
         transaction_type = 'income' if amount > 0 else 'expense'
         
-        # Buscar categorias disponíveis para o usuário
-        available_categories = Category.query.filter(
-            (Category.is_default == True) | (Category.user_id == user_id),
-            Category.category_type == transaction_type
-        ).all()
+        # Mapeamento de nome para categoria disponível para o usuário (em cache)
+        category_map = self.get_category_map(user_id, transaction_type)
+        
+        best_match = self.match_category(
+            normalized_description, category_map, self.get_user_rules(user_id), self.get_user_model(user_id)
+        )
+        return best_match.id if best_match else None
+    
+    def match_category(self, normalized_description: str, category_map: CategoryMap,
+                       user_rules: Optional[UserRuleSet] = None,
+                       user_model: Optional[UserCategoryModel] = None) -> Optional[CategoryInfo]:
+        """Escolher a categoria de maior score para uma descrição já normalizada"""
+        # Regras do usuário têm prioridade sobre as palavras-chave padrão
+        if user_rules is not None:
+            for category_id, _, _ in user_rules.match(normalized_description):
+                category = category_map.by_id.get(category_id)
+                if category:
+                    return category
         
-        # Criar mapeamento de nome para categoria
-        category_map = {self.normalize_text(cat.name): cat for cat in available_categories}
+        # Em seguida, o modelo aprendido com o histórico do usuário
+        if user_model is not None:
+            prediction = user_model.predict(tokenize(normalized_description), category_map.by_id)
+            if prediction and prediction[1] >= MIN_CONFIDENCE:
+                return category_map.by_id[prediction[0]]
         
-        # Buscar por palavras-chave
+        # Buscar todas as palavras-chave em uma única passada
         best_match = None
         max_score = 0
         
-        for category_name, keywords in self.category_keywords.items():
+        for category_name, (score, _) in self.get_keyword_matcher().match(normalized_description).items():
             # Verificar se a categoria existe para o usuário
             normalized_category = self.normalize_text(category_name)
             if normalized_category not in category_map:
                 continue
             
-            # Calcular score baseado nas palavras-chave encontradas
-            score = 0
-            for keyword in keywords:
-                normalized_keyword = self.normalize_text(keyword)
-                if normalized_keyword in normalized_description:
-                    # Dar mais peso para palavras-chave mais específicas
-                    score += len(normalized_keyword)
-            
             if score > max_score:
                 max_score = score
                 best_match = category_map[normalized_category]
         
-        return best_match.id if best_match else None
+        return best_match
     
+    @timed('categorization')
     def suggest_categories(self, description: str, user_id: int, limit: int = 3) -> List[Dict]:
         """Sugerir múltiplas categorias para uma transação"""
         if not description:
@@ -141,31 +466,54 @@ class CategorizationService:
         
         normalized_description = self.normalize_text(description)
         
-        # Buscar todas as categorias disponíveis
-        available_categories = Category.query.filter(
-            (Category.is_default == True) | (Category.user_id == user_id)
-        ).all()
+        # Mapeamento de nome para todas as categorias disponíveis (em cache)
+        category_map = self.get_category_map(user_id)
+        
+        # Sugestões das regras e do modelo do usuário aparecem primeiro
+        personal_suggestions = []
+        for category_id, score, matched_keywords in self.get_user_rules(user_id).match(normalized_description):
+            category = category_map.by_id.get(category_id)
+            if category:
+                personal_suggestions.append({
+                    'category_id': category.id,
+                    'category_name': category.name,
+                    'category_type': category.category_type,
+                    'score': score,
+                    'confidence': 1.0,
+                    'matched_keywords': matched_keywords,
+                    'source': 'rule'
+                })
         
-        # Criar mapeamento de nome para categoria
-        category_map = {self.normalize_text(cat.name): cat for cat in available_categories}
+        # Sugestão do modelo aprendido com o histórico do usuário
+        prediction = self.get_user_model(user_id).predict(tokenize(normalized_description), category_map.by_id)
+        if prediction and prediction[1] >= MIN_CONFIDENCE:
+            category_id, probability, matched_tokens = prediction
+            if category_id not in {suggestion['category_id'] for suggestion in personal_suggestions}:
+                category = category_map.by_id[category_id]
+                personal_suggestions.append({
+                    'category_id': category.id,
+                    'category_name': category.name,
+                    'category_type': category.category_type,
+                    'score': round(probability * 10, 2),
+                    'confidence': round(probability, 2),
+                    'matched_keywords': matched_tokens,
+                    'source': 'model'
+                })
         
         # Calcular scores para todas as categorias
         category_scores = []
+        suggested_ids = {suggestion['category_id'] for suggestion in personal_suggestions}
         
-        for category_name, keywords in self.category_keywords.items():
+        matches = self.get_keyword_matcher().match(normalized_description)
+        
+        for category_name, (score, matched_keywords) in matches.items():
             normalized_category = self.normalize_text(category_name)
             if normalized_category not in category_map:
                 continue
             
             category = category_map[normalized_category]
-            score = 0
-            matched_keywords = []
-            
-            for keyword in keywords:
-                normalized_keyword = self.normalize_text(keyword)
-                if normalized_keyword in normalized_description:
-                    score += len(normalized_keyword)
-                    matched_keywords.append(keyword)
+            if category.id in suggested_ids:
+                continue
             
             if score > 0:
                 category_scores.append({
@@ -174,31 +522,120 @@ class CategorizationService:
                     'category_type': category.category_type,
                     'score': score,
                     'confidence': min(score / 10, 1.0),  # Normalizar para 0-1
-                    'matched_keywords': matched_keywords
+                    'matched_keywords': matched_keywords,
+                    'source': 'keyword'
                 })
         
         # Ordenar por score e retornar os melhores
         category_scores.sort(key=lambda x: x['score'], reverse=True)
-        return category_scores[:limit]
-    
-    def create_categorization_rule(self, user_id: int, keyword: str, category_id: int) -> bool:
-        """Criar uma regra personalizada de categorização"""
-        # Esta funcionalidade pode ser expandida para salvar regras personalizadas
-        # Por enquanto, apenas validamos se a categoria existe
-        category = Category.query.filter(
-            Category.id == category_id,
-            (Category.is_default == True) | (Category.user_id == user_id)
+        return (personal_suggestions + category_scores)[:limit]
+    
+    def create_categorization_rule(self, user_id: int, keyword: str, category_id: int) -> Optional[CategorizationRule]:
+        """Criar (ou atualizar) uma regra personalizada de categorização"""
+        normalized_keyword = self.normalize_text(keyword)
+        if not normalized_keyword:
+            return None
+        
+        # A categoria precisa estar disponível para o usuário
+        if self.get_category(user_id, category_id) is None:
+            return None
+        
+        # Uma palavra-chave aponta para uma única categoria por usuário
+        rule = CategorizationRule.query.filter_by(
+            user_id=user_id,
+            normalized_keyword=normalized_keyword
         ).first()
+        if rule:
+            rule.keyword = keyword
+            rule.category_id = category_id
+        else:
+            rule = CategorizationRule(
+                user_id=user_id,
+                keyword=keyword,
+                normalized_keyword=normalized_keyword,
+                category_id=category_id
+            )
+            db.session.add(rule)
+        
+        db.session.flush()
+        return rule
+    
+    def delete_categorization_rule(self, user_id: int, rule_id: int) -> bool:
+        """Remover uma regra personalizada do usuário"""
+        rule = CategorizationRule.query.filter_by(id=rule_id, user_id=user_id).first()
+        if not rule:
+            return False
+        
+        db.session.delete(rule)
+        db.session.flush()
+        return True
+    
+    def rebuild_user_model(self, user_id: int) -> int:
+        """Retreinar o modelo do usuário a partir de todo o histórico categorizado"""
+        trained = rebuild_user_model(user_id, self.normalize_text)
+        # O modelo em memória é descartado após o commit
+        db.session.info.setdefault('rebuilt_models', set()).add(user_id)
+        return trained
+    
+    @timed('categorization')
+    def categorize_rows(self, user_id: int, rows) -> List[tuple]:
+        """Categorizar em memória linhas (id, descrição, valor) de um mesmo usuário"""
+        # Carregar as categorias do usuário uma única vez para todo o lote
+        category_maps = {
+            'income': self.get_category_map(user_id, 'income'),
+            'expense': self.get_category_map(user_id, 'expense')
+        }
+        user_rules = self.get_user_rules(user_id)
+        user_model = self.get_user_model(user_id)
+        
+        categorized = []
+        for row in rows:
+            transaction_id, description, amount = row[0], row[1], row[2]
+            category = None
+            if description:
+                transaction_type = 'income' if amount > 0 else 'expense'
+                category = self.match_category(
+                    self.normalize_text(description), category_maps[transaction_type], user_rules, user_model
+                )
+            categorized.append((transaction_id, description, category))
+        
+        return categorized
+    
+    def apply_categories(self, user_id: int, categorized: List[tuple]) -> int:
+        """Gravar as categorias com um UPDATE em massa por categoria"""
+        ids_by_category = {}
+        for transaction_id, _, category in categorized:
+            if category:
+                ids_by_category.setdefault(category.id, []).append(transaction_id)
+        
+        updated = 0
+        for category_id, transaction_ids in ids_by_category.items():
+            # O UPDATE em massa não dispara os eventos do ORM: ajustar rollups e orçamentos aqui
+            record_budget_deltas(db.session, record_recategorization(user_id, transaction_ids, category_id))
+            
+            # Só atualiza linhas que continuam sem categoria
+            updated += Transaction.query.filter(
+                Transaction.user_id == user_id,
+                Transaction.id.in_(transaction_ids),
+                Transaction.category_id.is_(None)
+            ).update({
+                Transaction.category_id: category_id,
+                Transaction.category_source: AUTO_CATEGORY_SOURCE
+            }, synchronize_session=False)
         
-        return category is not None
+        if updated:
+            bump_data_versions(db.session.connection(), [user_id])
+        
+        return updated
     
+    @timed('categorization')
     def batch_categorize(self, user_id: int, limit: int = 100) -> Dict:
         """Categorizar em lote transações sem categoria"""
-        # Buscar transações sem categoria
-        uncategorized_transactions = Transaction.query.filter(
-            Transaction.user_id == user_id,
-            Transaction.category_id.is_(None)
-        ).limit(limit).all()
+        # Buscar apenas as colunas necessárias das transações sem categoria
+        uncategorized_rows = uncategorized_rows_query(user_id, limit).all()
+        
+        categorized = self.categorize_rows(user_id, uncategorized_rows)
+        self.apply_categories(user_id, categorized)
         
         results = {
             'total_processed': 0,
@@ -207,36 +644,36 @@ class CategorizationService:
             'details': []
         }
         
-        for transaction in uncategorized_transactions:
+        for transaction_id, description, category in categorized:
             results['total_processed'] += 1
             
-            # Tentar categorizar
-            suggested_category_id = self.categorize_transaction(
-                transaction.description,
-                transaction.amount,
-                user_id
-            )
-            
-            if suggested_category_id:
-                # Atualizar a transação
-                transaction.category_id = suggested_category_id
+            if category:
                 results['categorized'] += 1
-                
-                # Obter nome da categoria para o resultado
-                category = Category.query.get(suggested_category_id)
                 results['details'].append({
-                    'transaction_id': transaction.id,
-                    'description': transaction.description,
-                    'suggested_category': category.name if category else 'Desconhecida',
+                    'transaction_id': transaction_id,
+                    'description': description,
+                    'suggested_category': category.name,
                     'status': 'categorized'
                 })
             else:
                 results['uncategorized'] += 1
                 results['details'].append({
-                    'transaction_id': transaction.id,
-                    'description': transaction.description,
+                    'transaction_id': transaction_id,
+                    'description': description,
                     'status': 'uncategorized'
                 })
         
         return results
 
+_service_instance = None
+_service_instance_lock = threading.Lock()
+
+def get_categorization_service() -> CategorizationService:
+    """Obter a instância do serviço compartilhada pelo processo"""
+    global _service_instance
+    
+    if _service_instance is None:
+        with _service_instance_lock:
+            if _service_instance is None:
+                _service_instance = CategorizationService()
+    return _service_instance
@@ -0,0 +1,27 @@
+from typing import Dict, List
+from sqlalchemy.dialects import postgresql, sqlite
+
+def increment_counters(connection, model_class, key_columns: List[str], rows: List[Dict], increment_columns: List[str]):
+    """Somar contadores com upsert em lote (executemany)"""
+    table = model_class.__table__
+    dialect = connection.dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert(table) if dialect == 'sqlite' else postgresql.insert(table)
+        statement = insert.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={column: table.c[column] + insert.excluded[column] for column in increment_columns}
+        )
+        connection.execute(statement, rows)
+        return
+
+    # Outros bancos: UPDATE e, se a linha não existir, INSERT
+    for row in rows:
+        condition = [table.c[column] == row[column] for column in key_columns]
+        result = connection.execute(
+            table.update().where(*condition).values(
+                {column: table.c[column] + row[column] for column in increment_columns}
+            )
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**row))
@@ -0,0 +1,129 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify, current_app
+from src.models.user import db
+from src.models.budget import Goal
+from src.routes.ai_advisor import FinancialAdvisor, active_budget_count_query, pending_goal_count_query
+from src.services.rollups import summarize_since
+from src.services.response_cache import cached_by_data_version
+from src.services.serialization import goal_serializer
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+DASHBOARD_FIELDS = ('summary', 'budgets', 'goals', 'insights')
+# Mesma janela usada pelo assessor, para que resumo e insights concordem
+SUMMARY_WINDOW_DAYS = 90
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """Pool pequeno e compartilhado para as consultas independentes do dashboard"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='dashboard')
+        return _executor
+
+def _run_in_app_context(app, function, *args):
+    # Cada worker usa a própria sessão do contexto: Session não é thread-safe
+    with app.app_context():
+        return function(*args)
+
+def _supports_concurrent_queries():
+    # SQLite em memória compartilha uma única conexão entre as threads
+    url = db.engine.url
+    return not (url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'))
+
+def load_summary(user_id):
+    return summarize_since(user_id, datetime.utcnow() - timedelta(days=SUMMARY_WINDOW_DAYS))
+
+def load_budgets(user_id):
+    return FinancialAdvisor().analyze_budgets(user_id)
+
+def load_goals(user_id):
+    rows = goal_serializer.query().filter(
+        Goal.user_id == user_id,
+        Goal.is_achieved == False
+    ).order_by(Goal.target_date).all()
+    return goal_serializer.serialize_all(rows)
+
+def count_active_budgets(user_id):
+    return active_budget_count_query(user_id).scalar()
+
+def count_pending_goals(user_id):
+    return pending_goal_count_query(user_id).scalar()
+
+def build_dashboard(user_id, fields):
+    """Montar as seções pedidas a partir de uma única análise compartilhada"""
+    tasks = {}
+    if 'summary' in fields or 'insights' in fields:
+        tasks['summary'] = load_summary
+    # Os insights só precisam das contagens quando as listas não foram pedidas
+    if 'budgets' in fields:
+        tasks['budgets'] = load_budgets
+    elif 'insights' in fields:
+        tasks['active_budgets'] = count_active_budgets
+    if 'goals' in fields:
+        tasks['goals'] = load_goals
+    elif 'insights' in fields:
+        tasks['pending_goals'] = count_pending_goals
+
+    if len(tasks) > 1 and _supports_concurrent_queries():
+        app = current_app._get_current_object()
+        executor = get_executor()
+        futures = {
+            # copy_context leva aos workers o estado da requisição (ex.: métricas da instrumentação)
+            name: executor.submit(copy_context().run, _run_in_app_context, app, function, user_id)
+            for name, function in tasks.items()
+        }
+        results = {name: future.result() for name, future in futures.items()}
+    else:
+        results = {name: function(user_id) for name, function in tasks.items()}
+
+    dashboard = {}
+    if 'summary' in fields:
+        summary = results['summary']
+        dashboard['summary'] = {
+            'total_income': summary['total_income'],
+            'total_expense': summary['total_expense'],
+            'balance': summary['balance'],
+            'transaction_count': summary['transaction_count'],
+            'expense_by_category': summary['expense_by_category']
+        }
+    if 'budgets' in fields:
+        dashboard['budgets'] = results['budgets']
+    if 'goals' in fields:
+        dashboard['goals'] = results['goals']
+    if 'insights' in fields:
+        advisor = FinancialAdvisor()
+        active_budgets = len(results['budgets']) if 'budgets' in results else results['active_budgets']
+        pending_goals = len(results['goals']) if 'goals' in results else results['pending_goals']
+        user_analysis = advisor.build_user_analysis(results['summary'], active_budgets, pending_goals)
+        dashboard['insights'] = advisor.generate_insights(user_analysis)
+    return dashboard
+
+@dashboard_bp.route('/dashboard', methods=['GET'])
+@cached_by_data_version
+def get_dashboard():
+    """Resumo, orçamentos, metas e insights do usuário em uma única requisição"""
+    try:
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return jsonify({'error': 'user_id é obrigatório'}), 400
+
+        # Seleção opcional de seções: ?fields=summary,budgets
+        fields = request.args.get('fields')
+        fields = [field.strip() for field in fields.split(',') if field.strip()] if fields else list(DASHBOARD_FIELDS)
+        unknown = [field for field in fields if field not in DASHBOARD_FIELDS]
+        if unknown:
+            return jsonify({'error': f"Campos inválidos: {', '.join(unknown)}"}), 400
+
+        dashboard = build_dashboard(user_id, set(fields))
+        dashboard['timestamp'] = datetime.utcnow().isoformat()
+        return jsonify(dashboard), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,212 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, FrozenSet, Optional, Tuple
+from flask import Response, request
+from sqlalchemy import event
+
+# Limites (s) dos buckets do histograma de latência por rota
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_PATH = '/metrics'
+
+class RequestMetrics:
+    """Consultas SQL, tempos e spans acumulados durante uma requisição"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.spans: Dict[str, float] = {}
+        # Workers do dashboard gravam na mesma requisição a partir de outras threads
+        self.lock = threading.Lock()
+
+    def add_sql(self, elapsed: float):
+        with self.lock:
+            self.sql_count += 1
+            self.sql_time += elapsed
+
+    def add_span(self, name: str, elapsed: float):
+        with self.lock:
+            self.spans[name] = self.spans.get(name, 0.0) + elapsed
+
+    def server_timing(self) -> str:
+        total = time.perf_counter() - self.start
+        parts = [f'db;desc="{self.sql_count} queries";dur={self.sql_time * 1000:.1f}']
+        parts.extend(f'{name};dur={elapsed * 1000:.1f}' for name, elapsed in self.spans.items())
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+# Métricas da requisição atual; None quando a instrumentação está desligada
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar('request_metrics', default=None)
+# Spans abertos no contexto atual; cada worker do dashboard roda numa cópia do contexto e tem o seu
+_active_spans: ContextVar[FrozenSet[str]] = ContextVar('active_spans', default=frozenset())
+
+@contextmanager
+def span(name: str):
+    """Medir um trecho de código como um span nomeado da requisição atual"""
+    metrics = _current.get()
+    active = _active_spans.get()
+    # Desligado, ou span de mesmo nome já aberto (chamadas aninhadas contam uma vez)
+    if metrics is None or name in active:
+        yield
+        return
+    token = _active_spans.set(active | {name})
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _active_spans.reset(token)
+        metrics.add_span(name, time.perf_counter() - start)
+
+def timed(name: str):
+    """Decorator que mede a função como um span; sem instrumentação, custa uma leitura de ContextVar"""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return function(*args, **kwargs)
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class MetricsRegistry:
+    """Contadores e histogramas por rota, no formato texto do Prometheus"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        # (rota, método) -> [contagens por bucket..., +Inf], soma, consultas SQL, tempo SQL
+        self.latency: Dict[Tuple[str, str], list] = {}
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.spans: Dict[Tuple[str, str], float] = {}
+
+    def observe(self, route: str, method: str, status: int, elapsed: float, metrics: RequestMetrics):
+        with self.lock:
+            entry = self.latency.get((route, method))
+            if entry is None:
+                entry = self.latency[(route, method)] = [[0] * (len(self.buckets) + 1), 0.0, 0, 0.0]
+            # Contagem do primeiro bucket que comporta o valor; acumulada só na exportação
+            entry[0][bisect_left(self.buckets, elapsed)] += 1
+            entry[1] += elapsed
+            entry[2] += metrics.sql_count
+            entry[3] += metrics.sql_time
+            self.requests[(route, method, status)] = self.requests.get((route, method, status), 0) + 1
+            for name, span_elapsed in metrics.spans.items():
+                self.spans[(route, name)] = self.spans.get((route, name), 0.0) + span_elapsed
+
+    def render(self) -> str:
+        with self.lock:
+            latency = {key: (list(entry[0]),) + tuple(entry[1:]) for key, entry in self.latency.items()}
+            requests = dict(self.requests)
+            spans = dict(self.spans)
+
+        lines = [
+            '# HELP financeflow_request_duration_seconds Latência das requisições por rota',
+            '# TYPE financeflow_request_duration_seconds histogram'
+        ]
+        for (route, method), (counts, total, _, _) in sorted(latency.items()):
+            labels = f'route="{_escape(route)}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (None,), counts):
+                cumulative += count
+                le = '+Inf' if bound is None else repr(bound)
+                lines.append(f'financeflow_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'financeflow_request_duration_seconds_sum{{{labels}}} {total:.6f}')
+            lines.append(f'financeflow_request_duration_seconds_count{{{labels}}} {cumulative}')
+
+        lines += [
+            '# HELP financeflow_requests_total Requisições por rota e status',
+            '# TYPE financeflow_requests_total counter'
+        ]
+        for (route, method, status), count in sorted(requests.items()):
+            lines.append(f'financeflow_requests_total{{route="{_escape(route)}",method="{method}",status="{status}"}} {count}')
+
+        lines += [
+            '# HELP financeflow_sql_queries_total Consultas SQL executadas por rota',
+            '# TYPE financeflow_sql_queries_total counter'
+        ]
+        for (route, method), (_, _, sql_count, _) in sorted(latency.items()):
+            lines.append(f'financeflow_sql_queries_total{{route="{_escape(route)}",method="{method}"}} {sql_count}')
+
+        lines += [
+            '# HELP financeflow_sql_duration_seconds_total Tempo gasto em consultas SQL por rota',
+            '# TYPE financeflow_sql_duration_seconds_total counter'
+        ]
+        for (route, method), (_, _, _, sql_time) in sorted(latency.items()):
+            lines.append(f'financeflow_sql_duration_seconds_total{{route="{_escape(route)}",method="{method}"}} {sql_time:.6f}')
+
+        lines += [
+            '# HELP financeflow_span_duration_seconds_total Tempo gasto nos trechos instrumentados por rota',
+            '# TYPE financeflow_span_duration_seconds_total counter'
+        ]
+        for (route, name), elapsed in sorted(spans.items()):
+            lines.append(f'financeflow_span_duration_seconds_total{{route="{_escape(route)}",span="{name}"}} {elapsed:.6f}')
+
+        return '\n'.join(lines) + '\n'
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+metrics_registry = MetricsRegistry()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault('query_start', []).append((context, time.perf_counter()))
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    _, start = starts.pop()
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_sql(time.perf_counter() - start)
+
+def _discard_query_start(exception_context):
+    """Consulta com erro não chega ao after_cursor_execute: sem isto, o início dela ficaria
+    na conexão, que volta ao pool, e desalinharia a medição das consultas seguintes"""
+    connection = exception_context.connection
+    starts = connection.info.get('query_start') if connection is not None else None
+    if starts and starts[-1][0] is exception_context.execution_context:
+        starts.pop()
+
+def _start_request():
+    _current.set(RequestMetrics())
+
+def _finish_request(response):
+    metrics = _current.get()
+    if metrics is None:
+        return response
+    response.headers['Server-Timing'] = metrics.server_timing()
+
+    route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    method = request.method
+    status = response.status_code
+
+    # Respostas em streaming só terminam quando o corpo é enviado: a latência é registrada no fechamento
+    def record():
+        metrics_registry.observe(route, method, status, time.perf_counter() - metrics.start, metrics)
+    response.call_on_close(record)
+    return response
+
+def _reset_request(exception=None):
+    # Em respostas em streaming o teardown roda ao fim do corpo, fora do contexto do before_request
+    _current.set(None)
+
+def metrics_endpoint():
+    """Métricas por rota no formato texto do Prometheus"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+def init_instrumentation(app, engine):
+    """Ligar a instrumentação por requisição: eventos do engine, Server-Timing e /metrics"""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _discard_query_start)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_reset_request)
+    app.add_url_rule(METRICS_PATH, 'metrics', metrics_endpoint)
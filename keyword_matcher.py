@@ -0,0 +1,95 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class KeywordMatcher:
+    """Autômato Aho-Corasick para buscar várias palavras-chave em uma única passada"""
+
+    def __init__(self, keywords_by_label: Dict[str, Iterable[str]], normalize: Callable[[str], str]):
+        # Rótulos na ordem original (a ordem decide empates na categorização)
+        self.labels: List[str] = list(keywords_by_label.keys())
+        self._label_order = {label: index for index, label in enumerate(self.labels)}
+
+        # Cada padrão normalizado aponta para as entradas (rótulo, palavra original, posição)
+        self._pattern_entries: List[List[Tuple[str, str, int]]] = []
+        self._pattern_lengths: List[int] = []
+        pattern_ids: Dict[str, int] = {}
+
+        for label, keywords in keywords_by_label.items():
+            for position, keyword in enumerate(keywords):
+                pattern = normalize(keyword)
+                if not pattern:
+                    continue
+                if pattern not in pattern_ids:
+                    pattern_ids[pattern] = len(self._pattern_entries)
+                    self._pattern_entries.append([])
+                    self._pattern_lengths.append(len(pattern))
+                self._pattern_entries[pattern_ids[pattern]].append((label, keyword, position))
+
+        self._build(pattern_ids)
+
+    def _build(self, pattern_ids: Dict[str, int]):
+        """Construir a trie, os links de falha e a tabela de transições completa"""
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+
+        for pattern, pattern_id in pattern_ids.items():
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(pattern_id)
+
+        # Busca em largura para calcular links de falha e herdar saídas dos sufixos
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(transitions) for transitions in goto]
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            outputs[state].extend(outputs[fail[state]])
+            # Transições herdadas do estado de falha transformam a trie em um DFA
+            for char, target in delta[fail[state]].items():
+                delta[state].setdefault(char, target)
+            for char, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(char, 0) if state else 0
+                queue.append(child)
+
+        self._delta = delta
+        self._outputs: List[Optional[Tuple[int, ...]]] = [tuple(out) if out else None for out in outputs]
+
+    def find(self, normalized_text: str) -> set:
+        """Retornar os ids dos padrões presentes no texto já normalizado"""
+        delta = self._delta
+        outputs = self._outputs
+        found = set()
+        state = 0
+        for char in normalized_text:
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+    def match(self, normalized_text: str) -> Dict[str, Tuple[int, List[str]]]:
+        """Calcular score e palavras-chave encontradas por rótulo"""
+        if not normalized_text:
+            return {}
+
+        scores: Dict[str, int] = {}
+        matched: Dict[str, List[Tuple[int, str]]] = {}
+        for pattern_id in self.find(normalized_text):
+            weight = self._pattern_lengths[pattern_id]
+            for label, keyword, position in self._pattern_entries[pattern_id]:
+                scores[label] = scores.get(label, 0) + weight
+                matched.setdefault(label, []).append((position, keyword))
+
+        # Preservar a ordem dos rótulos e das palavras-chave da tabela original
+        return {
+            label: (scores[label], [keyword for _, keyword in sorted(matched[label])])
+            for label in sorted(scores, key=self._label_order.__getitem__)
+        }
@@ -6,12 +6,18 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 from src.models.user import db
+from src.models.storage import init_storage
 from src.routes.user import user_bp
 from src.routes.transaction import transaction_bp
 from src.routes.category import category_bp
 from src.routes.budget import budget_bp, goal_bp
 from src.routes.categorization import categorization_bp
 from src.routes.ai_advisor import ai_advisor_bp
+from src.routes.reports import reports_bp
+from src.routes.dashboard import dashboard_bp
+from src.routes.transaction_listing import transaction_listing_bp
+from src.routes.statement_import import statement_import_bp
+from src.routes.transaction_bulk import transaction_bulk_bp
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -27,20 +33,45 @@ app.register_blueprint(budget_bp, url_prefix='/api')
 app.register_blueprint(goal_bp, url_prefix='/api')
 app.register_blueprint(categorization_bp, url_prefix='/api')
 app.register_blueprint(ai_advisor_bp, url_prefix='/api')
+app.register_blueprint(reports_bp, url_prefix='/api')
+app.register_blueprint(dashboard_bp, url_prefix='/api')
+app.register_blueprint(transaction_listing_bp, url_prefix='/api')
+app.register_blueprint(statement_import_bp, url_prefix='/api')
+app.register_blueprint(transaction_bulk_bp, url_prefix='/api')
 
-# Configuração do banco de dados
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+# Configuração do banco de dados: DATABASE_URL, pool (DB_POOL_*) e perfil (STORAGE_PROFILE) vêm do ambiente
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
+init_storage(app, db, f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}")
 
 # Importar todos os modelos para garantir que sejam criados
 from src.models.user import User
 from src.models.transaction import Transaction
 from src.models.category import Category
 from src.models.budget import Budget, Goal
+from src.models.categorization_job import CategorizationJob
+from src.models.categorization_rule import CategorizationRule
+from src.models.categorization_model import CategorizationTokenCount, CategorizationCategoryCount
+from src.models.monthly_rollup import MonthlyRollup
+from src.models.user_data_version import UserDataVersion
+from src.models.migrations import run_migrations
+from src.services.rollups import rebuild_rollups_command
+from src.services.transaction_search import rebuild_search_index_command
+from src.services.budget_tracking import rebuild_budget_spent_command
+from src.services.instrumentation import init_instrumentation
+
+app.cli.add_command(rebuild_rollups_command)
+app.cli.add_command(rebuild_search_index_command)
+app.cli.add_command(rebuild_budget_spent_command)
 
 with app.app_context():
     db.create_all()
+    run_migrations(db.engine)
+
+# Instrumentação opcional (FINANCEFLOW_INSTRUMENTATION=1): Server-Timing por requisição e /metrics
+app.config['INSTRUMENTATION_ENABLED'] = os.environ.get('FINANCEFLOW_INSTRUMENTATION', '').lower() in ('1', 'true', 'yes')
+if app.config['INSTRUMENTATION_ENABLED']:
+    with app.app_context():
+        init_instrumentation(app, db.engine)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -0,0 +1,151 @@
+from datetime import datetime
+from sqlalchemy import inspect, text
+from src.models.user import db
+
+# db.create_all() só cria tabelas novas; alterações em tabelas existentes
+# (índices, colunas) são aplicadas aqui, em ordem, uma única vez por banco.
+MIGRATIONS = []
+
+def migration(version):
+    """Registrar uma migração do esquema"""
+    def register(function):
+        MIGRATIONS.append((version, function))
+        return function
+    return register
+
+def _create_indexes(connection, table_name, *index_names):
+    """Criar, pelo nome, índices declarados no modelo; cada migração cria só os que introduz,
+    já que os mais novos podem depender de colunas que ainda não existem neste ponto"""
+    indexes = {index.name: index for index in db.metadata.tables[table_name].indexes}
+    for index_name in index_names:
+        indexes[index_name].create(bind=connection, checkfirst=True)
+
+@migration('0001_query_indexes')
+def add_query_indexes(connection):
+    """Índices compostos para as consultas por usuário e período"""
+    _create_indexes(
+        connection, 'transactions',
+        'ix_transactions_user_date', 'ix_transactions_user_category_date',
+        'ix_transactions_user_type_date', 'ix_transactions_user_uncategorized'
+    )
+    _create_indexes(connection, 'budgets', 'ix_budgets_user_active')
+    _create_indexes(connection, 'goals', 'ix_goals_user_achieved')
+    if connection.dialect.name == 'sqlite':
+        # Atualizar as estatísticas usadas pelo planejador de consultas
+        connection.execute(text('ANALYZE'))
+
+@migration('0002_monthly_rollups')
+def populate_monthly_rollups(connection):
+    """Preencher os rollups mensais a partir do histórico existente"""
+    from src.services.rollups import rebuild_rollups
+    rebuild_rollups(connection)
+
+# Colunas monetárias que passaram de reais em FLOAT para centavos inteiros
+MONEY_COLUMNS = {
+    'transactions': ('amount',),
+    'budgets': ('amount',),
+    'goals': ('target_amount', 'current_amount')
+}
+
+@migration('0003_integer_cents')
+def convert_amounts_to_cents(connection):
+    """Converter os valores monetários para centavos inteiros e recalcular os rollups"""
+    dialect = connection.dialect.name
+    for table_name, column_names in MONEY_COLUMNS.items():
+        for column_name in column_names:
+            if dialect == 'postgresql':
+                connection.execute(text(
+                    f'ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE BIGINT '
+                    f'USING ROUND({column_name} * 100)::BIGINT'
+                ))
+            else:
+                # O SQLite não altera o tipo da coluna; os valores passam a ser centavos inteiros
+                connection.execute(text(
+                    f'UPDATE {table_name} SET {column_name} = CAST(ROUND({column_name} * 100) AS INTEGER) '
+                    f'WHERE {column_name} IS NOT NULL'
+                ))
+
+    if dialect == 'postgresql':
+        for column_name in ('income_total', 'expense_total'):
+            connection.execute(text(
+                f'ALTER TABLE monthly_rollups ALTER COLUMN {column_name} TYPE BIGINT '
+                f'USING ROUND({column_name} * 100)::BIGINT'
+            ))
+
+    from src.services.rollups import rebuild_rollups
+    rebuild_rollups(connection)
+
+@migration('0004_transaction_search')
+def create_transaction_search_index(connection):
+    """Criar e preencher o índice de busca das descrições"""
+    from src.services.transaction_search import rebuild_search_index
+    rebuild_search_index(connection)
+
+@migration('0005_transaction_dedup_hash')
+def add_transaction_dedup_hash(connection):
+    """Coluna e índice do hash de deduplicação usado na importação de extratos"""
+    from src.services.statement_importer import backfill_dedup_hashes
+    columns = {column['name'] for column in inspect(connection).get_columns('transactions')}
+    if 'dedup_hash' not in columns:
+        connection.execute(text('ALTER TABLE transactions ADD COLUMN dedup_hash VARCHAR(40)'))
+    _create_indexes(connection, 'transactions', 'ix_transactions_user_dedup_hash')
+    backfill_dedup_hashes(connection)
+
+@migration('0006_budget_spent_amount')
+def add_budget_spent_amount(connection):
+    """Gasto e situação mantidos nos orçamentos, calculados a partir das transações existentes"""
+    from src.services.budget_tracking import recount_budgets
+    columns = {column['name'] for column in inspect(connection).get_columns('budgets')}
+    if 'spent_amount' not in columns:
+        connection.execute(text('ALTER TABLE budgets ADD COLUMN spent_amount BIGINT NOT NULL DEFAULT 0'))
+    if 'status' not in columns:
+        connection.execute(text("ALTER TABLE budgets ADD COLUMN status VARCHAR(20) NOT NULL DEFAULT 'good'"))
+    _create_indexes(connection, 'budgets', 'ix_budgets_user_category')
+    recount_budgets(connection)
+
+@migration('0007_transaction_category_source')
+def add_transaction_category_source(connection):
+    """Origem da categoria de cada transação; o modelo de categorização é retreinado só com as do usuário"""
+    from src.services.text_normalization import normalize_text
+    from src.services.transaction_classifier import rebuild_user_model
+    columns = {column['name'] for column in inspect(connection).get_columns('transactions')}
+    if 'category_source' not in columns:
+        # A origem do histórico é desconhecida: tratado como escolha do usuário, como o modelo já o contava
+        connection.execute(text("ALTER TABLE transactions ADD COLUMN category_source VARCHAR(10) NOT NULL DEFAULT 'user'"))
+    # Retreinar desfaz contagens que ficaram negativas ao editar linhas categorizadas automaticamente
+    user_ids = connection.execute(text('SELECT DISTINCT user_id FROM transactions')).scalars().all()
+    for user_id in user_ids:
+        rebuild_user_model(user_id, normalize_text, connection=connection)
+
+@migration('0008_categorization_job_heartbeat')
+def add_categorization_job_heartbeat(connection):
+    """Dono e sinal de vida dos jobs de categorização, para que só um worker processe cada job"""
+    columns = {column['name'] for column in inspect(connection).get_columns('categorization_jobs')}
+    if 'claimed_by' not in columns:
+        connection.execute(text('ALTER TABLE categorization_jobs ADD COLUMN claimed_by VARCHAR(64)'))
+    if 'heartbeat_at' not in columns:
+        connection.execute(text('ALTER TABLE categorization_jobs ADD COLUMN heartbeat_at TIMESTAMP'))
+    # Jobs em andamento de antes desta versão não têm dono: ficam como falhos e podem ser retomados
+    connection.execute(text(
+        "UPDATE categorization_jobs SET status = 'failed', error = :error, finished_at = :now "
+        "WHERE status IN ('pending', 'running') AND claimed_by IS NULL"
+    ), {'error': 'Job interrompido na atualização do sistema', 'now': datetime.utcnow()})
+    _create_indexes(connection, 'categorization_jobs', 'ix_categorization_jobs_user_active')
+
+def run_migrations(engine):
+    """Aplicar as migrações pendentes"""
+    with engine.begin() as connection:
+        connection.execute(text(
+            'CREATE TABLE IF NOT EXISTS schema_migrations ('
+            'version VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMP NOT NULL)'
+        ))
+        applied = {row[0] for row in connection.execute(text('SELECT version FROM schema_migrations'))}
+
+        for version, function in MIGRATIONS:
+            if version in applied:
+                continue
+            function(connection)
+            connection.execute(
+                text('INSERT INTO schema_migrations (version, applied_at) VALUES (:version, :applied_at)'),
+                {'version': version, 'applied_at': datetime.utcnow()}
+            )
@@ -0,0 +1,39 @@
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.sql import type_coerce
+
+CENT = Decimal('0.01')
+
+def to_cents(value) -> int:
+    """Converter um valor em reais (int, float, Decimal ou str) para centavos exatos"""
+    if isinstance(value, int):
+        return value * 100
+    if isinstance(value, float):
+        # repr() devolve a menor representação decimal do float (10.15 e não 10.1499...)
+        value = repr(value)
+    return int((Decimal(value) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def from_cents(cents) -> float:
+    """Converter centavos para reais; a divisão de um inteiro por 100 é arredondada corretamente"""
+    return int(round(cents)) / 100
+
+def cents_to_decimal(cents) -> Decimal:
+    """Centavos como Decimal exato, para gravar totais sem passar por float"""
+    return Decimal(int(round(cents))) * CENT
+
+class Money(TypeDecorator):
+    """Valor monetário gravado como inteiro em centavos e lido em reais"""
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        # No SQLite, colunas migradas de FLOAT mantêm afinidade REAL e devolvem 1015.0
+        return None if value is None else from_cents(value)
+
+def cents(column):
+    """Ler a coluna em centavos (inteiros), sem conversão para reais"""
+    return type_coerce(column, BigInteger)
@@ -0,0 +1,26 @@
+from flask_sqlalchemy import SQLAlchemy
+from src.models.user import db
+from src.models.money import Money
+
+class MonthlyRollup(db.Model):
+    """Totais de receitas e despesas por usuário, mês e categoria"""
+    __tablename__ = 'monthly_rollups'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)  # Primeiro dia do mês
+    category_id = db.Column(db.Integer, primary_key=True, default=0)  # 0 = sem categoria
+    income_total = db.Column(Money, nullable=False, default=0)
+    income_count = db.Column(db.Integer, nullable=False, default=0)
+    expense_total = db.Column(Money, nullable=False, default=0)
+    expense_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'month': self.month.isoformat(),
+            'category_id': self.category_id or None,
+            'income_total': self.income_total,
+            'income_count': self.income_count,
+            'expense_total': self.expense_total,
+            'expense_count': self.expense_count
+        }
@@ -0,0 +1,44 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from datetime import datetime, timedelta
+from src.services.timeseries import build_timeseries, stream_columnar_json
+
+reports_bp = Blueprint('reports', __name__)
+
+def parse_date(value, default):
+    """Ler uma data AAAA-MM-DD (ou data/hora ISO) da query string"""
+    if not value:
+        return default
+    return datetime.fromisoformat(value).date()
+
+@reports_bp.route('/reports/timeseries', methods=['GET'])
+def get_timeseries():
+    """Séries temporais de receitas, despesas e saldo em formato colunar"""
+    try:
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return jsonify({'error': 'user_id é obrigatório'}), 400
+
+        granularity = request.args.get('granularity', 'month')
+        try:
+            end = parse_date(request.args.get('end_date'), datetime.utcnow().date())
+            start = parse_date(request.args.get('start_date'), end - timedelta(days=365))
+        except ValueError:
+            return jsonify({'error': 'Datas devem estar no formato AAAA-MM-DD'}), 400
+
+        # Aceita category_id repetido ou separado por vírgulas
+        category_ids = []
+        try:
+            for value in request.args.getlist('category_id'):
+                category_ids.extend(int(part) for part in value.split(',') if part.strip())
+        except ValueError:
+            return jsonify({'error': 'category_id deve ser numérico'}), 400
+
+        try:
+            report = build_timeseries(user_id, start, end, granularity, category_ids or None)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return Response(stream_with_context(stream_columnar_json(report)), mimetype='application/json')
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
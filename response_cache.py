@@ -0,0 +1,122 @@
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+from typing import Iterable, Tuple
+from flask import Response, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from src.models.user import db
+from src.models.transaction import Transaction
+from src.models.category import Category
+from src.models.budget import Budget, Goal
+from src.models.user_data_version import UserDataVersion
+from src.services.counters import increment_counters
+
+GLOBAL_VERSION_KEY = 0
+
+def bump_data_versions(connection, user_ids: Iterable[int]):
+    """Incrementar na transação atual a versão dos dados dos usuários"""
+    rows = [{'user_id': user_id, 'version': 1} for user_id in set(user_ids)]
+    if rows:
+        increment_counters(connection, UserDataVersion, ['user_id'], rows, ['version'])
+
+def get_data_version(user_id: int) -> Tuple[int, int]:
+    """Versão (do usuário, global) dos dados usados pelas respostas em cache"""
+    rows = db.session.query(UserDataVersion.user_id, UserDataVersion.version).filter(
+        UserDataVersion.user_id.in_([user_id, GLOBAL_VERSION_KEY])
+    ).all()
+    versions = dict(rows)
+    return versions.get(user_id, 0), versions.get(GLOBAL_VERSION_KEY, 0)
+
+def _mark_data_changed(mapper, connection, target):
+    """Registrar na sessão o usuário cujos dados mudaram"""
+    session = object_session(target)
+    if session is not None:
+        user_id = target.user_id if target.user_id is not None else GLOBAL_VERSION_KEY
+        session.info.setdefault('changed_data_owners', set()).add(user_id)
+
+for _model in (Transaction, Budget, Goal, Category):
+    for _event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event_name, _mark_data_changed)
+
+@event.listens_for(Session, 'after_flush')
+def _write_data_versions(session, flush_context):
+    """Gravar as novas versões na mesma transação das alterações"""
+    user_ids = session.info.pop('changed_data_owners', None)
+    if user_ids:
+        bump_data_versions(session.connection(), user_ids)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_data_versions(session):
+    """Descartar versões que não foram gravadas"""
+    session.info.pop('changed_data_owners', None)
+
+class ResponseCache:
+    """Cache LRU das respostas por (endpoint, usuário, versão dos dados)"""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+response_cache = ResponseCache()
+
+def cached_by_data_version(view):
+    """Servir a resposta do cache (ou 304) enquanto os dados do usuário não mudarem"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return view(*args, **kwargs)
+
+        # As análises usam janelas relativas a hoje, então o dia também faz parte da versão
+        version = get_data_version(user_id) + (datetime.utcnow().date().isoformat(),)
+        etag = f'{request.endpoint}-{user_id}-{version[0]}.{version[1]}-{version[2]}'
+
+        # Outros parâmetros (ex.: seleção de campos) geram respostas diferentes
+        variant = '&'.join(sorted(
+            f'{name}={value}' for name, value in request.args.items(multi=True) if name != 'user_id'
+        ))
+        if variant:
+            etag += f'-{zlib.crc32(variant.encode()):08x}'
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        key = (request.endpoint, user_id, version, variant)
+        cached = response_cache.get(key)
+        if cached is not None:
+            body, mimetype = cached
+            response = Response(body, status=200, mimetype=mimetype)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            response_cache.set(key, (response.get_data(), response.mimetype))
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return wrapper
@@ -0,0 +1,282 @@
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Tuple
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+from src.models.user import db
+from src.models.category import Category
+from src.models.transaction import Transaction
+from src.models.monthly_rollup import MonthlyRollup
+from src.models.money import cents, cents_to_decimal, from_cents, to_cents
+from src.services.amount_columns import AmountColumns, month_from_index, month_index
+from src.services.counters import increment_counters
+
+ROLLUP_TYPES = ('income', 'expense')
+TRACKED_COLUMNS = ('user_id', 'date', 'category_id', 'transaction_type', 'amount')
+
+def month_start(value) -> date:
+    """Primeiro dia do mês de uma data"""
+    return date(value.year, value.month, 1)
+
+def next_month(value) -> date:
+    """Primeiro dia do mês seguinte"""
+    return date(value.year + 1, 1, 1) if value.month == 12 else date(value.year, value.month + 1, 1)
+
+def write_rollup_totals(connection, totals: Dict[Tuple[int, date, int], Dict[str, int]]):
+    """Somar aos rollups os totais em centavos agrupados por (user_id, mês, category_id)"""
+    rows = [
+        {
+            'user_id': user_id,
+            'month': month,
+            'category_id': category_id,
+            'income_total': cents_to_decimal(values['income_total']),
+            'income_count': values['income_count'],
+            'expense_total': cents_to_decimal(values['expense_total']),
+            'expense_count': values['expense_count']
+        }
+        for (user_id, month, category_id), values in totals.items()
+        if any(values.values())
+    ]
+    if not rows:
+        return
+
+    increment_counters(
+        connection, MonthlyRollup, ['user_id', 'month', 'category_id'], rows,
+        ['income_total', 'income_count', 'expense_total', 'expense_count']
+    )
+
+    # Remover meses/categorias que ficaram sem transações
+    if any(row['income_count'] < 0 or row['expense_count'] < 0 for row in rows):
+        table = MonthlyRollup.__table__
+        connection.execute(table.delete().where(
+            table.c.user_id.in_({row['user_id'] for row in rows}),
+            table.c.income_count <= 0,
+            table.c.expense_count <= 0
+        ))
+
+def _empty_totals():
+    return {'income_total': 0, 'income_count': 0, 'expense_total': 0, 'expense_count': 0}
+
+def write_rollup_deltas(connection, deltas: Iterable[Tuple]) -> int:
+    """Somar aos rollups as variações (user_id, data, category_id, tipo, valor, sinal)"""
+    aggregated: Dict[Tuple[int, date, int], Dict[str, int]] = {}
+    processed = 0
+
+    for user_id, when, category_id, transaction_type, amount, sign in deltas:
+        processed += 1
+        if transaction_type not in ROLLUP_TYPES or when is None:
+            continue
+        key = (user_id, month_start(when), category_id or 0)
+        totals = aggregated.setdefault(key, _empty_totals())
+        totals[f'{transaction_type}_total'] += sign * to_cents(amount or 0)
+        totals[f'{transaction_type}_count'] += sign
+
+    write_rollup_totals(connection, aggregated)
+    return processed
+
+def transaction_values(target) -> Tuple:
+    """Valores atuais (user_id, data, category_id, tipo, valor) de uma transação"""
+    return tuple(getattr(target, column) for column in TRACKED_COLUMNS)
+
+def updated_transaction_deltas(target) -> list:
+    """Variações de uma transação alterada: sai dos valores antigos e entra nos novos"""
+    state = inspect(target)
+    histories = {column: state.attrs[column].history for column in TRACKED_COLUMNS}
+    if not any(history.has_changes() for history in histories.values()):
+        return []
+
+    old_values = [
+        histories[column].deleted[0] if histories[column].deleted else getattr(target, column)
+        for column in TRACKED_COLUMNS
+    ]
+    return [(*old_values, -1), (*transaction_values(target), 1)]
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    pass
+
+def track_previous_values(*columns):
+    """Carregar o valor anterior das colunas da transação mesmo com o atributo expirado (após um commit),
+    senão o histórico fica vazio; módulos que acompanham a mesma coluna compartilham um único listener"""
+    for column in columns:
+        attribute = getattr(Transaction, column)
+        if not event.contains(attribute, 'set', _load_previous_value):
+            event.listen(attribute, 'set', _load_previous_value, active_history=True)
+
+def _pending(session):
+    return session.info.setdefault('rollup_pending', [])
+
+def _rollup_inserted_transaction(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        _pending(session).append((*transaction_values(target), 1))
+
+def _rollup_updated_transaction(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        # Retirar a transação do rollup antigo e somá-la ao novo
+        _pending(session).extend(updated_transaction_deltas(target))
+
+def _rollup_deleted_transaction(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        _pending(session).append((*transaction_values(target), -1))
+
+track_previous_values(*TRACKED_COLUMNS)
+
+event.listen(Transaction, 'after_insert', _rollup_inserted_transaction)
+event.listen(Transaction, 'after_update', _rollup_updated_transaction)
+event.listen(Transaction, 'after_delete', _rollup_deleted_transaction)
+
+@event.listens_for(Session, 'after_flush')
+def _write_rollups(session, flush_context):
+    """Atualizar os rollups na mesma transação das alterações"""
+    pending = session.info.pop('rollup_pending', None)
+    if pending:
+        write_rollup_deltas(session.connection(), pending)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rollups(session):
+    """Descartar variações que não foram gravadas"""
+    session.info.pop('rollup_pending', None)
+
+def record_recategorization(user_id: int, transaction_ids, category_id: int) -> list:
+    """Mover nos rollups transações sem categoria que serão recategorizadas em massa; devolve as variações"""
+    rows = db.session.query(
+        Transaction.date,
+        Transaction.transaction_type,
+        Transaction.amount
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.id.in_(transaction_ids),
+        Transaction.category_id.is_(None)
+    ).all()
+
+    deltas = []
+    for when, transaction_type, amount in rows:
+        deltas.append((user_id, when, None, transaction_type, amount, -1))
+        deltas.append((user_id, when, category_id, transaction_type, amount, 1))
+    write_rollup_deltas(db.session.connection(), deltas)
+    return deltas
+
+def rebuild_rollups(connection, user_id: Optional[int] = None) -> int:
+    """Recalcular os rollups a partir das transações (todos os usuários ou um só)"""
+    rollups = MonthlyRollup.__table__
+    transactions = Transaction.__table__
+
+    delete = rollups.delete()
+    query = select(
+        transactions.c.user_id,
+        transactions.c.date,
+        transactions.c.category_id,
+        transactions.c.transaction_type,
+        cents(transactions.c.amount)
+    ).where(transactions.c.transaction_type.in_(ROLLUP_TYPES))
+    if user_id is not None:
+        delete = delete.where(rollups.c.user_id == user_id)
+        query = query.where(transactions.c.user_id == user_id)
+
+    connection.execute(delete)
+
+    # O histórico vira colunas int64 compactas, somadas por usuário/mês/categoria/tipo de uma vez
+    columns = AmountColumns(('user_id', 'month', 'category_id', 'type'))
+    type_codes = {transaction_type: code for code, transaction_type in enumerate(ROLLUP_TYPES)}
+    processed = 0
+    for row_user_id, when, category_id, transaction_type, amount_cents in connection.execute(query):
+        processed += 1
+        columns.append(
+            (row_user_id, month_index(when), category_id or 0, type_codes[transaction_type]),
+            int(round(amount_cents))
+        )
+
+    totals: Dict[Tuple[int, date, int], Dict[str, int]] = {}
+    for (row_user_id, month, category_id, type_code), (total, count) in columns.group_sums().items():
+        values = totals.setdefault((row_user_id, month_from_index(month), category_id), _empty_totals())
+        values[f'{ROLLUP_TYPES[type_code]}_total'] = total
+        values[f'{ROLLUP_TYPES[type_code]}_count'] = count
+    write_rollup_totals(connection, totals)
+    return processed
+
+def summary_edge_query(user_id: int, start: datetime, end: datetime):
+    """Totais por categoria e tipo das transações em [start, end); despesas gravadas com sinal
+    negativo são somadas em valor absoluto, como em summarize_transactions"""
+    return db.session.query(
+        Category.name,
+        Transaction.transaction_type,
+        db.func.sum(db.func.abs(cents(Transaction.amount))),
+        db.func.count(Transaction.id)
+    ).outerjoin(
+        Category, Category.id == Transaction.category_id
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.date >= start,
+        Transaction.date < end
+    ).group_by(Transaction.category_id, Category.name, Transaction.transaction_type)
+
+def summary_rollup_query(user_id: int, first_month: date):
+    """Totais por categoria dos rollups mensais a partir de first_month, com despesas em valor absoluto"""
+    return db.session.query(
+        Category.name,
+        db.func.sum(cents(MonthlyRollup.income_total)),
+        db.func.sum(MonthlyRollup.income_count),
+        db.func.sum(db.func.abs(cents(MonthlyRollup.expense_total))),
+        db.func.sum(MonthlyRollup.expense_count)
+    ).outerjoin(
+        Category, Category.id == MonthlyRollup.category_id
+    ).filter(
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.month >= first_month
+    ).group_by(MonthlyRollup.category_id, Category.name)
+
+def summarize_since(user_id: int, start: datetime) -> Dict:
+    """Totais do usuário desde uma data: meses completos vêm dos rollups, o mês parcial do início vem das transações"""
+    first_full_month = month_start(start) if start == datetime(start.year, start.month, 1) else next_month(start)
+    first_full_month_start = datetime(first_full_month.year, first_full_month.month, 1)
+
+    # Somas em centavos inteiros; a conversão para reais acontece só no retorno
+    income_total = 0
+    expense_total = 0
+    transaction_count = 0
+    expense_by_category = {}
+
+    # Trecho inicial do período (até o primeiro mês completo), agregado no banco
+    edge_rows = summary_edge_query(user_id, start, first_full_month_start).all()
+
+    for category_name, transaction_type, total, count in edge_rows:
+        total = int(round(total or 0))
+        if transaction_type in ROLLUP_TYPES:
+            transaction_count += count
+        if transaction_type == 'income':
+            income_total += total
+        elif transaction_type == 'expense':
+            expense_total += total
+            category_name = category_name or 'Sem categoria'
+            expense_by_category[category_name] = expense_by_category.get(category_name, 0) + total
+
+    # Meses completos a partir dos rollups
+    rollup_rows = summary_rollup_query(user_id, first_full_month).all()
+
+    for category_name, income, income_count, expense, expense_count in rollup_rows:
+        income_total += int(round(income or 0))
+        expense_total += int(round(expense or 0))
+        transaction_count += (income_count or 0) + (expense_count or 0)
+        if expense_count:
+            category_name = category_name or 'Sem categoria'
+            expense_by_category[category_name] = expense_by_category.get(category_name, 0) + int(round(expense or 0))
+
+    return {
+        'total_income': from_cents(income_total),
+        'total_expense': from_cents(expense_total),
+        'balance': from_cents(income_total - expense_total),
+        'expense_by_category': {name: from_cents(total) for name, total in expense_by_category.items()},
+        'transaction_count': transaction_count
+    }
+
+@click.command('rebuild-rollups')
+@click.option('--user-id', type=int, default=None, help='Recalcular apenas este usuário')
+@with_appcontext
+def rebuild_rollups_command(user_id):
+    """Recalcular os rollups mensais a partir das transações"""
+    processed = rebuild_rollups(db.session.connection(), user_id)
+    db.session.commit()
+    click.echo(f'Rollups recalculados a partir de {processed} transações')
@@ -0,0 +1,104 @@
+import json
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from flask import Response
+from src.models.user import db
+from src.models.category import Category
+from src.models.transaction import Transaction
+from src.models.budget import Goal
+from src.services.instrumentation import timed
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; sem ele a resposta usa o json da biblioteca padrão
+    orjson = None
+
+@lru_cache(maxsize=16384)
+def _isoformat(value) -> str:
+    return value.isoformat()
+
+def isoformat(value) -> Optional[str]:
+    """isoformat() com cache: created_at/updated_at se repetem muito em importações e listas"""
+    return None if value is None else _isoformat(value)
+
+class RowSerializer:
+    """Seleciona apenas as colunas do to_dict (com joins) e monta os dicionários a partir das tuplas"""
+
+    def __init__(self, fields: Sequence[Tuple[str, object]], joins: Sequence[Tuple[object, object]] = (),
+                 datetime_fields: Sequence[str] = (), computed: Optional[Callable[[Dict], None]] = None):
+        self.keys = tuple(name for name, _ in fields)
+        self.columns = [column for _, column in fields]
+        self.joins = joins
+        self.datetime_positions = [self.keys.index(name) for name in datetime_fields]
+        self.computed = computed
+
+    def query(self):
+        """Consulta com as colunas e joins necessários; filtros e ordenação ficam com quem chama"""
+        query = db.session.query(*self.columns)
+        for target, condition in self.joins:
+            query = query.outerjoin(target, condition)
+        return query
+
+    def serialize(self, row) -> Dict:
+        values = list(row)
+        for position in self.datetime_positions:
+            values[position] = isoformat(values[position])
+        item = dict(zip(self.keys, values))
+        if self.computed:
+            self.computed(item)
+        return item
+
+    @timed('serialization')
+    def serialize_all(self, rows: Iterable) -> List[Dict]:
+        return [self.serialize(row) for row in rows]
+
+def _goal_progress(item):
+    target_amount = item['target_amount']
+    current_amount = item['current_amount'] or 0
+    progress_percentage = (current_amount / target_amount * 100) if target_amount and target_amount > 0 else 0
+    item['progress_percentage'] = round(progress_percentage, 2)
+
+transaction_serializer = RowSerializer(
+    [
+        ('id', Transaction.id),
+        ('user_id', Transaction.user_id),
+        ('description', Transaction.description),
+        ('amount', Transaction.amount),
+        ('transaction_type', Transaction.transaction_type),
+        ('category_id', Transaction.category_id),
+        ('category_name', Category.name),
+        ('date', Transaction.date),
+        ('created_at', Transaction.created_at),
+        ('updated_at', Transaction.updated_at)
+    ],
+    joins=[(Category, Category.id == Transaction.category_id)],
+    datetime_fields=('date', 'created_at', 'updated_at')
+)
+
+goal_serializer = RowSerializer(
+    [
+        ('id', Goal.id),
+        ('user_id', Goal.user_id),
+        ('name', Goal.name),
+        ('description', Goal.description),
+        ('target_amount', Goal.target_amount),
+        ('current_amount', Goal.current_amount),
+        ('target_date', Goal.target_date),
+        ('is_achieved', Goal.is_achieved),
+        ('created_at', Goal.created_at),
+        ('updated_at', Goal.updated_at)
+    ],
+    datetime_fields=('target_date', 'created_at', 'updated_at'),
+    computed=_goal_progress
+)
+
+@timed('serialization')
+def dumps(payload) -> bytes:
+    """Codificar em JSON com orjson quando disponível"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def json_response(payload, status: int = 200) -> Response:
+    """Equivalente a jsonify() para respostas grandes, sem a indentação e a ordenação de chaves"""
+    return Response(dumps(payload), status=status, mimetype='application/json')
@@ -0,0 +1,29 @@
+from flask import Blueprint, request, jsonify
+from src.services.statement_importer import StatementImporter, StatementError, DEFAULT_CHUNK_SIZE
+
+statement_import_bp = Blueprint('statement_import', __name__)
+
+@statement_import_bp.route('/transactions/import', methods=['POST'])
+def import_statement():
+    """Importar um extrato OFX ou CSV (multipart: file, user_id e, opcionalmente, format)"""
+    try:
+        user_id = request.form.get('user_id', type=int)
+        statement = request.files.get('file')
+        if not user_id or statement is None:
+            return jsonify({'error': 'user_id e file são obrigatórios'}), 400
+
+        statement_format = (request.form.get('format') or '').lower() or None
+        chunk_size = request.form.get('chunk_size', DEFAULT_CHUNK_SIZE, type=int)
+
+        importer = StatementImporter(user_id, chunk_size)
+        try:
+            # O arquivo é lido do stream do upload em blocos, sem ser carregado inteiro
+            result = importer.import_file(statement.stream, statement.filename, statement_format)
+        except StatementError as e:
+            # Blocos anteriores ao erro já foram gravados; a resposta informa quantos
+            return jsonify({'error': str(e), **importer.result}), 400
+
+        return jsonify(result), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
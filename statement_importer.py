@@ -0,0 +1,442 @@
+import codecs
+import csv
+import hashlib
+import html
+import re
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import chain, islice
+from typing import Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import event, inspect, select
+from src.models.user import db
+from src.models.transaction import Transaction
+from src.models.money import cents_to_decimal, from_cents, to_cents
+from src.services.categorization_service import get_categorization_service
+from src.services.transaction_classifier import AUTO_CATEGORY_SOURCE
+from src.services.text_normalization import normalize_text
+from src.services.rollups import write_rollup_deltas
+from src.services.budget_tracking import record_budget_deltas
+from src.services.transaction_search import write_search_documents
+from src.services.response_cache import bump_data_versions
+
+STATEMENT_FORMATS = ('csv', 'ofx')
+DEFAULT_CHUNK_SIZE = 1000
+MAX_CHUNK_SIZE = 5000
+# Bytes lidos por vez do arquivo enviado
+READ_SIZE = 64 * 1024
+MAX_REPORTED_ERRORS = 50
+DESCRIPTION_MAX_LENGTH = 255
+
+StatementLine = namedtuple('StatementLine', ['line', 'date', 'description', 'amount_cents'])
+
+class StatementError(ValueError):
+    """Linha ou arquivo de extrato que não pôde ser interpretado"""
+
+def transaction_fingerprint(user_id: int, when, amount_cents: int, description: str) -> str:
+    """Hash de (usuário, dia, valor em centavos, descrição normalizada) usado na deduplicação"""
+    day = when.date() if isinstance(when, datetime) else when
+    key = f'{user_id}|{day.isoformat()}|{amount_cents}|{normalize_text(description)}'
+    return hashlib.sha1(key.encode()).hexdigest()
+
+# Transações criadas pela API também recebem o hash, para que uma importação posterior as reconheça
+def _fingerprint_transaction(mapper, connection, target):
+    if target.date is None:
+        # O default da coluna só seria aplicado no INSERT; antecipá-lo para que o hash use a mesma data
+        target.date = datetime.utcnow()
+    if target.user_id is None or target.amount is None:
+        return
+    target.dedup_hash = transaction_fingerprint(
+        target.user_id, target.date, to_cents(target.amount), target.description
+    )
+
+def _refingerprint_transaction(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ('user_id', 'date', 'amount', 'description')):
+        _fingerprint_transaction(mapper, connection, target)
+
+event.listen(Transaction, 'before_insert', _fingerprint_transaction)
+event.listen(Transaction, 'before_update', _refingerprint_transaction)
+
+# ===== Leitura do arquivo =====
+
+_CHARSET_PATTERN = re.compile(r'CHARSET:\s*(\d+)|encoding=["\']([\w-]+)["\']', re.IGNORECASE)
+
+def detect_encoding(head: bytes) -> str:
+    """Codificação declarada no cabeçalho OFX, senão UTF-8 quando válido, senão Windows-1252"""
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    match = _CHARSET_PATTERN.search(head[:1024].decode('ascii', errors='ignore'))
+    if match:
+        encoding = f'cp{match.group(1)}' if match.group(1) else match.group(2)
+        try:
+            return codecs.lookup(encoding).name
+        except LookupError:
+            pass
+    try:
+        # Incremental: um caractere cortado no fim do bloco não invalida o UTF-8
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp1252'
+
+def read_text_blocks(stream, encoding: Optional[str] = None) -> Iterator[str]:
+    """Decodificar o arquivo em blocos, sem carregá-lo inteiro na memória"""
+    block = stream.read(READ_SIZE)
+    decoder = codecs.getincrementaldecoder(encoding or detect_encoding(block))(errors='replace')
+    while block:
+        text = decoder.decode(block)
+        if text:
+            yield text
+        block = stream.read(READ_SIZE)
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+def iter_lines(blocks: Iterable[str]) -> Iterator[str]:
+    """Linhas completas (com o terminador) a partir dos blocos de texto"""
+    pending = ''
+    for block in blocks:
+        lines = (pending + block).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    if pending:
+        yield pending
+
+def detect_statement_format(filename: Optional[str], head: str) -> str:
+    """Formato pela extensão do arquivo ou, sem ela, pelo conteúdo"""
+    extension = (filename or '').rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+    if extension in STATEMENT_FORMATS:
+        return extension
+    return 'ofx' if 'OFXHEADER' in head[:1024].upper() or '<OFX>' in head.upper() else 'csv'
+
+# ===== Valores e datas =====
+
+def parse_amount(value: str) -> int:
+    """Valor em centavos a partir de '1.234,56', '-45,90', 'R$ 10,00', '1,234.56' ou '(12.00)'"""
+    text = (value or '').strip().upper().replace('R$', '').replace(' ', '').replace('\xa0', '')
+    negative = False
+    if text.startswith('(') and text.endswith(')'):
+        negative, text = True, text[1:-1]
+    # Alguns bancos indicam débito/crédito com sufixo
+    if text.endswith('D'):
+        negative, text = True, text[:-1]
+    elif text.endswith('C'):
+        text = text[:-1]
+    if text.endswith('-'):
+        negative, text = True, text[:-1]
+
+    comma, dot = text.rfind(','), text.rfind('.')
+    if comma >= 0 and dot >= 0:
+        # O separador que aparece por último é o decimal
+        thousands, decimal = (',', '.') if dot > comma else ('.', ',')
+        text = text.replace(thousands, '').replace(decimal, '.')
+    elif comma >= 0 or dot >= 0:
+        separator = ',' if comma >= 0 else '.'
+        head, _, tail = text.rpartition(separator)
+        if text.count(separator) == 1 and len(tail) <= 2:
+            text = f'{head}.{tail}'
+        else:
+            text = text.replace(separator, '')
+
+    try:
+        amount = to_cents(Decimal(text))
+    except InvalidOperation:
+        raise StatementError(f'Valor inválido: {value!r}')
+    return -abs(amount) if negative else amount
+
+DATE_FORMATS = ('%d/%m/%Y', '%Y-%m-%d', '%d/%m/%y', '%d-%m-%Y', '%d.%m.%Y', '%Y/%m/%d', '%Y%m%d')
+
+def parse_date(value: str) -> datetime:
+    """Data do lançamento (sem horário) nos formatos usuais de extratos"""
+    text = (value or '').strip().split(' ')[0].split('T')[0]
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format)
+        except ValueError:
+            continue
+    raise StatementError(f'Data inválida: {value!r}')
+
+def _clean_description(value: Optional[str]) -> str:
+    description = ' '.join((value or '').split())
+    if not description:
+        raise StatementError('Descrição vazia')
+    return description[:DESCRIPTION_MAX_LENGTH]
+
+# ===== CSV =====
+
+# Nomes de coluna (normalizados) reconhecidos em exportações de bancos
+CSV_COLUMNS = {
+    'date': ('data', 'date', 'data lancamento', 'data do lancamento', 'data movimento', 'data da transacao', 'dt lancamento'),
+    'description': ('descricao', 'historico', 'description', 'memo', 'lancamento', 'estabelecimento', 'detalhes', 'titulo'),
+    'amount': ('valor', 'amount', 'value', 'valor r', 'quantia'),
+    'credit': ('credito', 'entrada', 'credit'),
+    'debit': ('debito', 'saida', 'debit'),
+}
+
+def _csv_columns(header: List[str]) -> Dict[str, int]:
+    positions = {}
+    for index, name in enumerate(header):
+        normalized = normalize_text(name)
+        for column, aliases in CSV_COLUMNS.items():
+            if column not in positions and normalized in aliases:
+                positions[column] = index
+    has_amount = 'amount' in positions or ('credit' in positions and 'debit' in positions)
+    if 'date' not in positions or 'description' not in positions or not has_amount:
+        raise StatementError('Cabeçalho do CSV não reconhecido: são necessárias colunas de data, descrição e valor')
+    return positions
+
+def parse_csv(blocks: Iterable[str]) -> Iterator[StatementLine]:
+    """Linhas de um extrato CSV; o separador (';', ',', tab ou '|') é detectado pelo cabeçalho"""
+    lines = iter_lines(blocks)
+    for first_line in lines:
+        if first_line.strip():
+            break
+    else:
+        return
+    delimiter = max((';', ',', '\t', '|'), key=first_line.count)
+    reader = csv.reader(chain([first_line], lines), delimiter=delimiter)
+    positions = _csv_columns(next(reader))
+
+    for row in reader:
+        if not any(field.strip() for field in row):
+            continue
+        try:
+            if 'amount' in positions and row[positions['amount']].strip():
+                amount = parse_amount(row[positions['amount']])
+            else:
+                credit = row[positions['credit']].strip() if 'credit' in positions else ''
+                debit = row[positions['debit']].strip() if 'debit' in positions else ''
+                amount = (parse_amount(credit) if credit else 0) - (abs(parse_amount(debit)) if debit else 0)
+            yield StatementLine(
+                reader.line_num,
+                parse_date(row[positions['date']]),
+                _clean_description(row[positions['description']]),
+                amount
+            )
+        except IndexError:
+            yield StatementError(f'Linha {reader.line_num}: colunas faltando'), reader.line_num
+        except StatementError as e:
+            yield e, reader.line_num
+
+# ===== OFX =====
+
+# Funciona para OFX 1.x (SGML, sem fechamento das tags simples) e 2.x (XML)
+_OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+def iter_ofx_tags(blocks: Iterable[str]) -> Iterator[tuple]:
+    """(fechamento, nome, valor) de cada tag, em ordem, sem montar a árvore do documento"""
+    buffer = ''
+    for block in blocks:
+        buffer += block
+        # Só processa até a última tag aberta: o valor dela pode continuar no próximo bloco
+        cut = buffer.rfind('<')
+        if cut <= 0:
+            continue
+        complete, buffer = buffer[:cut], buffer[cut:]
+        for closing, name, value in _OFX_TAG.findall(complete):
+            yield closing == '/', name.upper(), value.strip()
+    for closing, name, value in _OFX_TAG.findall(buffer):
+        yield closing == '/', name.upper(), value.strip()
+
+def parse_ofx(blocks: Iterable[str]) -> Iterator[StatementLine]:
+    """Lançamentos (STMTTRN) de um extrato OFX"""
+    current = None
+    number = 0
+    for closing, name, value in iter_ofx_tags(blocks):
+        if name == 'STMTTRN':
+            if closing and current is not None:
+                number += 1
+                try:
+                    yield StatementLine(
+                        number,
+                        parse_date(current.get('DTPOSTED', '')[:8]),
+                        _clean_description(html.unescape(current.get('MEMO') or current.get('NAME') or '')),
+                        parse_amount(current.get('TRNAMT', ''))
+                    )
+                except StatementError as e:
+                    yield e, number
+            current = None if closing else {}
+        elif current is not None and not closing and value:
+            current[name] = value
+
+STATEMENT_PARSERS = {
+    'csv': parse_csv,
+    'ofx': parse_ofx
+}
+
+# ===== Importação =====
+
+def _chunks(iterable, size: int):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _insert_transactions(connection, rows: List[Dict]) -> List[int]:
+    """INSERT em lote devolvendo os ids na ordem das linhas"""
+    table = Transaction.__table__
+    if getattr(connection.dialect, 'insert_executemany_returning_sort_by_parameter_order', False):
+        return list(connection.execute(
+            table.insert().returning(table.c.id, sort_by_parameter_order=True), rows
+        ).scalars())
+    # Sem RETURNING em lote (ex.: MySQL): uma instrução por linha
+    return [connection.execute(table.insert(), row).inserted_primary_key[0] for row in rows]
+
+def existing_hashes_query(user_id: int, hashes: List[str], last_existing_id: int):
+    """(hash, quantidade) das transações do usuário com esses hashes, entre as de id até last_existing_id"""
+    return db.session.query(Transaction.dedup_hash, db.func.count(Transaction.id)).filter(
+        Transaction.user_id == user_id,
+        Transaction.dedup_hash.in_(hashes),
+        Transaction.id <= last_existing_id
+    ).group_by(Transaction.dedup_hash)
+
+class StatementImporter:
+    """Importa um extrato em blocos: deduplica, categoriza e grava cada bloco com INSERT em lote"""
+
+    def __init__(self, user_id: int, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.user_id = user_id
+        self.chunk_size = max(1, min(int(chunk_size), MAX_CHUNK_SIZE))
+        self.categorization_service = get_categorization_service()
+        # Ocorrências de cada hash no arquivo e nas transações que já existiam antes da importação
+        self.occurrences: Dict[str, int] = {}
+        self.existing: Dict[str, int] = {}
+        self.last_existing_id = 0
+        self.result = {
+            'imported': 0,
+            'duplicates': 0,
+            'categorized': 0,
+            'invalid': 0,
+            'chunks': 0,
+            'errors': []
+        }
+
+    def import_file(self, stream, filename: Optional[str] = None, statement_format: Optional[str] = None,
+                    encoding: Optional[str] = None) -> Dict:
+        blocks = read_text_blocks(stream, encoding)
+        head = next(blocks, '')
+        statement_format = statement_format or detect_statement_format(filename, head)
+        if statement_format not in STATEMENT_PARSERS:
+            raise StatementError(f"Formato inválido: use {' ou '.join(STATEMENT_FORMATS)}")
+        self.result['format'] = statement_format
+        return self.import_lines(STATEMENT_PARSERS[statement_format](chain([head], blocks)))
+
+    def import_lines(self, lines: Iterable) -> Dict:
+        # Linhas já existentes são as de id até aqui; as gravadas por esta importação ficam de fora
+        self.last_existing_id = db.session.query(db.func.max(Transaction.id)).scalar() or 0
+        for chunk in _chunks(lines, self.chunk_size):
+            self.import_chunk(chunk)
+            # Cada bloco é confirmado separadamente; reimportar o arquivo retoma pelos hashes
+            db.session.commit()
+            self.result['chunks'] += 1
+        return self.result
+
+    def _record_error(self, error, line: int):
+        self.result['invalid'] += 1
+        if len(self.result['errors']) < MAX_REPORTED_ERRORS:
+            self.result['errors'].append({'line': line, 'error': str(error)})
+
+    def _load_existing(self, hashes: List[str]):
+        missing = [value for value in set(hashes) if value not in self.existing]
+        if not missing:
+            return
+        self.existing.update(dict.fromkeys(missing, 0))
+        self.existing.update(existing_hashes_query(self.user_id, missing, self.last_existing_id).all())
+
+    def new_lines(self, chunk: List) -> List[tuple]:
+        """(hash, linha) das linhas válidas que ainda não existem no banco"""
+        lines = []
+        for item in chunk:
+            if isinstance(item, StatementLine):
+                lines.append((transaction_fingerprint(
+                    self.user_id, item.date, item.amount_cents, item.description
+                ), item))
+            else:
+                self._record_error(*item)
+        self._load_existing([fingerprint for fingerprint, _ in lines])
+
+        new = []
+        for fingerprint, line in lines:
+            # Lançamentos iguais no mesmo dia são legítimos: só os que excedem os já existentes são novos
+            occurrence = self.occurrences.get(fingerprint, 0) + 1
+            self.occurrences[fingerprint] = occurrence
+            if occurrence <= self.existing[fingerprint]:
+                self.result['duplicates'] += 1
+            else:
+                new.append((fingerprint, line))
+        return new
+
+    def import_chunk(self, chunk: List):
+        new = self.new_lines(chunk)
+        if not new:
+            return
+
+        categorized = self.categorization_service.categorize_rows(self.user_id, [
+            (index, line.description, line.amount_cents) for index, (_, line) in enumerate(new)
+        ])
+        now = datetime.utcnow()
+        rows = []
+        for (fingerprint, line), (_, _, category) in zip(new, categorized):
+            rows.append({
+                'user_id': self.user_id,
+                'description': line.description,
+                'amount': cents_to_decimal(line.amount_cents),
+                'transaction_type': 'income' if line.amount_cents > 0 else 'expense',
+                'category_id': category.id if category else None,
+                'category_source': AUTO_CATEGORY_SOURCE if category else 'user',
+                'date': line.date,
+                'dedup_hash': fingerprint,
+                'created_at': now,
+                'updated_at': now
+            })
+            if category:
+                self.result['categorized'] += 1
+
+        connection = db.session.connection()
+        transaction_ids = _insert_transactions(connection, rows)
+
+        # O INSERT em lote não dispara os eventos do ORM: rollups, orçamentos, índice de busca e versão dos dados aqui.
+        # Categorias atribuídas automaticamente não treinam o modelo, como no batch_categorize.
+        deltas = [
+            (self.user_id, row['date'], row['category_id'], row['transaction_type'], from_cents(line.amount_cents), 1)
+            for row, (_, line) in zip(rows, new)
+        ]
+        write_rollup_deltas(connection, deltas)
+        record_budget_deltas(db.session, deltas)
+        write_search_documents(connection, {
+            transaction_id: (self.user_id, row['description'])
+            for transaction_id, row in zip(transaction_ids, rows)
+        })
+        bump_data_versions(connection, [self.user_id])
+        self.result['imported'] += len(rows)
+
+def backfill_dedup_hashes(connection, batch_size: int = 5000) -> int:
+    """Calcular o hash de deduplicação das transações que ainda não o têm"""
+    transactions = Transaction.__table__
+    update = transactions.update().where(transactions.c.id == db.bindparam('row_id')).values(
+        dedup_hash=db.bindparam('dedup_hash')
+    )
+    updated = 0
+    last_id = 0
+    while True:
+        # Páginas por id: cada lote é lido por inteiro antes de ser atualizado
+        rows = connection.execute(
+            select(
+                transactions.c.id, transactions.c.user_id, transactions.c.date,
+                transactions.c.amount, transactions.c.description
+            ).where(
+                transactions.c.id > last_id,
+                transactions.c.dedup_hash.is_(None)
+            ).order_by(transactions.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+        connection.execute(update, [
+            {'row_id': transaction_id, 'dedup_hash': transaction_fingerprint(user_id, when, to_cents(amount), description)}
+            for transaction_id, user_id, when, amount, description in rows
+        ])
+        updated += len(rows)
+        last_id = rows[-1][0]
@@ -0,0 +1,97 @@
+import os
+from typing import Dict, Mapping
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# 'tuned' liga WAL, pragmas e pool dimensionado; 'default' mantém as configurações do driver
+STORAGE_PROFILES = ('tuned', 'default')
+DEFAULT_STORAGE_PROFILE = 'tuned'
+
+# Aplicados em cada nova conexão SQLite do perfil 'tuned'; podem ser sobrescritos por SQLITE_<NOME>
+SQLITE_PRAGMAS = {
+    # Leitores não bloqueiam o escritor nem são bloqueados por ele
+    'journal_mode': 'WAL',
+    # Com WAL, NORMAL só sincroniza nos checkpoints e continua seguro contra corrupção
+    'synchronous': 'NORMAL',
+    # Valor negativo = KiB (64 MB de cache de páginas por conexão)
+    'cache_size': -65536,
+    'mmap_size': 268435456,
+    # Esperar o lock de escrita em vez de falhar com "database is locked"
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+# Pool padrão por banco; DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT e DB_POOL_RECYCLE sobrescrevem
+POOL_DEFAULTS = {
+    'sqlite': {'pool_size': 10, 'max_overflow': 10, 'pool_timeout': 30},
+    'default': {'pool_size': 10, 'max_overflow': 20, 'pool_timeout': 30, 'pool_recycle': 1800},
+}
+
+def database_uri(default_uri: str, environ: Mapping[str, str] = os.environ) -> str:
+    """URI do banco: DATABASE_URL quando definida, senão o SQLite local"""
+    uri = environ.get('DATABASE_URL') or default_uri
+    # Heroku e outros provedores ainda usam o esquema antigo
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+def storage_profile(environ: Mapping[str, str] = os.environ) -> str:
+    profile = environ.get('STORAGE_PROFILE', DEFAULT_STORAGE_PROFILE).lower()
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"STORAGE_PROFILE inválido: use {' ou '.join(STORAGE_PROFILES)}")
+    return profile
+
+def is_sqlite_memory(uri: str) -> bool:
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def sqlite_pragmas(environ: Mapping[str, str] = os.environ) -> Dict[str, object]:
+    return {name: environ.get(f'SQLITE_{name.upper()}', value) for name, value in SQLITE_PRAGMAS.items()}
+
+def engine_options(uri: str, profile: str, environ: Mapping[str, str] = os.environ) -> Dict[str, object]:
+    """Opções de create_engine (SQLALCHEMY_ENGINE_OPTIONS) para o banco e o perfil"""
+    backend = make_url(uri).get_backend_name()
+    # Em memória, o SQLAlchemy precisa manter uma conexão única: nada a ajustar
+    if profile == 'default' or is_sqlite_memory(uri):
+        return {}
+
+    options = dict(POOL_DEFAULTS['sqlite' if backend == 'sqlite' else 'default'])
+    for name, variable in (('pool_size', 'DB_POOL_SIZE'), ('max_overflow', 'DB_MAX_OVERFLOW'),
+                           ('pool_timeout', 'DB_POOL_TIMEOUT'), ('pool_recycle', 'DB_POOL_RECYCLE')):
+        if environ.get(variable):
+            options[name] = int(environ[variable])
+
+    if backend == 'sqlite':
+        # Conexões do pool passam entre threads; o timeout do driver acompanha o busy_timeout
+        busy_timeout = int(sqlite_pragmas(environ)['busy_timeout'])
+        options['connect_args'] = {'check_same_thread': False, 'timeout': busy_timeout / 1000}
+    else:
+        # Descartar conexões derrubadas pelo servidor antes de entregá-las à requisição
+        options['pool_pre_ping'] = True
+    return options
+
+def install_sqlite_pragmas(engine, pragmas: Mapping[str, object]):
+    """Executar os PRAGMAs em toda conexão nova do engine"""
+    statements = [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+def init_storage(app, db, default_uri: str, environ: Mapping[str, str] = os.environ):
+    """Configurar banco, pool e perfil de armazenamento da aplicação e inicializar o db"""
+    uri = database_uri(default_uri, environ)
+    profile = storage_profile(environ)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(uri, profile, environ)
+    app.config['STORAGE_PROFILE'] = profile
+    db.init_app(app)
+
+    if profile == 'tuned' and make_url(uri).get_backend_name() == 'sqlite' and not is_sqlite_memory(uri):
+        with app.app_context():
+            install_sqlite_pragmas(db.engine, sqlite_pragmas(environ))
@@ -0,0 +1,97 @@
+"""O modelo de categorização só conta categorias escolhidas pelo usuário"""
+from datetime import datetime
+
+import pytest
+
+from benchmarks.query_plans import create_app
+from src.models.user import db
+
+def model_counts(user_id):
+    from src.models.categorization_model import CategorizationTokenCount, CategorizationCategoryCount
+    categories = db.session.query(
+        CategorizationCategoryCount.category_id,
+        CategorizationCategoryCount.document_count,
+        CategorizationCategoryCount.token_count
+    ).filter_by(user_id=user_id).all()
+    tokens = db.session.query(
+        CategorizationTokenCount.category_id,
+        CategorizationTokenCount.token,
+        CategorizationTokenCount.count
+    ).filter_by(user_id=user_id).all()
+    return sorted(categories), sorted(tokens)
+
+@pytest.fixture
+def app():
+    app = create_app()
+    with app.app_context():
+        from src.models.user import User
+        from src.models.category import Category
+        db.session.add(User(name='Ana', email='ana@example.com', password_hash='x'))
+        db.session.add_all([
+            Category(name='Mercado', category_type='expense', is_default=True),
+            Category(name='Transporte', category_type='expense', is_default=True),
+        ])
+        db.session.commit()
+        yield app
+
+def test_automatic_categories_never_train_the_model(app):
+    from src.models.transaction import Transaction
+    from src.services.categorization_service import get_categorization_service
+
+    service = get_categorization_service()
+    chosen = Transaction(user_id=1, description='padaria central', amount=-12, transaction_type='expense',
+                         category_id=1, date=datetime(2026, 3, 1))
+    uncategorized = [
+        Transaction(user_id=1, description=f'posto shell {i}', amount=-80, transaction_type='expense',
+                    date=datetime(2026, 3, 2))
+        for i in range(3)
+    ]
+    db.session.add_all([chosen, *uncategorized])
+    db.session.commit()
+    trained = model_counts(1)
+    assert [row[:2] for row in trained[0]] == [(1, 1)]
+
+    # Categorização automática em massa: as linhas ficam marcadas e o modelo não muda
+    category = service.get_category(1, 2)
+    service.apply_categories(1, [(transaction.id, transaction.description, category) for transaction in uncategorized])
+    db.session.commit()
+    db.session.expire_all()
+    assert {transaction.category_source for transaction in uncategorized} == {'auto'}
+    assert model_counts(1) == trained
+
+    # Editar ou remover uma linha automática não desconta o que nunca foi somado
+    uncategorized[0].description = 'posto ipiranga'
+    db.session.delete(uncategorized[1])
+    db.session.commit()
+    assert model_counts(1) == trained
+
+    # Trocar a categoria pelo ORM é uma escolha do usuário: passa a treinar
+    uncategorized[2].category_id = 1
+    db.session.commit()
+    assert uncategorized[2].category_source == 'user'
+    assert [row[:2] for row in model_counts(1)[0]] == [(1, 2)]
+
+    # O incremental coincide com o retreino a partir do histórico
+    incremental = model_counts(1)
+    service.rebuild_user_model(1)
+    db.session.commit()
+    assert model_counts(1) == incremental
+
+def test_bulk_auto_categorized_creates_do_not_train(app):
+    from src.models.transaction import Transaction
+    from src.services.bulk_transactions import BulkChanges
+
+    before = model_counts(1)
+    changes = BulkChanges(1, auto_categorize=True)
+    assert changes.apply([
+        {'description': 'uber viagem centro', 'amount': -25},
+        {'description': 'feira do bairro', 'amount': -40, 'category': 'Mercado'},
+    ], [], [])
+    db.session.commit()
+
+    automatic, chosen = Transaction.query.order_by(Transaction.id).all()
+    assert (automatic.category_id, automatic.category_source) == (2, 'auto')
+    assert (chosen.category_id, chosen.category_source) == (1, 'user')
+    # Só a categoria informada pelo cliente entrou no modelo
+    assert before == ([], [])
+    assert [row[:2] for row in model_counts(1)[0]] == [(1, 1)]
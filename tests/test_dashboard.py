@@ -0,0 +1,56 @@
+"""Resumo do /dashboard: mesmos totais da listagem de transações para a mesma janela"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.query_plans import create_app
+from src.models.user import db
+
+@pytest.fixture
+def app():
+    app = create_app()
+    from src.routes.dashboard import dashboard_bp, SUMMARY_WINDOW_DAYS
+    app.register_blueprint(dashboard_bp, url_prefix='/api')
+    with app.app_context():
+        from src.models.user import User
+        from src.models.category import Category
+        from src.models.transaction import Transaction
+        import src.services.rollups  # mantém os rollups mensais a cada flush
+
+        db.session.add(User(name='Ana', email='ana@example.com', password_hash='x'))
+        db.session.add_all([
+            Category(name='Salário', category_type='income', is_default=True),
+            Category(name='Mercado', category_type='expense', is_default=True),
+        ])
+        db.session.flush()
+        now = datetime.utcnow()
+        # Transações em meses diferentes dentro da janela (rollups e mês parcial) e uma fora dela
+        for days_ago, amount, transaction_type, category_id in [
+            (5, 500, 'income', 1), (5, -120, 'expense', 2),
+            (40, -300, 'expense', 2), (70, -80, 'expense', None),
+            (SUMMARY_WINDOW_DAYS + 30, -1000, 'expense', 2),
+        ]:
+            db.session.add(Transaction(
+                user_id=1, description='x', amount=amount, transaction_type=transaction_type,
+                category_id=category_id, date=now - timedelta(days=days_ago)
+            ))
+        db.session.commit()
+        yield app
+
+def test_summary_matches_transaction_listing(app):
+    from src.routes.dashboard import SUMMARY_WINDOW_DAYS
+    from src.services.transaction_queries import TransactionFilters, summarize_transactions
+
+    response = app.test_client().get('/api/dashboard?user_id=1&fields=summary')
+    assert response.status_code == 200
+    summary = response.get_json()['summary']
+
+    with app.app_context():
+        start = datetime.utcnow() - timedelta(days=SUMMARY_WINDOW_DAYS)
+        listing = summarize_transactions(1, TransactionFilters(start_date=start))
+
+    assert summary['total_income'] == listing['total_income'] == 500.0
+    assert summary['total_expense'] == listing['total_expense'] == 500.0
+    assert summary['balance'] == listing['balance'] == 0.0
+    assert summary['transaction_count'] == listing['transaction_count'] == 4
+    assert summary['expense_by_category'] == {'Mercado': 420.0, 'Sem categoria': 80.0}
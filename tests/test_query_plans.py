@@ -0,0 +1,19 @@
+"""Os planos das consultas quentes usam índices: nenhuma varredura completa de tabela"""
+import pytest
+
+from benchmarks.query_plans import check_query_plans, create_app
+
+@pytest.fixture(scope='module')
+def app():
+    app = create_app()
+    with app.app_context():
+        yield app
+
+def test_hot_queries_use_indexes(app):
+    results = check_query_plans()
+    assert results
+    full_scans = {name: (tables, plan) for name, (plan, tables) in results.items() if tables}
+    assert not full_scans, '\n'.join(
+        f"{name}: varre {', '.join(tables)}\n    " + '\n    '.join(plan)
+        for name, (tables, plan) in full_scans.items()
+    )
@@ -0,0 +1,61 @@
+"""Sinais de summarize_since: despesas gravadas negativas saem positivas e o saldo as subtrai"""
+from datetime import datetime
+
+import pytest
+
+from benchmarks.query_plans import create_app
+from src.models.user import db
+
+@pytest.fixture
+def app():
+    app = create_app()
+    with app.app_context():
+        from src.models.user import User
+        from src.models.category import Category
+        from src.models.transaction import Transaction
+        import src.services.rollups  # mantém os rollups mensais a cada flush
+
+        db.session.add(User(name='Ana', email='ana@example.com', password_hash='x'))
+        db.session.add_all([
+            Category(name='Salário', category_type='income', is_default=True),
+            Category(name='Mercado', category_type='expense', is_default=True),
+            Category(name='Transporte', category_type='expense', is_default=True),
+        ])
+        db.session.flush()
+        db.session.add_all([
+            Transaction(user_id=1, description='salário', amount=1000, transaction_type='income',
+                        category_id=1, date=datetime(2026, 3, 5)),
+            Transaction(user_id=1, description='mercado', amount=-300, transaction_type='expense',
+                        category_id=2, date=datetime(2026, 3, 10)),
+            Transaction(user_id=1, description='ônibus', amount=-50, transaction_type='expense',
+                        category_id=3, date=datetime(2026, 3, 12)),
+            Transaction(user_id=1, description='feira', amount=-100, transaction_type='expense',
+                        category_id=2, date=datetime(2026, 4, 3)),
+            Transaction(user_id=1, description='freela', amount=200, transaction_type='income',
+                        category_id=1, date=datetime(2026, 4, 4)),
+        ])
+        db.session.commit()
+        yield app
+
+@pytest.mark.parametrize('start, income, expense, by_category', [
+    # Só rollups: o período começa no primeiro dia do mês
+    (datetime(2026, 3, 1), 1200.0, 450.0, {'Mercado': 400.0, 'Transporte': 50.0}),
+    # Mês parcial pelas transações e abril pelos rollups
+    (datetime(2026, 3, 2), 1200.0, 450.0, {'Mercado': 400.0, 'Transporte': 50.0}),
+    # Só o mês parcial
+    (datetime(2026, 4, 2), 200.0, 100.0, {'Mercado': 100.0}),
+])
+def test_expense_is_positive_and_balance_subtracts_it(app, start, income, expense, by_category):
+    from src.services.rollups import summarize_since
+    from src.services.transaction_queries import TransactionFilters, summarize_transactions
+    summary = summarize_since(1, start)
+
+    assert summary['total_income'] == income
+    assert summary['total_expense'] == expense
+    assert summary['balance'] == income - expense
+    assert summary['expense_by_category'] == by_category
+
+    # Mesmos totais da listagem de transações para o mesmo período
+    listing = summarize_transactions(1, TransactionFilters(start_date=start))
+    for key in ('total_income', 'total_expense', 'balance', 'transaction_count'):
+        assert summary[key] == listing[key]
@@ -0,0 +1,50 @@
+"""Sinais das séries de /reports/timeseries: despesas gravadas negativas saem positivas"""
+from datetime import date, datetime
+
+import pytest
+
+from benchmarks.query_plans import create_app
+from src.models.user import db
+
+@pytest.fixture
+def app():
+    app = create_app()
+    with app.app_context():
+        from src.models.user import User
+        from src.models.category import Category
+        from src.models.transaction import Transaction
+        import src.services.rollups  # mantém os rollups mensais a cada flush
+
+        db.session.add(User(name='Ana', email='ana@example.com', password_hash='x'))
+        db.session.add_all([
+            Category(name='Salário', category_type='income', is_default=True),
+            Category(name='Mercado', category_type='expense', is_default=True),
+            Category(name='Transporte', category_type='expense', is_default=True),
+        ])
+        db.session.flush()
+        db.session.add_all([
+            Transaction(user_id=1, description='salário', amount=1000, transaction_type='income',
+                        category_id=1, date=datetime(2026, 3, 5)),
+            Transaction(user_id=1, description='mercado', amount=-300, transaction_type='expense',
+                        category_id=2, date=datetime(2026, 3, 10)),
+            Transaction(user_id=1, description='ônibus', amount=-50, transaction_type='expense',
+                        category_id=3, date=datetime(2026, 3, 12)),
+        ])
+        db.session.commit()
+        yield app
+
+@pytest.mark.parametrize('start, end, granularity, source', [
+    (date(2026, 3, 1), date(2026, 3, 31), 'month', 'rollups'),
+    (date(2026, 3, 2), date(2026, 3, 31), 'month', 'transactions'),
+])
+def test_expense_is_positive_and_balance_subtracts_it(app, start, end, granularity, source):
+    from src.services.timeseries import build_timeseries
+    report = build_timeseries(1, start, end, granularity)
+
+    assert report['source'] == source
+    assert report['income'] == [1000.0]
+    assert report['expense'] == [350.0]
+    assert report['balance'] == [650.0]
+    # Categorias da que mais gasta para a que menos gasta
+    assert report['categories']['name'][:2] == ['Mercado', 'Transporte']
+    assert all(value >= 0 for value in report['categories']['expense'])
@@ -0,0 +1,28 @@
+import re
+from functools import lru_cache
+
+# Tabela única de remoção de acentos (equivalente às substituições por vogal)
+_ACCENT_TABLE = str.maketrans({
+    **dict.fromkeys('áàâãä', 'a'),
+    **dict.fromkeys('éèêë', 'e'),
+    **dict.fromkeys('íìîï', 'i'),
+    **dict.fromkeys('óòôõö', 'o'),
+    **dict.fromkeys('úùûü', 'u'),
+    'ç': 'c'
+})
+
+# Qualquer sequência fora de [a-z0-9] (especiais e espaços) vira um único espaço
+_CLEANUP_PATTERN = re.compile(r'[^a-z0-9]+')
+
+# Descrições de extratos se repetem muito; as mais recentes ficam em cache
+NORMALIZE_CACHE_SIZE = 16384
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize(text: str) -> str:
+    return _CLEANUP_PATTERN.sub(' ', text.lower().translate(_ACCENT_TABLE)).strip()
+
+def normalize_text(text: str) -> str:
+    """Normalizar texto para comparação (minúsculas, sem acentos e sem caracteres especiais)"""
+    if not text:
+        return ""
+    return _normalize(text)
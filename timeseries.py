@@ -0,0 +1,199 @@
+import json
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence
+from sqlalchemy import case, func
+from src.models.user import db
+from src.models.category import Category
+from src.models.transaction import Transaction
+from src.models.monthly_rollup import MonthlyRollup
+from src.models.money import cents, from_cents
+from src.services.rollups import month_start, next_month
+
+GRANULARITIES = ('day', 'week', 'month', 'year')
+# Limite de pontos por série, para evitar respostas gigantes (ex.: dias de várias décadas)
+MAX_BUCKETS = 5000
+# Tamanho dos trechos das listas na resposta em streaming
+STREAM_CHUNK_SIZE = 1000
+
+def bucket_start(value: date, granularity: str) -> date:
+    """Início do intervalo (dia, semana iniciada na segunda, mês ou ano) que contém a data"""
+    if granularity == 'day':
+        return value
+    if granularity == 'week':
+        return value - timedelta(days=value.weekday())
+    if granularity == 'month':
+        return month_start(value)
+    return date(value.year, 1, 1)
+
+def next_bucket(value: date, granularity: str) -> date:
+    """Início do intervalo seguinte"""
+    if granularity == 'day':
+        return value + timedelta(days=1)
+    if granularity == 'week':
+        return value + timedelta(days=7)
+    if granularity == 'month':
+        return next_month(value)
+    return date(value.year + 1, 1, 1)
+
+def bucket_range(start: date, end: date, granularity: str) -> List[date]:
+    """Todos os intervalos entre as datas, inclusive os sem transações"""
+    buckets = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        buckets.append(current)
+        if len(buckets) > MAX_BUCKETS:
+            raise ValueError(f'O período gera mais de {MAX_BUCKETS} pontos; use uma granularidade maior')
+        current = next_bucket(current, granularity)
+    return buckets
+
+def bucket_expression(column, granularity: str, dialect: str):
+    """Expressão SQL com o início do intervalo da data no formato AAAA-MM-DD"""
+    if dialect == 'postgresql':
+        return func.to_char(func.date_trunc(granularity, column), 'YYYY-MM-DD')
+
+    if dialect == 'mysql':
+        if granularity == 'week':
+            return func.date_format(func.subdate(column, func.weekday(column)), '%Y-%m-%d')
+        formats = {'day': '%Y-%m-%d', 'month': '%Y-%m-01', 'year': '%Y-01-01'}
+        return func.date_format(column, formats[granularity])
+
+    # SQLite
+    if granularity == 'day':
+        return func.date(column)
+    if granularity == 'week':
+        # Avança até o domingo e volta seis dias: a segunda-feira da semana
+        return func.date(column, 'weekday 0', '-6 days')
+    if granularity == 'month':
+        return func.strftime('%Y-%m-01', column)
+    return func.strftime('%Y-01-01', column)
+
+def _uses_rollups(start: date, end: date, granularity: str) -> bool:
+    # Meses inteiros podem ser lidos dos rollups mensais sem tocar nas transações
+    return granularity in ('month', 'year') and start.day == 1 and (end + timedelta(days=1)).day == 1
+
+def timeseries_query(user_id: int, start: date, end: date, granularity: str,
+                     category_ids: Optional[Sequence[int]] = None, use_rollups: bool = False):
+    """Uma única consulta GROUP BY (intervalo, categoria) com receitas, despesas (positivas) e contagem em centavos"""
+    dialect = db.session.get_bind().dialect.name
+
+    if use_rollups:
+        bucket = bucket_expression(MonthlyRollup.month, granularity, dialect)
+        query = db.session.query(
+            bucket,
+            MonthlyRollup.category_id,
+            Category.name,
+            func.sum(cents(MonthlyRollup.income_total)),
+            # Despesas são gravadas com sinal negativo; as séries usam o valor absoluto
+            func.sum(func.abs(cents(MonthlyRollup.expense_total))),
+            func.sum(MonthlyRollup.income_count + MonthlyRollup.expense_count)
+        ).outerjoin(
+            Category, Category.id == MonthlyRollup.category_id
+        ).filter(
+            MonthlyRollup.user_id == user_id,
+            MonthlyRollup.month >= start,
+            MonthlyRollup.month <= end
+        )
+        if category_ids:
+            query = query.filter(MonthlyRollup.category_id.in_(category_ids))
+        return query.group_by(bucket, MonthlyRollup.category_id, Category.name)
+
+    bucket = bucket_expression(Transaction.date, granularity, dialect)
+    amount = cents(Transaction.amount)
+    query = db.session.query(
+        bucket,
+        Transaction.category_id,
+        Category.name,
+        func.sum(case((Transaction.transaction_type == 'income', amount), else_=0)),
+        func.sum(case((Transaction.transaction_type == 'expense', func.abs(amount)), else_=0)),
+        func.count(Transaction.id)
+    ).outerjoin(
+        Category, Category.id == Transaction.category_id
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.transaction_type.in_(('income', 'expense')),
+        Transaction.date >= datetime.combine(start, datetime.min.time()),
+        Transaction.date < datetime.combine(end + timedelta(days=1), datetime.min.time())
+    )
+    if category_ids:
+        query = query.filter(Transaction.category_id.in_(category_ids))
+    return query.group_by(bucket, Transaction.category_id, Category.name)
+
+def build_timeseries(user_id: int, start: date, end: date, granularity: str = 'month',
+                     category_ids: Optional[Sequence[int]] = None) -> Dict:
+    """Séries de receitas, despesas e saldo por intervalo, mais o total por categoria, em colunas"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity deve ser um de: {', '.join(GRANULARITIES)}")
+    if start > end:
+        raise ValueError('start_date deve ser anterior a end_date')
+
+    buckets = bucket_range(start, end, granularity)
+    positions = {bucket.isoformat(): index for index, bucket in enumerate(buckets)}
+    use_rollups = _uses_rollups(start, end, granularity)
+
+    income = [0] * len(buckets)
+    expense = [0] * len(buckets)
+    counts = [0] * len(buckets)
+    categories: Dict[int, list] = {}  # category_id -> [nome, receitas, despesas, contagem]
+
+    for bucket, category_id, category_name, income_cents, expense_cents, count in timeseries_query(
+            user_id, start, end, granularity, category_ids, use_rollups):
+        index = positions.get(str(bucket)[:10])
+        if index is None:
+            continue
+        income_cents = int(round(income_cents or 0))
+        expense_cents = int(round(expense_cents or 0))
+        income[index] += income_cents
+        expense[index] += expense_cents
+        counts[index] += count or 0
+
+        totals = categories.setdefault(category_id or 0, [category_name or 'Sem categoria', 0, 0, 0])
+        totals[1] += income_cents
+        totals[2] += expense_cents
+        totals[3] += count or 0
+
+    category_order = sorted(categories, key=lambda category_id: categories[category_id][2], reverse=True)
+    return {
+        'user_id': user_id,
+        'granularity': granularity,
+        'start_date': start.isoformat(),
+        'end_date': end.isoformat(),
+        'source': 'rollups' if use_rollups else 'transactions',
+        'buckets': list(positions),
+        'income': [from_cents(value) for value in income],
+        'expense': [from_cents(value) for value in expense],
+        'balance': [from_cents(income_value - expense_value) for income_value, expense_value in zip(income, expense)],
+        'transaction_count': counts,
+        'categories': {
+            'id': [category_id or None for category_id in category_order],
+            'name': [categories[category_id][0] for category_id in category_order],
+            'income': [from_cents(categories[category_id][1]) for category_id in category_order],
+            'expense': [from_cents(categories[category_id][2]) for category_id in category_order],
+            'transaction_count': [categories[category_id][3] for category_id in category_order]
+        }
+    }
+
+def _dump(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+def _stream_list(values: list) -> Iterator[str]:
+    yield '['
+    for offset in range(0, len(values), STREAM_CHUNK_SIZE):
+        if offset:
+            yield ','
+        yield _dump(values[offset:offset + STREAM_CHUNK_SIZE])[1:-1]
+    yield ']'
+
+def stream_columnar_json(report: Dict) -> Iterator[str]:
+    """Serializar o relatório em trechos: listas longas saem em blocos, sem montar o JSON inteiro"""
+    yield '{'
+    for position, (key, value) in enumerate(report.items()):
+        if position:
+            yield ','
+        yield _dump(key) + ':'
+        if isinstance(value, dict):
+            yield from stream_columnar_json(value)
+        elif isinstance(value, list):
+            yield from _stream_list(value)
+        else:
+            yield _dump(value)
+    yield '}'
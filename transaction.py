@@ -1,17 +1,37 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from src.models.user import db
+from src.models.money import Money
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        # Análises por período (assessor, relatórios)
+        db.Index('ix_transactions_user_date', 'user_id', 'date'),
+        # Gasto por categoria no período (orçamentos); cobre o SUM(amount) sem ler a tabela
+        db.Index('ix_transactions_user_category_date', 'user_id', 'category_id', 'date', 'transaction_type', 'amount'),
+        # Totais de receitas/despesas por período
+        db.Index('ix_transactions_user_type_date', 'user_id', 'transaction_type', 'date'),
+        # Índice parcial para a varredura de transações sem categoria
+        db.Index(
+            'ix_transactions_user_uncategorized', 'user_id', 'id',
+            sqlite_where=db.text('category_id IS NULL'),
+            postgresql_where=db.text('category_id IS NULL')
+        ),
+        # Deduplicação na importação de extratos
+        db.Index('ix_transactions_user_dedup_hash', 'user_id', 'dedup_hash'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     description = db.Column(db.String(255), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(Money, nullable=False)  # Centavos no banco, reais no Python
     transaction_type = db.Column(db.String(20), nullable=False)  # 'income' or 'expense'
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True)
     date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    dedup_hash = db.Column(db.String(40), nullable=True)  # Hash de (user_id, dia, valor, descrição normalizada)
+    # Origem da categoria: 'user' (escolhida pelo usuário, treina o modelo) ou 'auto' (categorização automática)
+    category_source = db.Column(db.String(10), nullable=False, default='user', server_default='user')
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     
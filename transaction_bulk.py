@@ -0,0 +1,40 @@
+from flask import Blueprint, request, jsonify
+from src.models.user import db
+from src.services.bulk_transactions import BulkChanges, BulkValidationError
+
+transaction_bulk_bp = Blueprint('transaction_bulk', __name__)
+
+@transaction_bulk_bp.route('/transactions/bulk', methods=['POST'])
+def bulk_transactions():
+    """Criar, alterar e remover várias transações em uma única requisição e transação"""
+    try:
+        data = request.get_json(silent=True) or {}
+        user_id = data.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'user_id é obrigatório'}), 400
+
+        operations = {name: data.get(name) or [] for name in ('create', 'update', 'delete')}
+        if not any(operations.values()):
+            return jsonify({'error': 'Informe ao menos um item em create, update ou delete'}), 400
+        if not all(isinstance(items, list) for items in operations.values()):
+            return jsonify({'error': 'create, update e delete devem ser listas'}), 400
+
+        changes = BulkChanges(user_id, auto_categorize=bool(data.get('auto_categorize')))
+        try:
+            # atomic: qualquer item inválido cancela o lote inteiro
+            applied = changes.apply(
+                operations['create'], operations['update'], operations['delete'], atomic=bool(data.get('atomic'))
+            )
+        except BulkValidationError as e:
+            return jsonify({'error': str(e)}), 400
+
+        if not applied:
+            db.session.rollback()
+            return jsonify({'error': 'Lote atômico com itens inválidos; nada foi gravado', **changes.summary()}), 400
+
+        db.session.commit()
+        return jsonify(changes.summary()), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
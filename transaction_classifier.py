@@ -0,0 +1,200 @@
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select
+from src.models.user import db
+from src.models.transaction import Transaction
+from src.models.categorization_model import CategorizationTokenCount, CategorizationCategoryCount
+from src.services.counters import increment_counters
+
+# Mínimo de transações de treino antes de o modelo opinar
+MIN_TRAINING_DOCUMENTS = 5
+# Probabilidade mínima para aceitar a previsão sem recorrer às palavras-chave
+MIN_CONFIDENCE = 0.6
+# Suavização de Laplace
+SMOOTHING = 1.0
+MAX_TOKEN_LENGTH = 50
+# Categorias atribuídas automaticamente não treinam o modelo: ele nunca aprende com os próprios palpites
+AUTO_CATEGORY_SOURCE = 'auto'
+
+def trains_model(category_source: Optional[str]) -> bool:
+    """Se a categoria com esta origem entra nas contagens do modelo"""
+    return category_source != AUTO_CATEGORY_SOURCE
+
+def tokenize(normalized_text: str) -> List[str]:
+    """Extrair os tokens distintos de uma descrição já normalizada"""
+    if not normalized_text:
+        return []
+    tokens = dict.fromkeys(
+        token[:MAX_TOKEN_LENGTH] for token in normalized_text.split()
+        if len(token) > 1 and not token.isdigit()
+    )
+    return list(tokens)
+
+class UserCategoryModel:
+    """Naive Bayes multinomial por usuário, atualizado por contagens incrementais"""
+
+    def __init__(self):
+        self.token_counts: Dict[str, Dict[int, int]] = {}  # token -> {category_id: contagem}
+        self.document_counts: Dict[int, int] = {}  # category_id -> transações
+        self.token_totals: Dict[int, int] = {}  # category_id -> tokens
+        self.total_documents = 0
+        self._lock = threading.Lock()
+
+    def update(self, category_id: int, tokens: Iterable[str], sign: int):
+        """Somar (sign=1) ou remover (sign=-1) uma transação do modelo"""
+        tokens = list(tokens)
+        with self._lock:
+            self.document_counts[category_id] = self.document_counts.get(category_id, 0) + sign
+            self.token_totals[category_id] = self.token_totals.get(category_id, 0) + sign * len(tokens)
+            self.total_documents += sign
+            for token in tokens:
+                counts = self.token_counts.setdefault(token, {})
+                counts[category_id] = counts.get(category_id, 0) + sign
+                if counts[category_id] <= 0:
+                    del counts[category_id]
+                    if not counts:
+                        del self.token_counts[token]
+
+    def predict(self, tokens: List[str], allowed_category_ids=None) -> Optional[Tuple[int, float, List[str]]]:
+        """Retornar (category_id, probabilidade, tokens conhecidos) da categoria mais provável"""
+        if not tokens:
+            return None
+
+        with self._lock:
+            if self.total_documents < MIN_TRAINING_DOCUMENTS:
+                return None
+
+            candidates = [
+                category_id for category_id, count in self.document_counts.items()
+                if count > 0 and (allowed_category_ids is None or category_id in allowed_category_ids)
+            ]
+            if not candidates:
+                return None
+
+            # Termo comum a todos os tokens; os tokens vistos são corrigidos abaixo em O(tokens)
+            vocabulary_size = max(len(self.token_counts), 1)
+            log_smoothing = math.log(SMOOTHING)
+            token_total = len(tokens)
+            scores = {
+                category_id: math.log(self.document_counts[category_id])
+                - token_total * math.log(self.token_totals.get(category_id, 0) + SMOOTHING * vocabulary_size)
+                + token_total * log_smoothing
+                for category_id in candidates
+            }
+
+            known_tokens = False
+            for token in tokens:
+                counts = self.token_counts.get(token)
+                if not counts:
+                    continue
+                for category_id, count in counts.items():
+                    if category_id in scores:
+                        scores[category_id] += math.log(count + SMOOTHING) - log_smoothing
+                        known_tokens = True
+
+            # Nenhum token conhecido: a decisão fica com as palavras-chave
+            if not known_tokens:
+                return None
+
+            best_category_id = max(scores, key=scores.get)
+            best_score = scores[best_category_id]
+            probability = 1 / sum(math.exp(score - best_score) for score in scores.values())
+            matched_tokens = [
+                token for token in tokens
+                if self.token_counts.get(token, {}).get(best_category_id, 0) > 0
+            ]
+
+        return best_category_id, probability, matched_tokens
+
+def load_user_model(user_id: int) -> UserCategoryModel:
+    """Carregar do banco as contagens do modelo de um usuário"""
+    model = UserCategoryModel()
+
+    category_rows = db.session.query(
+        CategorizationCategoryCount.category_id,
+        CategorizationCategoryCount.document_count,
+        CategorizationCategoryCount.token_count
+    ).filter(CategorizationCategoryCount.user_id == user_id).all()
+    for category_id, document_count, token_count in category_rows:
+        if document_count > 0:
+            model.document_counts[category_id] = document_count
+            model.token_totals[category_id] = token_count
+            model.total_documents += document_count
+
+    token_rows = db.session.query(
+        CategorizationTokenCount.token,
+        CategorizationTokenCount.category_id,
+        CategorizationTokenCount.count
+    ).filter(
+        CategorizationTokenCount.user_id == user_id,
+        CategorizationTokenCount.count > 0
+    ).all()
+    for token, category_id, count in token_rows:
+        model.token_counts.setdefault(token, {})[category_id] = count
+
+    return model
+
+def write_training_deltas(connection, documents: Iterable[Tuple[int, int, List[str], int]]) -> int:
+    """Gravar na mesma transação as contagens de (user_id, category_id, tokens, sinal)"""
+    token_deltas: Dict[Tuple[int, int, str], int] = {}
+    category_deltas: Dict[Tuple[int, int], List[int]] = {}
+
+    document_total = 0
+    for user_id, category_id, tokens, sign in documents:
+        document_total += 1
+        totals = category_deltas.setdefault((user_id, category_id), [0, 0])
+        totals[0] += sign
+        totals[1] += sign * len(tokens)
+        for token in tokens:
+            key = (user_id, category_id, token)
+            token_deltas[key] = token_deltas.get(key, 0) + sign
+
+    token_rows = [
+        {'user_id': user_id, 'category_id': category_id, 'token': token, 'count': delta}
+        for (user_id, category_id, token), delta in token_deltas.items() if delta
+    ]
+    category_rows = [
+        {'user_id': user_id, 'category_id': category_id, 'document_count': document_delta, 'token_count': token_delta}
+        for (user_id, category_id), (document_delta, token_delta) in category_deltas.items()
+        if document_delta or token_delta
+    ]
+
+    if token_rows:
+        increment_counters(connection, CategorizationTokenCount, ['user_id', 'category_id', 'token'], token_rows, ['count'])
+    if category_rows:
+        increment_counters(connection, CategorizationCategoryCount, ['user_id', 'category_id'], category_rows,
+                   ['document_count', 'token_count'])
+
+    # Remover contagens zeradas para manter o modelo compacto
+    if any(row['count'] < 0 for row in token_rows):
+        user_ids = {row['user_id'] for row in token_rows}
+        table = CategorizationTokenCount.__table__
+        connection.execute(table.delete().where(table.c.user_id.in_(user_ids), table.c.count <= 0))
+
+    return document_total
+
+def rebuild_user_model(user_id: int, normalize, batch_size: int = 1000, connection=None) -> int:
+    """Retreinar do zero o modelo do usuário a partir das transações com categoria escolhida pelo usuário"""
+    connection = connection or db.session.connection()
+    tokens_table = CategorizationTokenCount.__table__
+    categories_table = CategorizationCategoryCount.__table__
+    connection.execute(tokens_table.delete().where(tokens_table.c.user_id == user_id))
+    connection.execute(categories_table.delete().where(categories_table.c.user_id == user_id))
+
+    transactions = Transaction.__table__
+    rows = connection.execution_options(yield_per=batch_size).execute(select(
+        transactions.c.category_id,
+        transactions.c.description
+    ).where(
+        transactions.c.user_id == user_id,
+        transactions.c.category_id.isnot(None),
+        transactions.c.category_source != AUTO_CATEGORY_SOURCE
+    ))
+
+    # As contagens são agregadas em streaming, sem materializar o histórico
+    documents = (
+        (user_id, category_id, tokenize(normalize(description)), 1)
+        for category_id, description in rows
+    )
+    return write_training_deltas(connection, documents)
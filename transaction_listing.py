@@ -0,0 +1,87 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from datetime import datetime
+from src.models.transaction import Transaction
+from src.services.serialization import json_response, transaction_serializer
+from src.services.transaction_queries import (
+    TransactionFilters, list_transactions_page, export_transactions_ndjson, DEFAULT_PAGE_SIZE
+)
+from src.services.transaction_search import search_transaction_ids, DEFAULT_SEARCH_LIMIT
+
+transaction_listing_bp = Blueprint('transaction_listing', __name__)
+
+@transaction_listing_bp.route('/transactions/page', methods=['GET'])
+def get_transactions_page():
+    """Listar transações com filtros no servidor e paginação por cursor"""
+    try:
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return jsonify({'error': 'user_id é obrigatório'}), 400
+
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        try:
+            filters = TransactionFilters.from_args(request.args)
+            page = list_transactions_page(user_id, filters, request.args.get('cursor'), limit)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return json_response(page)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@transaction_listing_bp.route('/transactions/export', methods=['GET'])
+def export_transactions():
+    """Exportar todas as transações filtradas em NDJSON (uma por linha), em streaming"""
+    try:
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return jsonify({'error': 'user_id é obrigatório'}), 400
+
+        try:
+            filters = TransactionFilters.from_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        filename = f"transacoes_{datetime.utcnow().strftime('%Y-%m-%d')}.ndjson"
+        return Response(
+            stream_with_context(export_transactions_ndjson(user_id, filters)),
+            mimetype='application/x-ndjson',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@transaction_listing_bp.route('/transactions/search', methods=['GET'])
+def search_transactions():
+    """Buscar transações pela descrição (todos os termos, por prefixo), ordenadas por relevância"""
+    try:
+        user_id = request.args.get('user_id', type=int)
+        query = request.args.get('q', '')
+        if not user_id or not query.strip():
+            return jsonify({'error': 'user_id e q são obrigatórios'}), 400
+
+        limit = request.args.get('limit', DEFAULT_SEARCH_LIMIT, type=int)
+        matches = search_transaction_ids(user_id, query, limit)
+
+        transactions = []
+        if matches:
+            rows = transaction_serializer.query().filter(
+                Transaction.user_id == user_id,
+                Transaction.id.in_([transaction_id for transaction_id, _ in matches])
+            ).all()
+            by_id = {row.id: row for row in rows}
+            for transaction_id, score in matches:
+                if transaction_id in by_id:
+                    item = transaction_serializer.serialize(by_id[transaction_id])
+                    item['score'] = round(score, 4)
+                    transactions.append(item)
+
+        return json_response({
+            'query': query,
+            'transactions': transactions,
+            'total': len(transactions)
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,158 @@
+import base64
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence
+from sqlalchemy import tuple_
+from src.models.user import db
+from src.models.transaction import Transaction
+from src.models.money import cents, from_cents
+from src.services.serialization import dumps, transaction_serializer
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Linhas buscadas por vez do cursor do banco na exportação
+EXPORT_BATCH_SIZE = 1000
+
+class TransactionFilters:
+    """Filtros da listagem de transações, lidos da query string"""
+
+    def __init__(self, transaction_type: Optional[str] = None, category_ids: Sequence[int] = (),
+                 uncategorized: bool = False, start_date: Optional[datetime] = None,
+                 end_date: Optional[datetime] = None, search: Optional[str] = None,
+                 end_inclusive: bool = True):
+        self.transaction_type = transaction_type
+        self.category_ids = list(category_ids)
+        self.uncategorized = uncategorized
+        self.start_date = start_date
+        self.end_date = end_date
+        self.search = search
+        self.end_inclusive = end_inclusive
+
+    @classmethod
+    def from_args(cls, args):
+        """Montar a partir de request.args; levanta ValueError com a mensagem para o cliente"""
+        transaction_type = args.get('type') or None
+        if transaction_type not in (None, 'income', 'expense'):
+            raise ValueError("type deve ser 'income' ou 'expense'")
+
+        # category_id repetido ou separado por vírgulas; 'none' = sem categoria
+        category_ids = []
+        uncategorized = False
+        for value in args.getlist('category_id'):
+            for part in value.split(','):
+                part = part.strip()
+                if part == 'none':
+                    uncategorized = True
+                elif part:
+                    try:
+                        category_ids.append(int(part))
+                    except ValueError:
+                        raise ValueError('category_id deve ser numérico ou none')
+
+        try:
+            start_date = datetime.fromisoformat(args['start_date']) if args.get('start_date') else None
+            end_date = datetime.fromisoformat(args['end_date']) if args.get('end_date') else None
+        except ValueError:
+            raise ValueError('Datas devem estar no formato AAAA-MM-DD')
+        # Data sem horário no fim do período inclui o dia inteiro
+        if end_date is not None and len(args['end_date']) == 10:
+            end_date += timedelta(days=1)
+            end_inclusive = False
+        else:
+            end_inclusive = True
+
+        return cls(transaction_type, category_ids, uncategorized, start_date, end_date,
+                   (args.get('search') or '').strip() or None, end_inclusive)
+
+    def apply(self, query, user_id: int):
+        query = query.filter(Transaction.user_id == user_id)
+        if self.transaction_type:
+            query = query.filter(Transaction.transaction_type == self.transaction_type)
+        if self.category_ids and self.uncategorized:
+            query = query.filter(db.or_(Transaction.category_id.in_(self.category_ids), Transaction.category_id.is_(None)))
+        elif self.category_ids:
+            query = query.filter(Transaction.category_id.in_(self.category_ids))
+        elif self.uncategorized:
+            query = query.filter(Transaction.category_id.is_(None))
+        if self.start_date:
+            query = query.filter(Transaction.date >= self.start_date)
+        if self.end_date:
+            query = query.filter(Transaction.date <= self.end_date if self.end_inclusive else Transaction.date < self.end_date)
+        if self.search:
+            pattern = self.search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            query = query.filter(Transaction.description.ilike(f'%{pattern}%', escape='\\'))
+        return query
+
+def encode_cursor(date: datetime, transaction_id: int) -> str:
+    """Cursor opaco com a posição (date, id) da última transação da página"""
+    raw = f'{date.isoformat()}|{transaction_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        date, transaction_id = raw.split('|')
+        return datetime.fromisoformat(date), int(transaction_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('cursor inválido')
+
+def transactions_page_query(user_id: int, filters: TransactionFilters, cursor: Optional[str], limit: int):
+    """Linhas de uma página, mais uma para saber se há a seguinte"""
+    query = filters.apply(transaction_serializer.query(), user_id)
+    if cursor:
+        # Continua exatamente após a última linha entregue, sem OFFSET
+        query = query.filter(tuple_(Transaction.date, Transaction.id) < tuple_(*decode_cursor(cursor)))
+    return query.order_by(Transaction.date.desc(), Transaction.id.desc()).limit(limit + 1)
+
+def list_transactions_page(user_id: int, filters: TransactionFilters, cursor: Optional[str] = None,
+                           limit: int = DEFAULT_PAGE_SIZE) -> Dict:
+    """Uma página da listagem, da mais recente para a mais antiga, por paginação keyset em (date, id)"""
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    rows = transactions_page_query(user_id, filters, cursor, limit).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    page = {
+        'transactions': transaction_serializer.serialize_all(rows),
+        'has_more': has_more,
+        'next_cursor': encode_cursor(rows[-1].date, rows[-1].id) if has_more else None
+    }
+    # Os totais do filtro vão só na primeira página
+    if not cursor:
+        page['totals'] = summarize_transactions(user_id, filters)
+    return page
+
+def summarize_transactions(user_id: int, filters: TransactionFilters) -> Dict:
+    """Receitas, despesas e quantidade de transações que atendem aos filtros"""
+    rows = filters.apply(db.session.query(
+        Transaction.transaction_type,
+        db.func.sum(db.func.abs(cents(Transaction.amount))),
+        db.func.count(Transaction.id)
+    ), user_id).group_by(Transaction.transaction_type).all()
+
+    totals = {'income': 0, 'expense': 0}
+    count = 0
+    for transaction_type, total, type_count in rows:
+        if transaction_type in totals:
+            totals[transaction_type] += int(round(total or 0))
+        count += type_count
+    return {
+        'total_income': from_cents(totals['income']),
+        'total_expense': from_cents(totals['expense']),
+        'balance': from_cents(totals['income'] - totals['expense']),
+        'transaction_count': count
+    }
+
+def export_transactions_ndjson(user_id: int, filters: TransactionFilters) -> Iterator[bytes]:
+    """Uma transação por linha, lida do cursor do banco em blocos, sem carregar o resultado inteiro"""
+    query = filters.apply(transaction_serializer.query(), user_id).order_by(
+        Transaction.date.desc(), Transaction.id.desc()
+    ).execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+
+    chunk: List[bytes] = []
+    for row in query:
+        chunk.append(dumps(transaction_serializer.serialize(row)))
+        if len(chunk) >= EXPORT_BATCH_SIZE:
+            yield b'\n'.join(chunk) + b'\n'
+            chunk = []
+    if chunk:
+        yield b'\n'.join(chunk) + b'\n'
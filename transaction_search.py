@@ -0,0 +1,229 @@
+import click
+from typing import Dict, List, Optional, Sequence, Tuple
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.orm import Session, object_session
+from src.models.user import db
+from src.models.transaction import Transaction
+from src.services.text_normalization import normalize_text
+
+SEARCH_TABLE = 'transaction_search'
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 200
+REBUILD_BATCH_SIZE = 5000
+
+def search_terms(query: str) -> List[str]:
+    """Termos da busca na mesma forma normalizada usada no índice"""
+    return normalize_text(query).split()
+
+class SqliteSearchBackend:
+    """Índice FTS5 com a descrição normalizada; rowid = id da transação"""
+
+    def create(self, connection):
+        # user_key ("u<id>") é indexado para que o filtro por usuário use o próprio índice invertido;
+        # prefix cria índices auxiliares para buscas por prefixo de 2 a 4 letras
+        connection.execute(text(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} '
+            f'USING fts5(user_key, description, tokenize = "unicode61", prefix = "2 3 4")'
+        ))
+
+    def drop(self, connection):
+        connection.execute(text(f'DROP TABLE IF EXISTS {SEARCH_TABLE}'))
+
+    def delete(self, connection, transaction_ids: Sequence[int]):
+        connection.execute(
+            text(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = :id'),
+            [{'id': transaction_id} for transaction_id in transaction_ids]
+        )
+
+    def upsert(self, connection, documents: Sequence[Tuple[int, int, str]], replace: bool = True):
+        if replace:
+            self.delete(connection, [transaction_id for transaction_id, _, _ in documents])
+        connection.execute(
+            text(f'INSERT INTO {SEARCH_TABLE} (rowid, user_key, description) VALUES (:id, :user_key, :description)'),
+            [
+                {'id': transaction_id, 'user_key': f'u{user_id}', 'description': description}
+                for transaction_id, user_id, description in documents
+            ]
+        )
+
+    def search(self, connection, user_id: int, terms: Sequence[str], limit: int) -> List[Tuple[int, float]]:
+        # Todos os termos obrigatórios, cada um como prefixo; aspas evitam a sintaxe de consulta do FTS5
+        match = f'user_key : u{user_id} AND ' + ' AND '.join(f'description : "{term}"*' for term in terms)
+        rows = connection.execute(text(
+            f'SELECT rowid, bm25({SEARCH_TABLE}, 0.0, 1.0) AS score FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH :match ORDER BY score LIMIT :limit'
+        ), {'match': match, 'limit': limit})
+        # bm25 é menor para resultados melhores; a resposta usa "maior é melhor"
+        return [(transaction_id, -score) for transaction_id, score in rows]
+
+class PostgresSearchBackend:
+    """Tabela com tsvector da descrição normalizada e índice GIN"""
+
+    def create(self, connection):
+        connection.execute(text(
+            f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+            f'transaction_id INTEGER PRIMARY KEY REFERENCES transactions (id) ON DELETE CASCADE, '
+            f'user_id INTEGER NOT NULL, document TSVECTOR NOT NULL)'
+        ))
+        connection.execute(text(
+            f'CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)'
+        ))
+        connection.execute(text(
+            f'CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_user ON {SEARCH_TABLE} (user_id)'
+        ))
+
+    def drop(self, connection):
+        connection.execute(text(f'DROP TABLE IF EXISTS {SEARCH_TABLE}'))
+
+    def delete(self, connection, transaction_ids: Sequence[int]):
+        connection.execute(
+            text(f'DELETE FROM {SEARCH_TABLE} WHERE transaction_id = :id'),
+            [{'id': transaction_id} for transaction_id in transaction_ids]
+        )
+
+    def upsert(self, connection, documents: Sequence[Tuple[int, int, str]], replace: bool = True):
+        connection.execute(
+            text(
+                f'INSERT INTO {SEARCH_TABLE} (transaction_id, user_id, document) '
+                f"VALUES (:id, :user_id, to_tsvector('simple', :description)) "
+                f'ON CONFLICT (transaction_id) DO UPDATE SET user_id = excluded.user_id, document = excluded.document'
+            ),
+            [
+                {'id': transaction_id, 'user_id': user_id, 'description': description}
+                for transaction_id, user_id, description in documents
+            ]
+        )
+
+    def search(self, connection, user_id: int, terms: Sequence[str], limit: int) -> List[Tuple[int, float]]:
+        # Os termos já são alfanuméricos (normalize_text), então podem ir direto para o tsquery
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        rows = connection.execute(text(
+            f"SELECT transaction_id, ts_rank(document, to_tsquery('simple', :tsquery)) AS score "
+            f"FROM {SEARCH_TABLE} WHERE user_id = :user_id AND document @@ to_tsquery('simple', :tsquery) "
+            f'ORDER BY score DESC LIMIT :limit'
+        ), {'tsquery': tsquery, 'user_id': user_id, 'limit': limit})
+        return [(transaction_id, float(score)) for transaction_id, score in rows]
+
+SEARCH_BACKENDS = {
+    'sqlite': SqliteSearchBackend(),
+    'postgresql': PostgresSearchBackend()
+}
+
+def get_search_backend(connection):
+    """Backend do banco atual, ou None quando não há índice de busca (a busca usa LIKE)"""
+    return SEARCH_BACKENDS.get(connection.dialect.name)
+
+# O índice acompanha a tabela de transações, inclusive em db.create_all() e db.drop_all()
+@event.listens_for(Transaction.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    backend = get_search_backend(connection)
+    if backend:
+        backend.create(connection)
+
+@event.listens_for(Transaction.__table__, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    backend = get_search_backend(connection)
+    if backend:
+        backend.drop(connection)
+
+def _pending(session) -> Dict[int, Optional[Tuple[int, str]]]:
+    # transaction_id -> (user_id, descrição) a indexar, ou None para remover
+    return session.info.setdefault('search_pending', {})
+
+def _index_inserted_transaction(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        _pending(session)[target.id] = (target.user_id, target.description)
+
+def _index_updated_transaction(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        return
+    state = inspect(target)
+    if state.attrs.description.history.has_changes() or state.attrs.user_id.history.has_changes():
+        _pending(session)[target.id] = (target.user_id, target.description)
+
+def _index_deleted_transaction(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        _pending(session)[target.id] = None
+
+event.listen(Transaction, 'after_insert', _index_inserted_transaction)
+event.listen(Transaction, 'after_update', _index_updated_transaction)
+event.listen(Transaction, 'after_delete', _index_deleted_transaction)
+
+def write_search_documents(connection, changes: Dict[int, Optional[Tuple[int, str]]]):
+    """Aplicar ao índice as inclusões, alterações e remoções de transações"""
+    backend = get_search_backend(connection)
+    if backend is None or not changes:
+        return
+    removed = [transaction_id for transaction_id, document in changes.items() if document is None]
+    documents = [
+        (transaction_id, document[0], normalize_text(document[1]))
+        for transaction_id, document in changes.items() if document is not None
+    ]
+    if removed:
+        backend.delete(connection, removed)
+    if documents:
+        backend.upsert(connection, documents)
+
+@event.listens_for(Session, 'after_flush')
+def _write_search_index(session, flush_context):
+    """Atualizar o índice de busca na mesma transação das alterações"""
+    pending = session.info.pop('search_pending', None)
+    if pending:
+        write_search_documents(session.connection(), pending)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_search_index(session):
+    session.info.pop('search_pending', None)
+
+def rebuild_search_index(connection) -> int:
+    """Recriar o índice de busca a partir de todas as transações"""
+    backend = get_search_backend(connection)
+    if backend is None:
+        return 0
+    backend.drop(connection)
+    backend.create(connection)
+
+    transactions = Transaction.__table__
+    result = connection.execute(
+        select(transactions.c.id, transactions.c.user_id, transactions.c.description).execution_options(
+            yield_per=REBUILD_BATCH_SIZE
+        )
+    )
+    indexed = 0
+    for rows in result.partitions(REBUILD_BATCH_SIZE):
+        # Índice recém-criado: nada a substituir
+        backend.upsert(connection, [
+            (transaction_id, user_id, normalize_text(description))
+            for transaction_id, user_id, description in rows
+        ], replace=False)
+        indexed += len(rows)
+    return indexed
+
+def search_transaction_ids(user_id: int, query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> List[Tuple[int, float]]:
+    """Ids das transações do usuário que casam com todos os termos (por prefixo), do mais relevante ao menos"""
+    terms = search_terms(query)
+    if not terms:
+        return []
+    limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+    connection = db.session.connection()
+    backend = get_search_backend(connection)
+    if backend is not None:
+        return backend.search(connection, user_id, terms, limit)
+
+    # Sem índice: busca por substring, mais recentes primeiro
+    query = db.session.query(Transaction.id).filter(Transaction.user_id == user_id)
+    for term in terms:
+        query = query.filter(Transaction.description.ilike(f'%{term}%'))
+    return [(transaction_id, 0.0) for transaction_id, in query.order_by(Transaction.date.desc()).limit(limit)]
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Recriar o índice de busca das descrições de transações"""
+    indexed = rebuild_search_index(db.session.connection())
+    db.session.commit()
+    click.echo(f'Índice de busca recriado com {indexed} transações')
@@ -0,0 +1,9 @@
+from flask_sqlalchemy import SQLAlchemy
+from src.models.user import db
+
+class UserDataVersion(db.Model):
+    """Contador incrementado a cada alteração nos dados financeiros do usuário"""
+    __tablename__ = 'user_data_versions'
+
+    user_id = db.Column(db.Integer, primary_key=True)  # 0 = dados globais (categorias padrão)
+    version = db.Column(db.Integer, nullable=False, default=0)